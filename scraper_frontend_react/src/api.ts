@@ -28,6 +28,8 @@ export async function fetchProducts(params?: {
   page_size?: number
   order_by?: "price" | "rating" | "created_at" | "updated_at" | "title"
   order?: "asc" | "desc"
+  cursor?: string
+  include_total?: boolean
 }) {
   const qs = new URLSearchParams((params ?? {}) as any).toString()
   const r = await fetch(`${BASE}/products?${qs}`)
@@ -17,8 +17,9 @@ export type Product = {
 export type ProductsResponse = {
   page: number
   page_size: number
-  total: number
+  total: number | null
   items: Product[]
+  next_cursor?: string | null
 }
 
 export type PricePoint = {
@@ -28,8 +29,19 @@ export type PricePoint = {
   seen_at: string
 }
 
+export type PriceBucket = {
+  start: string
+  min_price?: number
+  max_price?: number
+  last_price?: number
+  currency?: string
+  count: number
+}
+
 export type HistoryResponse = {
   asin: string
   count: number
+  bucket: 'raw' | 'hour' | 'day' | 'week'
   points: PricePoint[]
+  buckets: PriceBucket[]
 }
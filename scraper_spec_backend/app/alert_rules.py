@@ -0,0 +1,123 @@
+"""
+In-memory index of alert rules, matched against price changes at ingest.
+
+Rules are indexed by ASIN, and keyword rules by their longest word. A batch of
+price changes then costs one dict lookup per change (plus one per title word),
+whatever the number of rules. The index is reloaded from alert_rules after
+rules change in this process, or ALERTS_INDEX_TTL_SEC after the last load
+(to pick up rules created by other processes).
+
+A rule fires when a product's price drops (or is seen for the first time)
+and every condition the rule sets holds.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import AlertRule
+
+INDEX_TTL_SEC = float(os.getenv("ALERTS_INDEX_TTL_SEC", "30"))
+
+_WORD = re.compile(r"\w+")
+
+
+def words(text: Optional[str]) -> Tuple[str, ...]:
+    return tuple(_WORD.findall((text or "").lower()))
+
+
+class PriceChange(NamedTuple):
+    asin: str
+    title: Optional[str]
+    currency: Optional[str]
+    # previous history price; None for a product seen for the first time
+    old_price: Optional[float]
+    new_price: float
+
+
+class RuleSpec(NamedTuple):
+    id: int
+    words: Tuple[str, ...]
+    max_price: Optional[float]
+    drop_pct: Optional[float]
+    currency: Optional[str]
+    webhook_url: Optional[str]
+
+    def fires(self, change: PriceChange) -> bool:
+        old, new = change.old_price, change.new_price
+        if old is not None and new >= old:
+            return False
+        if self.currency and self.currency != change.currency:
+            return False
+        if self.max_price is not None and new > self.max_price:
+            return False
+        if self.drop_pct is not None and (not old or (old - new) / old * 100 < self.drop_pct):
+            return False
+        return True
+
+
+class AlertIndex:
+    def __init__(self, ttl_sec: float = INDEX_TTL_SEC):
+        self._ttl = ttl_sec
+        self._lock = threading.Lock()
+        self._by_asin: Dict[str, List[RuleSpec]] = {}
+        self._by_word: Dict[str, List[RuleSpec]] = {}
+        self._loaded_at: Optional[float] = None
+        # set after enqueue() commits, to wake the dispatcher
+        self.outbox_ready = threading.Event()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def _load(self, db: Session) -> None:
+        by_asin: Dict[str, List[RuleSpec]] = {}
+        by_word: Dict[str, List[RuleSpec]] = {}
+        for r in db.execute(select(AlertRule).where(AlertRule.enabled.is_(True))).scalars():
+            spec = RuleSpec(r.id, words(r.keyword), r.max_price, r.drop_pct, r.currency, r.webhook_url)
+            if r.asin:
+                by_asin.setdefault(r.asin, []).append(spec)
+            elif spec.words:
+                by_word.setdefault(max(spec.words, key=len), []).append(spec)
+        with self._lock:
+            self._by_asin, self._by_word = by_asin, by_word
+            self._loaded_at = time.monotonic()
+
+    def _fresh(self, db: Session) -> None:
+        with self._lock:
+            loaded = self._loaded_at
+        if loaded is None or time.monotonic() - loaded > self._ttl:
+            self._load(db)
+
+    def match(self, db: Session, changes: Iterable[PriceChange]) -> List[dict]:
+        """alert_outbox rows for the changes that fire a rule (loads rules with `db` when stale)."""
+        self._fresh(db)
+        with self._lock:
+            by_asin, by_word = self._by_asin, self._by_word
+        if not by_asin and not by_word:
+            return []
+        now = datetime.utcnow()
+        rows = []
+        for ch in changes:
+            candidates = list(by_asin.get(ch.asin, ()))
+            if by_word:
+                title_words = set(words(ch.title))
+                for w in title_words:
+                    candidates.extend(r for r in by_word.get(w, ()) if title_words.issuperset(r.words))
+            for rule in candidates:
+                if rule.fires(ch):
+                    rows.append({
+                        "rule_id": rule.id, "asin": ch.asin, "title": ch.title, "currency": ch.currency,
+                        "old_price": ch.old_price, "new_price": ch.new_price, "webhook_url": rule.webhook_url,
+                        "status": "pending", "attempts": 0, "next_attempt_at": now, "created_at": now,
+                    })
+        return rows
+
+
+alert_index = AlertIndex()
@@ -0,0 +1,192 @@
+"""
+Webhook delivery of price alerts.
+
+upsert_products / bulk_upsert_products write alert matches to alert_outbox in
+the same transaction as the price change (see app.alert_rules). The
+dispatcher POSTs each pending row as JSON to its rule's webhook_url, or to
+ALERTS_WEBHOOK_URL when the rule has none:
+
+    {"id": 12, "rule_id": 3, "asin": "B0C1234567", "title": "...", "currency": "USD",
+     "old_price": 59.99, "new_price": 44.99, "drop_pct": 25.0, "created_at": "..."}
+
+Delivery is at least once; receivers can dedupe on `id` (also sent as the
+X-Alert-Id header). Failed sends are retried with exponential backoff, up to
+ALERTS_MAX_ATTEMPTS attempts. The API runs the dispatcher in-process
+(ALERTS_POLL_SEC=0 turns it off).
+
+A local receiver that prints what it gets, for testing:
+
+    python -m app.alerts stub --port 8099
+    ALERTS_WEBHOOK_URL=http://127.0.0.1:8099/ uvicorn app.main:app
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+import argparse
+import logging
+import os
+import threading
+
+import httpx
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import SessionLocal
+from .crud import claim_alerts, finish_alert
+from .alert_rules import alert_index
+from .metrics import ALERT_DELIVERIES
+from .models import AlertOutbox
+
+log = logging.getLogger(__name__)
+
+WEBHOOK_URL = os.getenv("ALERTS_WEBHOOK_URL") or None
+POLL_SEC = float(os.getenv("ALERTS_POLL_SEC", "5"))
+BATCH = int(os.getenv("ALERTS_BATCH", "50"))
+MAX_ATTEMPTS = int(os.getenv("ALERTS_MAX_ATTEMPTS", "8"))
+TIMEOUT_SEC = float(os.getenv("ALERTS_TIMEOUT_SEC", "10"))
+# a claimed row is retried after this long if its dispatcher never reports back
+LEASE_SEC = 60.0
+MAX_BACKOFF_SEC = 3600.0
+
+
+def alert_payload(a: AlertOutbox) -> dict:
+    drop_pct = None
+    if a.old_price:
+        drop_pct = round((a.old_price - a.new_price) / a.old_price * 100, 2)
+    return {
+        "id": a.id,
+        "rule_id": a.rule_id,
+        "asin": a.asin,
+        "title": a.title,
+        "currency": a.currency,
+        "old_price": a.old_price,
+        "new_price": a.new_price,
+        "drop_pct": drop_pct,
+        "created_at": a.created_at.isoformat(),
+    }
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next try after `attempts` failed ones: 10s, 20s, 40s ... capped at an hour."""
+    return min(MAX_BACKOFF_SEC, 10.0 * 2 ** max(0, attempts - 1))
+
+
+class AlertDispatcher:
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        poll_sec: float = POLL_SEC,
+        default_url: Optional[str] = WEBHOOK_URL,
+        client: Optional[httpx.Client] = None,
+    ):
+        self._session_factory = session_factory
+        self._poll_sec = poll_sec
+        self.default_url = default_url
+        self._client = client
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(timeout=TIMEOUT_SEC)
+        return self._client
+
+    def _send(self, alert: AlertOutbox) -> Optional[str]:
+        """None on a 2xx response, else the error."""
+        try:
+            r = self._get_client().post(
+                alert.webhook_url or self.default_url,
+                json=alert_payload(alert),
+                headers={"X-Alert-Id": str(alert.id)},
+            )
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e!s}"
+        if r.is_success:
+            return None
+        return f"HTTP {r.status_code}: {r.text[:200]}"
+
+    def dispatch_once(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Deliver one batch of due alerts; returns how many were claimed."""
+        now = now or datetime.utcnow()
+        batch = claim_alerts(db, now, now + timedelta(seconds=LEASE_SEC), BATCH, self.default_url)
+        for alert in batch:
+            error = self._send(alert)
+            if error is None:
+                finish_alert(db, alert.id)
+                ALERT_DELIVERIES.inc(1, "sent")
+            elif alert.attempts >= MAX_ATTEMPTS:
+                log.warning("alert %s failed after %s attempts: %s", alert.id, alert.attempts, error)
+                finish_alert(db, alert.id, error)
+                ALERT_DELIVERIES.inc(1, "failed")
+            else:
+                retry_at = datetime.utcnow() + timedelta(seconds=retry_delay(alert.attempts))
+                finish_alert(db, alert.id, error, retry_at=retry_at)
+                ALERT_DELIVERIES.inc(1, "retry")
+        return len(batch)
+
+    def start(self) -> None:
+        if self._thread or self._poll_sec <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        alert_index.outbox_ready.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self._session_factory() as db:
+                    claimed = self.dispatch_once(db)
+            except Exception:
+                log.exception("alert dispatch failed")
+                claimed = 0
+            if claimed < BATCH:
+                # woken early when an upsert commits new alerts
+                alert_index.outbox_ready.wait(self._poll_sec)
+                alert_index.outbox_ready.clear()
+
+
+alert_dispatcher = AlertDispatcher()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        print(self.headers.get("X-Alert-Id"), body.decode("utf-8", "replace"), flush=True)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.alerts", description="Price alert delivery.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    stub = sub.add_parser("stub", help="run a local webhook receiver that prints each alert")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8099)
+    sub.add_parser("dispatch", help="deliver the alerts that are due once, then exit")
+    args = ap.parse_args()
+    if args.cmd == "stub":
+        print(f"listening on http://{args.host}:{args.port}/", flush=True)
+        ThreadingHTTPServer((args.host, args.port), _StubHandler).serve_forever()
+    else:
+        with SessionLocal() as db:
+            total = 0
+            while (n := alert_dispatcher.dispatch_once(db)):
+                total += n
+            print({"claimed": total})
+
+
+if __name__ == "__main__":
+    main()
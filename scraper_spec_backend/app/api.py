@@ -1,20 +1,64 @@
 from __future__ import annotations
+from datetime import datetime
+from typing import List
 
-from fastapi import APIRouter, Depends, Query, HTTPException
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
-from .db import SessionLocal
+from .db import SessionLocal, ReadSessionLocal, AsyncReadSessionLocal
+from .pagination import InvalidCursor
+from .response_cache import products_cache, etag_matches
+from .serialize import InvalidFields, parse_fields, products_json
+from .scheduler import scheduler
+from .exports import (
+    ExportUnavailable,
+    stream_products_csv,
+    stream_products_parquet,
+    stream_products_arrow,
+    stream_history_ndjson,
+)
 from .schemas import (
     ScrapeRequest,
+    BatchScrapeRequest,
+    ReparseRequest,
     ProductsResponse,
-    ProductOut,
+    JobOut,
+    HistoryResponse,
+    HistoryBatchRequest,
+    WatchCreate,
+    WatchOut,
+    StatsSummary,
+    PriceDistribution,
+    RatingHistogram,
+    PriceDropsResponse,
+    KeywordCount,
+    AlertRuleCreate,
+    AlertRuleOut,
+    AlertOut,
 )
 from .services import (
-    run_scrape,
-    persist_scrape_results,
+    scrape_and_persist,
+    reparse_cached_pages,
+    scrape_diagnostics,
+    enqueue_scrape,
+    fetch_job,
+    fetch_history,
+    fetch_history_batch,
     fetch_products,
-    export_products_csv,
+    add_watch,
+    fetch_watches,
+    remove_watch,
+    fetch_stats_summary,
+    fetch_price_distribution,
+    fetch_rating_histogram,
+    fetch_price_drops,
+    fetch_keyword_counts,
+    add_alert_rule,
+    fetch_alert_rules,
+    remove_alert_rule,
+    fetch_alerts,
 )
 
 router = APIRouter()
@@ -30,65 +74,305 @@ def get_db():
         db.close()
 
 
+async def read_db(fn, *args, **kwargs):
+    """
+    Run fn(session, *args, **kwargs) on a read session without blocking the
+    event loop: awaited on the AsyncEngine in async mode, else in the threadpool.
+    """
+    if AsyncReadSessionLocal is not None:
+        async with AsyncReadSessionLocal() as db:
+            return await db.run_sync(lambda sync_db: fn(sync_db, *args, **kwargs))
+
+    def call():
+        with ReadSessionLocal() as db:
+            return fn(db, *args, **kwargs)
+
+    return await run_in_threadpool(call)
+
+
 # --- Endpoints ---
 
+def _queued(job) -> JSONResponse:
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status})
+
+
 @router.post("/scrape")
-def post_scrape(req: ScrapeRequest, db: Session = Depends(get_db)):
-    try:
-        items = run_scrape(req)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Scrape failed: {e!s}")
-    changed = persist_scrape_results(db, items)
-    return {"fetched": len(items), "inserted_or_updated": changed}
+def post_scrape(
+    req: ScrapeRequest,
+    background: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    if background:
+        return _queued(enqueue_scrape(db, req))
+    fetched, changed, stats = scrape_and_persist(db, req)
+    if stats.errors and not stats.pages:
+        raise HTTPException(status_code=502, detail=f"Scrape failed: {stats.errors[0]['error']}")
+    body = {"fetched": fetched, "inserted_or_updated": changed}
+    if stats.errors:
+        # pages before the failure were saved
+        body["errors"] = stats.errors
+    return body
+
+
+@router.post("/scrape/batch")
+def post_scrape_batch(
+    req: BatchScrapeRequest,
+    background: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    if background:
+        return _queued(enqueue_scrape(db, req))
+    fetched, changed, stats = scrape_and_persist(db, req)
+    if not fetched and stats.errors:
+        raise HTTPException(status_code=502, detail={"message": "Scrape failed", **stats.as_dict()})
+    return {"fetched": fetched, "inserted_or_updated": changed, **stats.as_dict()}
+
+
+@router.post("/scrape/reparse")
+def post_scrape_reparse(req: ReparseRequest, db: Session = Depends(get_db)):
+    """Re-run the parser over cached pages and upsert the results; no browser."""
+    return reparse_cached_pages(db, req)
+
+
+@router.get("/scrape/stats")
+def scrape_stats():
+    """Where page-load time goes: browser phase totals, fetch fallbacks, driver pool; scheduler budget."""
+    return {**scrape_diagnostics(), "scheduler": scheduler.stats()}
+
+
+@router.post("/watches", response_model=WatchOut, status_code=201)
+def post_watch(req: WatchCreate, db: Session = Depends(get_db)):
+    """Watch a keyword or search URL: the scheduler re-scrapes it about every interval_sec."""
+    return add_watch(db, req)
+
+
+@router.get("/watches", response_model=List[WatchOut])
+async def watches():
+    return await read_db(fetch_watches)
+
+
+@router.delete("/watches/{watch_id}", status_code=204)
+def delete_watch(watch_id: int, db: Session = Depends(get_db)):
+    if not remove_watch(db, watch_id):
+        raise HTTPException(status_code=404, detail="Watch not found")
+    return Response(status_code=204)
+
+
+def _job_out(db: Session, job_id: int) -> JobOut | None:
+    job = fetch_job(db, job_id)
+    return JobOut.model_validate(job) if job is not None else None
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def job_status(job_id: int):
+    job = await read_db(_job_out, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+def _products_body(db: Session, **params) -> bytes:
+    rows, total, next_cursor = fetch_products(db, **params)
+    return products_json(
+        rows, params["fields"], page=params["page"], page_size=params["page_size"], total=total, next_cursor=next_cursor,
+    )
+
+
+async def _cache_call(fn, *args):
+    # the Redis backend does network I/O; keep it off the event loop
+    if products_cache.backend.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
 
 
 @router.get("/products", response_model=ProductsResponse)
-def products(
+async def products(
     q: str | None = Query(None),
     min_rating: float | None = Query(None),
     max_price: float | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
-    order_by: str = Query("created_at", pattern="^(price|rating|created_at|updated_at|title)$"),
+    order_by: str = Query("created_at", pattern="^(price|rating|created_at|updated_at|title|relevance)$"),
     order: str = Query("desc", pattern="^(asc|desc)$"),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None),
+    include_total: bool = Query(True),
+    fields: str | None = Query(None, description="Comma-separated item fields to return, e.g. asin,title,price"),
+    if_none_match: str | None = Header(None),
 ):
-    rows, total = fetch_products(
-        db,
-        q=q,
-        min_rating=min_rating,
-        max_price=max_price,
-        page=page,
-        page_size=page_size,
-        order_by=order_by,
-        order=order,
-    )
-    return ProductsResponse(
-        page=page,
-        page_size=page_size,
-        total=total,
-        items=[ProductOut.model_validate(r) for r in rows],
+    try:
+        selected = parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    params = {
+        "q": q,
+        "min_rating": min_rating,
+        "max_price": max_price,
+        "page": page,
+        "page_size": page_size,
+        "order_by": order_by,
+        "order": order,
+        "cursor": cursor,
+        "with_total": include_total,
+        "fields": selected,
+    }
+    # key is taken before the query, so a write that lands meanwhile can't be masked
+    key = await _cache_call(products_cache.key, params)
+    entry = await _cache_call(products_cache.get, key)
+    if entry is None:
+        try:
+            body = await read_db(_products_body, **params)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        entry = await _cache_call(products_cache.put, key, body)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        products_cache.count_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+@router.get("/products/cache")
+def products_cache_stats():
+    """Hit/miss counters of the /products response cache."""
+    return products_cache.stats()
+
+
+@router.get("/history/{asin}", response_model=HistoryResponse)
+async def history(
+    asin: str,
+    since: datetime | None = Query(None),
+    until: datetime | None = Query(None),
+    bucket: str = Query("auto", pattern="^(auto|raw|hour|day|week)$"),
+    limit: int = Query(500, ge=1, le=5000),
+    max_points: int = Query(500, ge=10, le=5000),
+):
+    return await read_db(
+        fetch_history, asin, since=since, until=until, bucket=bucket, limit=limit, max_points=max_points,
     )
 
 
-@router.get("/products.csv", response_class=PlainTextResponse)
-def products_csv(
+@router.post("/history/batch", response_model=List[HistoryResponse])
+async def history_batch(req: HistoryBatchRequest):
+    return await read_db(fetch_history_batch, req)
+
+
+@router.get("/stats", response_model=StatsSummary)
+async def stats_summary():
+    """Product counts per currency, from the precomputed aggregates."""
+    return await read_db(fetch_stats_summary)
+
+
+@router.get("/stats/prices", response_model=PriceDistribution)
+async def stats_prices(currency: str | None = Query(None)):
+    return await read_db(fetch_price_distribution, currency)
+
+
+@router.get("/stats/ratings", response_model=RatingHistogram)
+async def stats_ratings():
+    return await read_db(fetch_rating_histogram)
+
+
+@router.get("/stats/drops", response_model=PriceDropsResponse)
+async def stats_drops(
+    period: str = Query("24h", pattern="^(24h|7d)$"),
+    limit: int = Query(20, ge=1, le=100),
+    currency: str | None = Query(None),
+):
+    """Biggest price drops over the period, as of the last stats refresh."""
+    return await read_db(fetch_price_drops, period, limit, currency)
+
+
+@router.get("/stats/keywords", response_model=List[KeywordCount])
+async def stats_keywords():
+    """Distinct products returned per watched keyword, as of the last stats refresh."""
+    return await read_db(fetch_keyword_counts)
+
+
+@router.post("/alerts/rules", response_model=AlertRuleOut, status_code=201)
+def post_alert_rule(req: AlertRuleCreate, db: Session = Depends(get_db)):
+    """Alert when an ASIN (or any product matching a keyword) drops below max_price and/or by drop_pct."""
+    return add_alert_rule(db, req)
+
+
+@router.get("/alerts/rules", response_model=List[AlertRuleOut])
+async def alert_rules():
+    return await read_db(fetch_alert_rules)
+
+
+@router.delete("/alerts/rules/{rule_id}", status_code=204)
+def delete_alert_rule(rule_id: int, db: Session = Depends(get_db)):
+    if not remove_alert_rule(db, rule_id):
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    return Response(status_code=204)
+
+
+@router.get("/alerts", response_model=List[AlertOut])
+async def alerts(
+    status: str | None = Query(None, pattern="^(pending|sent|failed)$"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Newest alert matches and their webhook delivery state."""
+    return await read_db(fetch_alerts, status, limit)
+
+
+def export_filters(
     q: str | None = Query(None),
     min_rating: float | None = Query(None),
     max_price: float | None = Query(None),
     page: int = Query(1, ge=1),
-    page_size: int = Query(1000, ge=1, le=5000),
-    order_by: str = Query("created_at", pattern="^(price|rating|created_at|updated_at|title)$"),
+    page_size: int | None = Query(None, ge=1),
+    order_by: str = Query("created_at", pattern="^(price|rating|created_at|updated_at|title|relevance)$"),
     order: str = Query("desc", pattern="^(asc|desc)$"),
-    db: Session = Depends(get_db),
-):
-    return export_products_csv(
-        db,
-        q=q,
-        min_rating=min_rating,
-        max_price=max_price,
-        page=page,
-        page_size=page_size,
-        order_by=order_by,
-        order=order,
+) -> dict:
+    """/products filters for exports: the whole filtered table, or one page when page_size is given."""
+    return {
+        "q": q,
+        "min_rating": min_rating,
+        "max_price": max_price,
+        "order_by": order_by,
+        "order": order,
+        "limit": page_size,
+        "offset": (page - 1) * page_size if page_size else 0,
+    }
+
+
+def _attachment(body, media_type: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
+
+
+@router.get("/products.csv")
+def products_csv(filters: dict = Depends(export_filters)):
+    return _attachment(stream_products_csv(**filters), "text/csv", "products.csv")
+
+
+@router.get("/products.parquet")
+def products_parquet(filters: dict = Depends(export_filters)):
+    try:
+        body = stream_products_parquet(**filters)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return _attachment(body, "application/vnd.apache.parquet", "products.parquet")
+
+
+@router.get("/products.arrow")
+def products_arrow(filters: dict = Depends(export_filters)):
+    try:
+        body = stream_products_arrow(**filters)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return _attachment(body, "application/vnd.apache.arrow.stream", "products.arrow")
+
+
+@router.get("/history.ndjson")
+def history_ndjson(
+    q: str | None = Query(None),
+    min_rating: float | None = Query(None),
+    max_price: float | None = Query(None),
+    asin: str | None = Query(None),
+):
+    body = stream_history_ndjson(q=q, min_rating=min_rating, max_price=max_price, asin=asin)
+    return _attachment(body, "application/x-ndjson", "history.ndjson")
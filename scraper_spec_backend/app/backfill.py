@@ -0,0 +1,48 @@
+"""
+One-shot migration for existing databases: adds the denormalized
+Product.last_history_price / last_seen_at columns (filled from price_history)
+and any product indexes declared since the table was created:
+
+    python -m app.backfill
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .db import engine, SessionLocal
+from .crud import backfill_last_history
+from .models import Product
+
+_COLUMNS = {
+    "last_history_price": "FLOAT",
+    "last_seen_at": "DATETIME",
+}
+
+
+def ensure_last_price_columns(bind: Engine) -> bool:
+    """Add missing columns to products. Returns True if any were added."""
+    existing = {c["name"] for c in inspect(bind).get_columns("products")}
+    missing = [name for name in _COLUMNS if name not in existing]
+    if not missing:
+        return False
+    with bind.begin() as conn:
+        for name in missing:
+            conn.execute(text(f"ALTER TABLE products ADD COLUMN {name} {_COLUMNS[name]}"))
+    return True
+
+
+def ensure_product_indexes(bind: Engine) -> None:
+    """create_all only indexes new tables; add indexes declared since to an existing one."""
+    for idx in Product.__table__.indexes:
+        idx.create(bind, checkfirst=True)
+
+
+def main() -> None:
+    ensure_last_price_columns(engine)
+    ensure_product_indexes(engine)
+    with SessionLocal() as db:
+        n = backfill_last_history(db)
+    print(f"backfilled {n} products")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,29 @@
-from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+import bisect
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, desc, asc
-from .models import Product, PriceHistory
+from sqlalchemy import and_, delete, or_, select, update, insert, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from .models import (
+    Product, PriceHistory, PriceHistoryRollup, ScrapeJob, WatchedSearch, WatchedProduct, ProductStat, PriceDrop,
+    AlertRule, AlertOutbox,
+)
+from .search import products_fts, fts_available, fts_match_expr, fts_rank
+from .pagination import InvalidCursor, decode_cursor, order_clause, after_cursor
+from .response_cache import products_cache
+from .metrics import ALERTS_ENQUEUED, DB_QUERY_SECONDS, HISTORY_ROWS_WRITTEN
+from .alert_rules import PriceChange, alert_index
+
+# Product columns written by upserts (created_at/updated_at keep their defaults)
+_UPSERT_FIELDS = (
+    "title", "product_url", "image_url",
+    "price", "price_raw", "currency",
+    "rating", "rating_count",
+)
+# Denormalized newest history point, maintained alongside price_history inserts
+_HISTORY_FIELDS = ("last_history_price", "last_seen_at")
+# Lower bounds of the per-currency price buckets in product_stats
+PRICE_STAT_EDGES = (0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
 
 def _extract_currency(raw: Optional[str]) -> Optional[str]:
     if not raw:
@@ -21,18 +43,24 @@ def upsert_products(db: Session, items: List[dict]) -> int:
     Accepts optional fields: price_raw, currency, rating_count.
     """
     changed = 0
+    history_rows = 0
+    stat_deltas: dict = {}
+    price_changes: List[PriceChange] = []
+    now = datetime.utcnow()
     for it in items:
         asin = (it.get("asin") or "").strip()
         if not asin:
             continue
 
-        existing = db.execute(select(Product).where(Product.asin == asin)).scalar_one_or_none()
+        with DB_QUERY_SECONDS.time("upsert.load_state"):
+            existing = db.execute(select(Product).where(Product.asin == asin)).scalar_one_or_none()
 
         price = it.get("price")
         price_raw = it.get("price_raw")
         currency = it.get("currency") or _extract_currency(price_raw or "")
 
         if existing:
+            before = product_stat_keys(existing.currency, existing.price, existing.rating)
             dirty = False
             for fld, val in [
                 ("title", it.get("title")),
@@ -48,15 +76,20 @@ def upsert_products(db: Session, items: List[dict]) -> int:
                     setattr(existing, fld, val) 
                     dirty = True
 
-            # price history
-            if price is not None:
-                last = db.execute(
-                    select(PriceHistory).where(PriceHistory.asin == asin).order_by(PriceHistory.seen_at.desc())
-                ).scalars().first()
-                if last is None or last.price != price:
-                    db.add(PriceHistory(asin=asin, price=price, price_raw=price_raw, currency=currency))
+            # price history (compare against the denormalized newest point)
+            if price is not None and existing.last_history_price != price:
+                db.add(PriceHistory(asin=asin, price=price, price_raw=price_raw, currency=currency, seen_at=now))
+                history_rows += 1
+                price_changes.append(
+                    PriceChange(asin, existing.title, existing.currency, existing.last_history_price, price)
+                )
+                existing.last_history_price = price
+                existing.last_seen_at = now
             if dirty:
                 changed += 1
+                _count_stat_change(
+                    stat_deltas, before, product_stat_keys(existing.currency, existing.price, existing.rating),
+                )
         else:
             db.add(Product(
                 asin=asin,
@@ -68,53 +101,814 @@ def upsert_products(db: Session, items: List[dict]) -> int:
                 currency=currency,
                 rating=it.get("rating"),
                 rating_count=it.get("rating_count"),
+                last_history_price=price,
+                last_seen_at=now if price is not None else None,
             ))
             if price is not None:
-                db.add(PriceHistory(asin=asin, price=price, price_raw=price_raw, currency=currency))
+                db.add(PriceHistory(asin=asin, price=price, price_raw=price_raw, currency=currency, seen_at=now))
+                history_rows += 1
+                price_changes.append(PriceChange(asin, it.get("title", ""), currency, None, price))
             changed += 1
+            _count_stat_change(stat_deltas, (), product_stat_keys(currency, price, it.get("rating")))
 
-    db.commit()
+    apply_stat_deltas(db, stat_deltas)
+    alerts = _enqueue_alerts(db, price_changes)
+    wrote = bool(db.new or db.dirty)
+    with DB_QUERY_SECONDS.time("upsert.commit"):
+        db.commit()
+    HISTORY_ROWS_WRITTEN.inc(history_rows)
+    _alerts_committed(alerts)
+    if wrote:
+        products_cache.invalidate()
     return changed
 
-def list_products(
+def _enqueue_alerts(db: Session, changes: List[PriceChange]) -> int:
+    """Outbox rows for the alert rules these price changes fire, in the caller's transaction."""
+    if not changes:
+        return 0
+    rows = alert_index.match(db, changes)
+    if rows:
+        with DB_QUERY_SECONDS.time("alerts.enqueue"):
+            db.execute(insert(AlertOutbox), rows)
+    return len(rows)
+
+def _alerts_committed(count: int) -> None:
+    if count:
+        ALERTS_ENQUEUED.inc(count)
+        alert_index.outbox_ready.set()
+
+def product_stat_keys(currency: Optional[str], price: Optional[float], rating: Optional[float]) -> tuple:
+    """The (dimension, key) rows of product_stats that a product with these values counts toward."""
+    cur = currency or ""
+    keys = [("currency", cur)]
+    if price is not None:
+        floor = PRICE_STAT_EDGES[max(0, bisect.bisect_right(PRICE_STAT_EDGES, price) - 1)]
+        keys.append(("price", f"{cur}|{floor}"))
+    # half-star buckets; 5.0 falls in the 4.5 one
+    keys.append(("rating", "" if rating is None else f"{max(0, min(int(rating * 2), 9)) / 2:.1f}"))
+    return tuple(keys)
+
+def _count_stat_change(deltas: dict, before: tuple, after: tuple) -> None:
+    if before == after:
+        return
+    for k in before:
+        deltas[k] = deltas.get(k, 0) - 1
+    for k in after:
+        deltas[k] = deltas.get(k, 0) + 1
+
+def apply_stat_deltas(db: Session, deltas: dict) -> None:
+    """Add count deltas to product_stats in the caller's transaction."""
+    # sorted, so concurrent writers lock the shared rows in the same order
+    rows = [{"dimension": d, "key": k, "count": n} for (d, k), n in sorted(deltas.items()) if n]
+    if not rows:
+        return
+    stmt = _dialect_insert(db)(ProductStat)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductStat.dimension, ProductStat.key],
+        set_={"count": ProductStat.count + stmt.excluded["count"]},
+    )
+    with DB_QUERY_SECONDS.time("upsert.stats"):
+        db.execute(stmt, rows)
+
+def _dialect_insert(db: Session):
+    """INSERT construct supporting ON CONFLICT for the session's backend."""
+    name = db.get_bind().dialect.name
+    return postgresql.insert if name == "postgresql" else sqlite.insert
+
+def _load_upsert_state(db: Session, asins: List[str]) -> dict:
+    """One query: current product fields plus the newest history price per ASIN."""
+    cols = _UPSERT_FIELDS + _HISTORY_FIELDS
+    stmt = select(Product.asin, *[getattr(Product, f) for f in cols]).where(Product.asin.in_(asins))
+    with DB_QUERY_SECONDS.time("upsert.load_state"):
+        return {row["asin"]: {f: row[f] for f in cols} for row in db.execute(stmt).mappings()}
+
+_HISTORY_COPY_COLUMNS = ("asin", "price", "price_raw", "currency", "seen_at")
+
+def _insert_history(db: Session, rows: List[dict]) -> None:
+    """Append price_history rows: COPY on Postgres/psycopg 3, executemany elsewhere."""
+    conn = db.connection()
+    with DB_QUERY_SECONDS.time("upsert.history"):
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg":
+            cols = ", ".join(_HISTORY_COPY_COLUMNS)
+            # same connection, so the COPY is part of the session's transaction
+            with conn.connection.driver_connection.cursor() as cur:
+                with cur.copy(f"COPY price_history ({cols}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(tuple(row[c] for c in _HISTORY_COPY_COLUMNS))
+        else:
+            db.execute(insert(PriceHistory), rows)
+    HISTORY_ROWS_WRITTEN.inc(len(rows))
+
+def bulk_upsert_products(
+    db: Session,
+    items: List[dict],
+    batch_size: int = 500,
+    seen_at: Optional[datetime] = None,
+    alerts: bool = True,
+) -> int:
+    """
+    Set-based equivalent of upsert_products: same "changed" count and history rules.
+    Per batch: one SELECT for existing rows, one
+    INSERT ... ON CONFLICT(asin) DO UPDATE executemany for products and one
+    executemany (COPY on Postgres) for price_history. Everything commits in a
+    single transaction.
+    `seen_at` stamps new history points (default: now), e.g. when replaying cached pages.
+    `alerts=False` skips alert matching, for changes that are not live (a replay).
+    """
+    ins = _dialect_insert(db)
+    changed = 0
+    wrote = False
+    stat_deltas: dict = {}
+    price_changes: List[PriceChange] = []
+    now = seen_at or datetime.utcnow()
+    try:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            asins = list({(it.get("asin") or "").strip() for it in batch} - {""})
+            if not asins:
+                continue
+            state = _load_upsert_state(db, asins)
+
+            to_write: dict = {}
+            history: List[dict] = []
+            for it in batch:
+                asin = (it.get("asin") or "").strip()
+                if not asin:
+                    continue
+                price = it.get("price")
+                price_raw = it.get("price_raw")
+                currency = it.get("currency") or _extract_currency(price_raw or "")
+                incoming = {
+                    "title": it.get("title"),
+                    "product_url": it.get("product_url"),
+                    "image_url": it.get("image_url"),
+                    "price": price,
+                    "price_raw": price_raw,
+                    "currency": currency,
+                    "rating": it.get("rating"),
+                    "rating_count": it.get("rating_count"),
+                }
+                st = state.get(asin)
+                if st is not None:
+                    before = product_stat_keys(st["currency"], st["price"], st["rating"])
+                    dirty = False
+                    for fld, val in incoming.items():
+                        if val is not None and st[fld] != val:
+                            st[fld] = val
+                            dirty = True
+                    if price is not None and st["last_history_price"] != price:
+                        history.append({
+                            "asin": asin, "price": price, "price_raw": price_raw, "currency": currency, "seen_at": now,
+                        })
+                        price_changes.append(
+                            PriceChange(asin, st["title"], st["currency"], st["last_history_price"], price)
+                        )
+                        st["last_history_price"], st["last_seen_at"] = price, now
+                        to_write[asin] = st
+                    if dirty:
+                        to_write[asin] = st
+                        changed += 1
+                        after = product_stat_keys(st["currency"], st["price"], st["rating"])
+                        _count_stat_change(stat_deltas, before, after)
+                else:
+                    st = dict(incoming, title=it.get("title", ""), product_url=it.get("product_url", ""))
+                    st["last_history_price"] = price
+                    st["last_seen_at"] = now if price is not None else None
+                    if price is not None:
+                        history.append({
+                            "asin": asin, "price": price, "price_raw": price_raw, "currency": currency, "seen_at": now,
+                        })
+                        price_changes.append(PriceChange(asin, st["title"], currency, None, price))
+                    state[asin] = to_write[asin] = st
+                    changed += 1
+                    _count_stat_change(stat_deltas, (), product_stat_keys(st["currency"], st["price"], st["rating"]))
+
+            if to_write:
+                stmt = ins(Product)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Product.asin],
+                    set_={f: stmt.excluded[f] for f in _UPSERT_FIELDS + _HISTORY_FIELDS},
+                )
+                with DB_QUERY_SECONDS.time("upsert.products"):
+                    db.execute(stmt, [
+                        {"asin": asin, **{f: st[f] for f in _UPSERT_FIELDS + _HISTORY_FIELDS}}
+                        for asin, st in to_write.items()
+                    ])
+                wrote = True
+            if history:
+                _insert_history(db, history)
+        apply_stat_deltas(db, stat_deltas)
+        enqueued = _enqueue_alerts(db, price_changes) if alerts else 0
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _alerts_committed(enqueued)
+    if wrote:
+        products_cache.invalidate()
+    return changed
+
+def backfill_last_history(db: Session) -> int:
+    """Populate Product.last_history_price/last_seen_at from the newest price_history row."""
+    newest = (
+        select(PriceHistory)
+        .where(PriceHistory.asin == Product.asin)
+        .order_by(PriceHistory.seen_at.desc(), PriceHistory.id.desc())
+        .limit(1)
+    )
+    res = db.execute(
+        update(Product).values(
+            last_history_price=newest.with_only_columns(PriceHistory.price).scalar_subquery(),
+            last_seen_at=newest.with_only_columns(PriceHistory.seen_at).scalar_subquery(),
+        )
+    )
+    db.commit()
+    return res.rowcount
+
+_SORT_COLUMNS = {
+    "price": Product.price,
+    "rating": Product.rating,
+    "created_at": Product.created_at,
+    "updated_at": Product.updated_at,
+    "title": Product.title,
+}
+
+def _filter_products(
     db: Session,
+    stmt,
     q: Optional[str],
     min_rating: Optional[float],
     max_price: Optional[float],
-    page: int,
-    page_size: int,
-    order_by: str,
-    order: str,
-) -> Tuple[List[Product], int]:
-    stmt = select(Product)
-    if q:
+):
+    """Apply the /products filters to `stmt`. Returns (stmt, fts match expression or None)."""
+    match = fts_match_expr(q) if q and fts_available(db) else None
+    if match:
+        stmt = stmt.join(products_fts, products_fts.c.rowid == Product.id).filter(
+            text("products_fts MATCH :match").bindparams(match=match)
+        )
+    elif q:
         stmt = stmt.filter(Product.title.ilike(f"%{q}%"))
     if min_rating is not None:
         stmt = stmt.filter(Product.rating >= min_rating)
     if max_price is not None:
         stmt = stmt.filter(Product.price <= max_price)
+    return stmt, match
 
-    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+def _order_products(stmt, match: Optional[str], order_by: str, order: str):
+    if order_by == "relevance" and match:
+        # best match first regardless of `order`
+        return stmt.order_by(fts_rank(), Product.id)
+    col = _SORT_COLUMNS.get(order_by, Product.created_at)
+    return stmt.order_by(*order_clause(col, Product.id, order))
 
-    colmap = {
-        "price": Product.price,
-        "rating": Product.rating,
-        "created_at": Product.created_at,
-        "updated_at": Product.updated_at,
-        "title": Product.title,
-    }
-    col = colmap.get(order_by, Product.created_at)
-    stmt = stmt.order_by(asc(col) if order == "asc" else desc(col))
+def list_products(
+    db: Session,
+    q: Optional[str],
+    min_rating: Optional[float],
+    max_price: Optional[float],
+    page: int,
+    page_size: int,
+    order_by: str,
+    order: str,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+    columns: Optional[List[str]] = None,
+) -> Tuple[list, Optional[int]]:
+    """
+    Offset pagination by default; with `cursor` (see pagination.py) the page is
+    read by keyset from after the cursor row and `page` is ignored.
+    Total is None when `with_total` is False.
+    With `columns`, rows are plain Row tuples of just those Product columns
+    instead of ORM objects.
+    """
+    entity = select(Product) if columns is None else select(*[getattr(Product, c) for c in columns])
+    stmt, match = _filter_products(db, entity, q, min_rating, max_price)
 
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-    items = db.execute(stmt).scalars().all()
+    total = None
+    if with_total:
+        with DB_QUERY_SECONDS.time("list_products.count"):
+            total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one()
+
+    stmt = _order_products(stmt, match, order_by, order)
+    if cursor:
+        if order_by == "relevance" and match:
+            raise InvalidCursor("Cursor pagination is not available for order_by=relevance.")
+        col = _SORT_COLUMNS.get(order_by, Product.created_at)
+        after = decode_cursor(cursor, order_by, order)
+        stmt = stmt.filter(after_cursor(col, Product.id, order, after["value"], after["id"]))
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+    stmt = stmt.limit(page_size)
+    with DB_QUERY_SECONDS.time("list_products.page"):
+        result = db.execute(stmt)
+        items = result.scalars().all() if columns is None else result.all()
     return items, total
 
-def get_history(db: Session, asin: str, limit: int = 200) -> List[PriceHistory]:
+def iter_product_rows(
+    db: Session,
+    columns: List[str],
+    q: Optional[str],
+    min_rating: Optional[float],
+    max_price: Optional[float],
+    order_by: str,
+    order: str,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    batch_size: int = 1000,
+) -> Iterator[list]:
+    """
+    Stream filtered product rows (tuples of `columns`) in batches from a
+    server-side cursor, so exports run in constant memory.
+    """
+    stmt = select(*[getattr(Product, c) for c in columns])
+    stmt, match = _filter_products(db, stmt, q, min_rating, max_price)
+    stmt = _order_products(stmt, match, order_by, order)
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        yield batch
+
+def iter_history_rows(
+    db: Session,
+    columns: List[str],
+    q: Optional[str],
+    min_rating: Optional[float],
+    max_price: Optional[float],
+    asin: Optional[str] = None,
+    batch_size: int = 5000,
+) -> Iterator[list]:
+    """Stream price_history tuples for products matching the /products filters."""
+    stmt = select(*[getattr(PriceHistory, c) for c in columns]).join(Product, Product.asin == PriceHistory.asin)
+    stmt, _ = _filter_products(db, stmt, q, min_rating, max_price)
+    if asin:
+        stmt = stmt.filter(PriceHistory.asin == asin)
+    stmt = stmt.order_by(PriceHistory.asin, PriceHistory.seen_at, PriceHistory.id)
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        yield batch
+
+def _history_range(stmt, since: Optional[datetime], until: Optional[datetime]):
+    if since is not None:
+        stmt = stmt.where(PriceHistory.seen_at >= since)
+    if until is not None:
+        stmt = stmt.where(PriceHistory.seen_at < until)
+    return stmt
+
+# Compacted tiers (price_history_rollups) are read alongside raw price_history:
+# as points, each rollup stands in for its newest price; as buckets, it merges
+# into the bucket containing its start.
+
+def _rollup_range(stmt, since: Optional[datetime], until: Optional[datetime]):
+    if since is not None:
+        stmt = stmt.where(PriceHistoryRollup.last_seen_at >= since)
+    if until is not None:
+        stmt = stmt.where(PriceHistoryRollup.last_seen_at < until)
+    return stmt
+
+def get_rollups(
+    db: Session,
+    asins: List[str],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[PriceHistoryRollup]:
+    """Rollups of each ASIN by (asin, last_seen_at); at most `limit` per ASIN."""
+    order = (PriceHistoryRollup.asin, PriceHistoryRollup.last_seen_at, PriceHistoryRollup.id)
+    stmt = _rollup_range(select(PriceHistoryRollup).where(PriceHistoryRollup.asin.in_(asins)), since, until)
+    if limit is not None:
+        ranked = _rollup_range(
+            select(
+                PriceHistoryRollup.id,
+                func.row_number().over(
+                    partition_by=PriceHistoryRollup.asin,
+                    order_by=(PriceHistoryRollup.last_seen_at, PriceHistoryRollup.id),
+                ).label("rn"),
+            ).where(PriceHistoryRollup.asin.in_(asins)),
+            since,
+            until,
+        ).subquery()
+        stmt = (
+            select(PriceHistoryRollup)
+            .join(ranked, ranked.c.id == PriceHistoryRollup.id)
+            .where(ranked.c.rn <= limit)
+        )
+    with DB_QUERY_SECONDS.time("history.rollups"):
+        return db.execute(stmt.order_by(*order)).scalars().all()
+
+def _rollup_point(r: PriceHistoryRollup) -> PriceHistory:
+    """A compacted bucket read as its newest point (transient, never added to the session)."""
+    return PriceHistory(asin=r.asin, price=r.last_price, price_raw=r.last_price_raw, currency=r.currency,
+                        seen_at=r.last_seen_at)
+
+def get_history(
+    db: Session,
+    asin: str,
+    limit: int = 200,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[PriceHistory]:
+    """First `limit` points by seen_at, compacted ones included."""
     stmt = (
         select(PriceHistory)
         .where(PriceHistory.asin == asin)
         .order_by(PriceHistory.seen_at.asc())
         .limit(limit)
     )
-    return db.execute(stmt).scalars().all()
+    with DB_QUERY_SECONDS.time("history.raw"):
+        raw = db.execute(_history_range(stmt, since, until)).scalars().all()
+    compacted = [_rollup_point(r) for r in get_rollups(db, [asin], since, until, limit)]
+    if not compacted:
+        return raw
+    return sorted(compacted + raw, key=lambda p: p.seen_at)[:limit]
+
+def get_history_many(
+    db: Session,
+    asins: List[str],
+    limit: int = 200,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[PriceHistory]:
+    """Like get_history for many ASINs in one query: the first `limit` points of each, by (asin, seen_at)."""
+    ranked = _history_range(
+        select(
+            PriceHistory.id,
+            func.row_number().over(
+                partition_by=PriceHistory.asin, order_by=(PriceHistory.seen_at, PriceHistory.id)
+            ).label("rn"),
+        ).where(PriceHistory.asin.in_(asins)),
+        since,
+        until,
+    ).subquery()
+    stmt = (
+        select(PriceHistory)
+        .join(ranked, ranked.c.id == PriceHistory.id)
+        .where(ranked.c.rn <= limit)
+        .order_by(PriceHistory.asin, PriceHistory.seen_at, PriceHistory.id)
+    )
+    with DB_QUERY_SECONDS.time("history.raw_many"):
+        raw = db.execute(stmt).scalars().all()
+    compacted = [_rollup_point(r) for r in get_rollups(db, asins, since, until, limit)]
+    if not compacted:
+        return raw
+    out: List[PriceHistory] = []
+    per_asin: dict = {}
+    for p in sorted(compacted + raw, key=lambda p: (p.asin, p.seen_at)):
+        per_asin[p.asin] = per_asin.get(p.asin, 0) + 1
+        if per_asin[p.asin] <= limit:
+            out.append(p)
+    return out
+
+def history_span(db: Session, asin: str, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """(points, first seen_at, last seen_at) of an ASIN's history in range; a rollup counts as one point."""
+    stmt = select(func.count(), func.min(PriceHistory.seen_at), func.max(PriceHistory.seen_at)).where(
+        PriceHistory.asin == asin
+    )
+    count, first, last = db.execute(_history_range(stmt, since, until)).one()
+    r_stmt = select(
+        func.count(), func.min(PriceHistoryRollup.first_seen_at), func.max(PriceHistoryRollup.last_seen_at)
+    ).where(PriceHistoryRollup.asin == asin)
+    r_count, r_first, r_last = db.execute(_rollup_range(r_stmt, since, until)).one()
+    if not r_count:
+        return count, first, last
+    return count + r_count, min(filter(None, (first, r_first))), max(filter(None, (last, r_last)))
+
+def _bucket_start(db: Session, unit: str):
+    """SQL expression truncating seen_at to the start of its hour/day/week (weeks start Monday)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(unit, PriceHistory.seen_at)
+    if unit == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", PriceHistory.seen_at)
+    if unit == "day":
+        return func.date(PriceHistory.seen_at)
+    return func.date(PriceHistory.seen_at, "weekday 0", "-6 days")
+
+def get_history_buckets(
+    db: Session,
+    asins: List[str],
+    unit: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Downsample history server-side: one row per (asin, bucket) with min/max/last
+    price and point count, in a single windowed pass over price_history.
+    """
+    bucket = _bucket_start(db, unit).label("bucket")
+    part = (PriceHistory.asin, bucket)
+    inner = _history_range(
+        select(
+            PriceHistory.asin,
+            bucket,
+            PriceHistory.price.label("last_price"),
+            PriceHistory.seen_at.label("last_seen_at"),
+            PriceHistory.currency,
+            func.min(PriceHistory.price).over(partition_by=part).label("min_price"),
+            func.max(PriceHistory.price).over(partition_by=part).label("max_price"),
+            func.count().over(partition_by=part).label("count"),
+            func.row_number().over(
+                partition_by=part, order_by=(PriceHistory.seen_at.desc(), PriceHistory.id.desc())
+            ).label("rn"),
+        ).where(PriceHistory.asin.in_(asins)),
+        since,
+        until,
+    ).subquery()
+    stmt = (
+        select(inner.c.asin, inner.c.bucket, inner.c.min_price, inner.c.max_price,
+               inner.c.last_price, inner.c.last_seen_at, inner.c.currency, inner.c.count)
+        .where(inner.c.rn == 1)
+        .order_by(inner.c.asin, inner.c.bucket)
+    )
+    out = []
+    with DB_QUERY_SECONDS.time("history.buckets"):
+        rows = db.execute(stmt).mappings().all()
+    for row in rows:
+        start = row["bucket"]
+        if isinstance(start, str):
+            start = datetime.fromisoformat(start)
+        out.append({**row, "bucket": start})
+
+    rollups = get_rollups(db, asins, since, until)
+    if not rollups:
+        return out
+    merged = {(b["asin"], b["bucket"]): b for b in out}
+    for r in rollups:
+        key = (r.asin, _truncate(r.bucket_start, unit))
+        merged[key] = merge_buckets(merged.get(key), {
+            "asin": r.asin, "bucket": key[1], "min_price": r.min_price, "max_price": r.max_price,
+            "last_price": r.last_price, "last_seen_at": r.last_seen_at, "currency": r.currency, "count": r.count,
+        })
+    return [merged[k] for k in sorted(merged)]
+
+def _truncate(dt: datetime, unit: str) -> datetime:
+    """Python twin of _bucket_start."""
+    if unit == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if unit == "day" else day - timedelta(days=day.weekday())
+
+def merge_buckets(a: Optional[dict], b: dict) -> dict:
+    """Combine two aggregates of the same bucket (min/max/count/newest price)."""
+    if a is None:
+        return b
+    newest = a if a["last_seen_at"] >= b["last_seen_at"] else b
+    lows = [v for v in (a["min_price"], b["min_price"]) if v is not None]
+    highs = [v for v in (a["max_price"], b["max_price"]) if v is not None]
+    return {
+        **newest,
+        "min_price": min(lows) if lows else None,
+        "max_price": max(highs) if highs else None,
+        "count": a["count"] + b["count"],
+    }
+
+# ---------- Scrape jobs ----------
+
+def create_job(db: Session, kind: str, payload: str, watch_id: Optional[int] = None) -> ScrapeJob:
+    job = ScrapeJob(kind=kind, payload=payload, status="queued", watch_id=watch_id)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def get_job(db: Session, job_id: int) -> Optional[ScrapeJob]:
+    return db.get(ScrapeJob, job_id)
+
+def claim_next_job(db: Session) -> Optional[ScrapeJob]:
+    """Move the oldest queued job to running. Safe against concurrent claimers."""
+    while True:
+        now = datetime.utcnow()
+        with DB_QUERY_SECONDS.time("jobs.claim"):
+            job_id = db.execute(
+                select(ScrapeJob.id).where(ScrapeJob.status == "queued").order_by(ScrapeJob.id.asc()).limit(1)
+            ).scalar_one_or_none()
+        if job_id is None:
+            return None
+        res = db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id == job_id, ScrapeJob.status == "queued")
+            .values(status="running", started_at=now, heartbeat_at=now)
+        )
+        db.commit()
+        if res.rowcount == 1:
+            return db.get(ScrapeJob, job_id)
+
+def add_job_progress(db: Session, job_id: int, pages: int = 0, items: int = 0, upserted: int = 0) -> None:
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id == job_id)
+        .values(
+            pages_done=ScrapeJob.pages_done + pages,
+            items_found=ScrapeJob.items_found + items,
+            rows_upserted=ScrapeJob.rows_upserted + upserted,
+            heartbeat_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+
+def heartbeat_jobs(db: Session, job_ids: List[int]) -> None:
+    """Extend the lease of jobs this process is still running."""
+    if not job_ids:
+        return
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id.in_(job_ids), ScrapeJob.status == "running")
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    db.commit()
+
+def finish_job(db: Session, job_id: int, error: Optional[str] = None) -> None:
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id == job_id)
+        .values(status="failed" if error else "done", error=error, finished_at=datetime.utcnow())
+    )
+    db.commit()
+
+# ---------- Precomputed stats ----------
+
+def get_product_stats(db: Session, dimension: str) -> dict:
+    """{key: count} of one product_stats dimension, empty buckets left out."""
+    with DB_QUERY_SECONDS.time("stats.read"):
+        rows = db.execute(
+            select(ProductStat.key, ProductStat.count)
+            .where(ProductStat.dimension == dimension, ProductStat.count > 0)
+        ).all()
+    return dict(rows)
+
+def get_price_drops(db: Session, period: str, limit: int = 20, currency: Optional[str] = None) -> List[PriceDrop]:
+    stmt = select(PriceDrop).where(PriceDrop.period == period)
+    if currency:
+        stmt = stmt.where(PriceDrop.currency == currency)
+    with DB_QUERY_SECONDS.time("stats.drops"):
+        return db.execute(
+            stmt.order_by(PriceDrop.drop_pct.desc(), PriceDrop.asin).limit(limit)
+        ).scalars().all()
+
+def price_drops_computed_at(db: Session) -> Optional[datetime]:
+    return db.scalar(select(func.max(PriceDrop.computed_at)))
+
+def count_jobs_by_status(db: Session) -> dict:
+    return dict(db.execute(select(ScrapeJob.status, func.count()).group_by(ScrapeJob.status)).all())
+
+def requeue_stale_jobs(db: Session, stale_before: datetime) -> int:
+    """Running jobs whose worker stopped heartbeating before `stale_before` go back to the queue."""
+    last_seen = func.coalesce(ScrapeJob.heartbeat_at, ScrapeJob.started_at)
+    res = db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.status == "running", or_(last_seen.is_(None), last_seen < stale_before))
+        .values(status="queued", pages_done=0, items_found=0, rows_upserted=0, heartbeat_at=None)
+    )
+    db.commit()
+    return res.rowcount
+
+# ---------- Watched searches ----------
+
+def create_watch(db: Session, **fields) -> WatchedSearch:
+    watch = WatchedSearch(**fields)
+    db.add(watch)
+    db.commit()
+    db.refresh(watch)
+    return watch
+
+def list_watches(db: Session) -> List[WatchedSearch]:
+    return db.execute(select(WatchedSearch).order_by(WatchedSearch.id)).scalars().all()
+
+def delete_watch(db: Session, watch_id: int) -> bool:
+    # not left to ON DELETE CASCADE: databases that predate foreign_keys=ON may
+    # hold orphans, and SQLite reuses the id for the next watch
+    db.execute(delete(WatchedProduct).where(WatchedProduct.watch_id == watch_id))
+    res = db.execute(delete(WatchedSearch).where(WatchedSearch.id == watch_id))
+    db.commit()
+    return res.rowcount == 1
+
+def due_watches(db: Session, now: datetime) -> List[WatchedSearch]:
+    return db.execute(
+        select(WatchedSearch).where(WatchedSearch.enabled.is_(True), WatchedSearch.next_run_at <= now)
+    ).scalars().all()
+
+def watch_change_rates(db: Session, watch_ids: List[int], since: datetime, now: datetime) -> dict:
+    """
+    watch id -> price changes per product per day since `since`, over the ASINs
+    the watch has returned. Watches without products are left out.
+    """
+    if not watch_ids:
+        return {}
+    days = max((now - since).total_seconds() / 86400, 1e-9)
+    stmt = (
+        select(
+            WatchedProduct.watch_id,
+            func.count(func.distinct(WatchedProduct.asin)),
+            func.count(PriceHistory.id),
+        )
+        .select_from(WatchedProduct)
+        .join(Product, Product.asin == WatchedProduct.asin)
+        # a product's first point is stamped no later than its created_at; only later ones are changes
+        .outerjoin(PriceHistory, and_(
+            PriceHistory.asin == WatchedProduct.asin,
+            PriceHistory.seen_at >= since,
+            PriceHistory.seen_at > Product.created_at,
+        ))
+        .where(WatchedProduct.watch_id.in_(watch_ids))
+        .group_by(WatchedProduct.watch_id)
+    )
+    return {wid: changes / (products * days) for wid, products, changes in db.execute(stmt) if products}
+
+def claim_watch(
+    db: Session, watch: WatchedSearch, now: datetime, next_run_at: datetime, change_rate: Optional[float]
+) -> bool:
+    """Reschedule a due watch; False if another scheduler got to it first."""
+    res = db.execute(
+        update(WatchedSearch)
+        .where(WatchedSearch.id == watch.id, WatchedSearch.next_run_at == watch.next_run_at)
+        .values(next_run_at=next_run_at, last_run_at=now, change_rate=change_rate)
+    )
+    db.commit()
+    return res.rowcount == 1
+
+def set_watch_job(db: Session, watch_id: int, job_id: int) -> None:
+    db.execute(update(WatchedSearch).where(WatchedSearch.id == watch_id).values(last_job_id=job_id))
+    db.commit()
+
+def link_watch_products(db: Session, watch_id: int, asins: List[str], seen_at: Optional[datetime] = None) -> None:
+    """Record that a watch's scrape returned these ASINs."""
+    asins = list({a for a in asins if a})
+    if not asins:
+        return
+    seen_at = seen_at or datetime.utcnow()
+    stmt = _dialect_insert(db)(WatchedProduct)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[WatchedProduct.watch_id, WatchedProduct.asin],
+        set_={"last_seen_at": stmt.excluded.last_seen_at},
+    )
+    db.execute(stmt, [{"watch_id": watch_id, "asin": a, "last_seen_at": seen_at} for a in asins])
+    db.commit()
+
+# ---------- Price alerts ----------
+
+def create_alert_rule(db: Session, **fields) -> AlertRule:
+    rule = AlertRule(**fields)
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    alert_index.invalidate()
+    return rule
+
+def list_alert_rules(db: Session) -> List[AlertRule]:
+    return db.execute(select(AlertRule).order_by(AlertRule.id)).scalars().all()
+
+def delete_alert_rule(db: Session, rule_id: int) -> bool:
+    res = db.execute(delete(AlertRule).where(AlertRule.id == rule_id))
+    db.commit()
+    alert_index.invalidate()
+    return res.rowcount == 1
+
+def list_alerts(db: Session, status: Optional[str] = None, limit: int = 50) -> List[AlertOutbox]:
+    stmt = select(AlertOutbox)
+    if status:
+        stmt = stmt.where(AlertOutbox.status == status)
+    return db.execute(stmt.order_by(AlertOutbox.id.desc()).limit(limit)).scalars().all()
+
+def claim_alerts(
+    db: Session, now: datetime, lease_until: datetime, limit: int, default_url: Optional[str] = None,
+) -> List[AlertOutbox]:
+    """
+    Lease up to `limit` due outbox rows: each gets an attempt and is hidden
+    until `lease_until`, so a dispatcher that dies mid-send is retried then.
+    Safe against concurrent claimers.
+    """
+    stmt = select(AlertOutbox.id, AlertOutbox.next_attempt_at).where(
+        AlertOutbox.status == "pending", AlertOutbox.next_attempt_at <= now,
+    )
+    if not default_url:
+        stmt = stmt.where(AlertOutbox.webhook_url.is_not(None))
+    claimed = []
+    for alert_id, due in db.execute(stmt.order_by(AlertOutbox.next_attempt_at, AlertOutbox.id).limit(limit)).all():
+        res = db.execute(
+            update(AlertOutbox)
+            .where(AlertOutbox.id == alert_id, AlertOutbox.status == "pending", AlertOutbox.next_attempt_at == due)
+            .values(next_attempt_at=lease_until, attempts=AlertOutbox.attempts + 1)
+        )
+        if res.rowcount == 1:
+            claimed.append(alert_id)
+    db.commit()
+    if not claimed:
+        return []
+    return db.execute(select(AlertOutbox).where(AlertOutbox.id.in_(claimed)).order_by(AlertOutbox.id)).scalars().all()
+
+def finish_alert(
+    db: Session, alert_id: int, error: Optional[str] = None, retry_at: Optional[datetime] = None,
+) -> None:
+    """Sent when `error` is None; else retried at `retry_at`, or failed for good without one."""
+    if error is None:
+        values = {"status": "sent", "sent_at": datetime.utcnow(), "last_error": None}
+    elif retry_at is not None:
+        values = {"last_error": error, "next_attempt_at": retry_at}
+    else:
+        values = {"status": "failed", "last_error": error}
+    db.execute(update(AlertOutbox).where(AlertOutbox.id == alert_id).values(**values))
+    db.commit()
+
+def count_alerts_by_status(db: Session) -> dict:
+    return dict(db.execute(select(AlertOutbox.status, func.count()).group_by(AlertOutbox.status)).all())
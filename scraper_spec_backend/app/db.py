@@ -1,11 +1,86 @@
+"""
+Engines and sessions.
 
-from sqlalchemy import create_engine
+DB_URL selects the database and the mode. A sync URL (sqlite:///scraper.db,
+postgresql://... via psycopg 3) serves everything through sync sessions, with
+request-time reads run in the threadpool. An async-driver URL
+(sqlite+aiosqlite:///..., postgresql+asyncpg://..., postgresql+psycopg_async://...)
+also builds an AsyncEngine that API reads await on the event loop; scrapes,
+jobs, exports and migrations keep using the sync engine on the same database.
+
+Writes go through SessionLocal; reads through ReadSessionLocal /
+AsyncReadSessionLocal, on their own connection pool (read-only on SQLite).
+"""
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
-DB_URL = "sqlite:///scraper.db"
+DB_URL = os.getenv("DB_URL") or "sqlite:///scraper.db"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# async driver -> sync driver for the same database
+_SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql+psycopg",
+    "postgresql+psycopg_async": "postgresql+psycopg",
+}
+
+_url = make_url(DB_URL)
+if _url.drivername == "postgresql":
+    # plain postgresql:// means psycopg 3 here (SQLAlchemy's default would be psycopg2)
+    _url = _url.set(drivername="postgresql+psycopg")
+ASYNC_MODE = _url.drivername in _SYNC_DRIVERS
+SYNC_DB_URL = _url.set(drivername=_SYNC_DRIVERS[_url.drivername]) if ASYNC_MODE else _url
+IS_SQLITE = _url.get_backend_name() == "sqlite"
+
+
+def _engine_kwargs() -> dict:
+    if IS_SQLITE:
+        return {"connect_args": {"check_same_thread": False}}
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_pre_ping": True}
+
 
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        # WAL lets readers run alongside the single writer; NORMAL is durable enough under WAL
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        # off by default in SQLite; the schema's ON DELETE CASCADE relies on it
+        cur.execute("PRAGMA foreign_keys=ON")
+        if read_only:
+            cur.execute("PRAGMA query_only=1")
+        cur.close()
+    return on_connect
+
+
+def _make_engine(url, read_only: bool = False):
+    eng = create_engine(url, **_engine_kwargs())
+    if IS_SQLITE:
+        event.listen(eng, "connect", _sqlite_pragmas(read_only))
+    return eng
+
+
+engine = _make_engine(SYNC_DB_URL)
+read_engine = _make_engine(SYNC_DB_URL, read_only=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
+
+async_read_engine = None
+AsyncReadSessionLocal = None
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_read_engine = create_async_engine(_url, **_engine_kwargs())
+    if IS_SQLITE:
+        event.listen(async_read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+    AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     pass
@@ -0,0 +1,81 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+import threading
+
+from selenium import webdriver
+
+
+class DriverPool:
+    """
+    Keeps warm headless Chrome sessions and leases them to page loads.
+    - At most `size` drivers exist at once; extra callers block until one is returned
+    - A driver is recycled after `max_uses` leases
+    - A driver whose lease raised is treated as crashed and discarded
+    """
+
+    def __init__(self, factory: Callable[[], webdriver.Chrome], size: int = 2, max_uses: int = 25):
+        self._factory = factory
+        self._max_uses = max(1, max_uses)
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._lock = threading.Lock()
+        self._idle: List[webdriver.Chrome] = []
+        self._uses: dict[int, int] = {}
+        self._closed = False
+
+    @contextmanager
+    def lease(self) -> Iterator[webdriver.Chrome]:
+        self._slots.acquire()
+        try:
+            drv = self._checkout()
+            ok = False
+            try:
+                yield drv
+                ok = True
+            finally:
+                self._checkin(drv, healthy=ok)
+        finally:
+            self._slots.release()
+
+    def _checkout(self) -> webdriver.Chrome:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Driver pool is shut down.")
+            if self._idle:
+                return self._idle.pop()
+        drv = self._factory()
+        with self._lock:
+            self._uses[id(drv)] = 0
+        return drv
+
+    def _checkin(self, drv: webdriver.Chrome, healthy: bool) -> None:
+        with self._lock:
+            uses = self._uses.get(id(drv), 0) + 1
+            keep = healthy and not self._closed and uses < self._max_uses
+            if keep:
+                self._uses[id(drv)] = uses
+                self._idle.append(drv)
+                return
+            self._uses.pop(id(drv), None)
+        _quit(drv)
+
+    def shutdown(self) -> None:
+        """Quit every idle driver. Leased drivers are quit when they come back."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for drv in idle:
+                self._uses.pop(id(drv), None)
+        for drv in idle:
+            _quit(drv)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "alive": len(self._uses), "closed": self._closed}
+
+
+def _quit(drv: webdriver.Chrome) -> None:
+    try:
+        drv.quit()
+    except Exception:
+        pass
@@ -0,0 +1,208 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple
+import random
+import threading
+import time
+
+from .scraper import (
+    build_search_url,
+    host_for_domain,
+    host_for_url,
+    find_next_url,
+)
+from .fetchers import browser_fetch
+from .page_cache import PageCache, cached
+from .pipeline import ParsePool, parse_pool
+from .metrics import SCRAPE_PHASE_SECONDS
+from . import tracing
+
+
+@dataclass
+class ScrapeTarget:
+    """One search to walk: a keyword on a domain, or a full search URL."""
+    label: str
+    url: str
+    host: str
+
+    @classmethod
+    def for_keyword(cls, keyword: str, domain: str = "amazon.com") -> "ScrapeTarget":
+        return cls(label=f"{keyword}@{domain}", url=build_search_url(keyword, domain), host=host_for_domain(domain))
+
+    @classmethod
+    def for_url(cls, search_url: str) -> "ScrapeTarget":
+        return cls(label=search_url, url=search_url, host=host_for_url(search_url))
+
+
+@dataclass
+class EngineStats:
+    targets: int = 0
+    pages: int = 0
+    items: int = 0
+    elapsed_sec: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+    @property
+    def pages_per_min(self) -> float:
+        return self.pages * 60.0 / self.elapsed_sec if self.elapsed_sec else 0.0
+
+    @property
+    def items_per_min(self) -> float:
+        return self.items * 60.0 / self.elapsed_sec if self.elapsed_sec else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "targets": self.targets,
+            "pages": self.pages,
+            "items": self.items,
+            "elapsed_sec": round(self.elapsed_sec, 3),
+            "pages_per_min": round(self.pages_per_min, 2),
+            "items_per_min": round(self.items_per_min, 2),
+            "errors": self.errors,
+        }
+
+
+class HostThrottle:
+    """
+    Politeness per host rather than per process:
+    - at most `concurrency` page loads in flight per host
+    - consecutive page loads on a host start at least uniform(lo, hi) seconds apart
+    """
+
+    def __init__(self, delay: Tuple[float, float] = (2.5, 5.0), concurrency: int = 1):
+        self._delay = delay
+        self._concurrency = max(1, concurrency)
+        self._lock = threading.Lock()
+        self._sems: Dict[str, threading.Semaphore] = {}
+        self._next_at: Dict[str, float] = {}
+
+    def _sem(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.Semaphore(self._concurrency)
+            return sem
+
+    def _reserve(self, host: str) -> float:
+        """Book the next start time on `host`; return how long to wait for it."""
+        lo, hi = self._delay
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_at.get(host, 0.0))
+            self._next_at[host] = start + random.uniform(lo, hi)
+        return start - now
+
+    @contextmanager
+    def slot(self, host: str) -> Iterator[None]:
+        sem = self._sem(host)
+        sem.acquire()
+        try:
+            wait = self._reserve(host)
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            sem.release()
+
+
+class ScrapeEngine:
+    """Runs many scrape targets over a bounded worker pool with per-host throttling."""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        per_host_concurrency: int = 1,
+        delay: Tuple[float, float] = (2.5, 5.0),
+        fetch: Callable[[str], Optional[str]] = browser_fetch,
+        cache: Optional[PageCache] = None,
+        parser: ParsePool = parse_pool,
+        use_cache: bool = True,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.throttle = HostThrottle(delay=delay, concurrency=per_host_concurrency)
+        self._fetch = fetch
+        self.cache = cache
+        # False: always fetch, but keep storing what was fetched in the cache
+        self.use_cache = use_cache
+        self.parser = parser
+        self._lock = threading.Lock()
+
+    def _parsed_pages(
+        self, target: ScrapeTarget, max_pages: int, fetch: Callable[[str], Optional[str]]
+    ) -> Iterator["Future[List[Dict]]"]:
+        """Fetch the target's pages in order, handing each to the parse pool without waiting for it."""
+        url, page_no = target.url, 0
+        while url and page_no < max_pages:
+            page_no += 1
+            html = fetch(url)
+            if not html:
+                break
+            yield self.parser.submit(html, target.host)
+            url = find_next_url(html, target.host)
+
+    def run(
+        self,
+        targets: List[ScrapeTarget],
+        max_pages: int = 1,
+        on_page: Optional[Callable[[ScrapeTarget, List[Dict]], None]] = None,
+    ) -> Tuple[List[Dict], EngineStats]:
+        """
+        Scrape every target; return items deduplicated by ASIN plus throughput stats.
+        Pages are parsed in the parse pool while the next one is fetched;
+        `on_page` is called from worker threads with each parsed page, in page
+        order per target.
+        """
+        stats = EngineStats(targets=len(targets))
+        found: Dict[str, Dict] = {}
+        t0 = time.monotonic()
+        trace_parent = tracing.current()
+
+        def deliver(target: ScrapeTarget, parsed: "Future[List[Dict]]") -> None:
+            page_items = parsed.result()
+            if on_page is not None:
+                on_page(target, page_items)
+            with self._lock:
+                stats.pages += 1
+                stats.items += len(page_items)
+                for it in page_items:
+                    if it.get("asin"):
+                        found[it["asin"]] = it
+
+        def record_error(target: ScrapeTarget, e: Exception) -> None:
+            with self._lock:
+                stats.errors.append({"target": target.label, "error": f"{e!s}"})
+
+        def work(target: ScrapeTarget) -> None:
+            def fetch(url: str) -> Optional[str]:
+                with self.throttle.slot(target.host):
+                    with SCRAPE_PHASE_SECONDS.time("fetch"), tracing.span("scrape.fetch", url=url):
+                        return self._fetch(url)
+
+            pending: Deque[Future] = deque()
+            try:
+                with tracing.span("scrape.target", trace_parent, target=target.label):
+                    try:
+                        # cache hits skip the host throttle as well as the browser
+                        for parsed in self._parsed_pages(target, max_pages, cached(fetch, self.cache, read=self.use_cache)):
+                            pending.append(parsed)
+                            while pending and pending[0].done():
+                                deliver(target, pending.popleft())
+                    finally:
+                        # pages fetched before a failure are still delivered, one bad page
+                        # (parse or on_page error) does not drop the ones after it
+                        while pending:
+                            try:
+                                deliver(target, pending.popleft())
+                            except Exception as e:
+                                record_error(target, e)
+            except Exception as e:
+                record_error(target, e)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scrape") as pool:
+            list(pool.map(work, targets))
+
+        stats.elapsed_sec = time.monotonic() - t0
+        return list(found.values()), stats
@@ -0,0 +1,156 @@
+"""
+Streaming exports of products and price history.
+
+Every exporter is a generator that opens its own session: the response body is
+consumed after the request's dependencies have been torn down. Rows come from
+server-side cursors in batches, so memory stays flat for any table size.
+Parquet/Arrow need the optional `pyarrow` package.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Iterator, List
+import csv
+import io
+import json
+
+from .db import ReadSessionLocal
+from .crud import iter_product_rows, iter_history_rows
+
+PRODUCT_EXPORT_COLUMNS = [
+    "asin", "title", "product_url", "image_url",
+    "price", "price_raw", "currency",
+    "rating", "rating_count",
+    "created_at", "updated_at",
+]
+
+HISTORY_EXPORT_COLUMNS = ["asin", "price", "price_raw", "currency", "seen_at"]
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+def _product_batches(**filters) -> Iterator[list]:
+    with ReadSessionLocal() as db:
+        yield from iter_product_rows(db, PRODUCT_EXPORT_COLUMNS, **filters)
+
+
+# ---------- CSV ----------
+
+def stream_products_csv(**filters) -> Iterator[str]:
+    """Yield CSV text for the selected products, one chunk per DB batch."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(PRODUCT_EXPORT_COLUMNS)
+    yield buf.getvalue()
+
+    for batch in _product_batches(**filters):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(batch)
+        yield buf.getvalue()
+
+
+# ---------- Arrow / Parquet ----------
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("Parquet/Arrow exports need the 'pyarrow' package.")
+    return pa, pq
+
+
+def _product_schema(pa):
+    return pa.schema([
+        ("asin", pa.string()),
+        ("title", pa.string()),
+        ("product_url", pa.string()),
+        ("image_url", pa.string()),
+        ("price", pa.float64()),
+        ("price_raw", pa.string()),
+        ("currency", pa.string()),
+        ("rating", pa.float64()),
+        ("rating_count", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])
+
+
+def _to_record_batch(pa, schema, rows: list):
+    cols = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(cols, schema)],
+        schema=schema,
+    )
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose buffered bytes are handed out by take()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def take(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks = []
+        return out
+
+
+def stream_products_arrow(**filters) -> Iterator[bytes]:
+    """Arrow IPC stream: one record batch per DB batch."""
+    pa, _ = _pyarrow()
+    schema = _product_schema(pa)
+
+    def gen() -> Iterator[bytes]:
+        sink = _Drain()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for rows in _product_batches(**filters):
+                writer.write_batch(_to_record_batch(pa, schema, rows))
+                yield sink.take()
+        yield sink.take()
+
+    return gen()
+
+
+def stream_products_parquet(**filters) -> Iterator[bytes]:
+    """Parquet file written one row group per DB batch; bytes are flushed as each group completes."""
+    pa, pq = _pyarrow()
+    schema = _product_schema(pa)
+
+    def gen() -> Iterator[bytes]:
+        sink = _Drain()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        try:
+            for rows in _product_batches(**filters):
+                writer.write_batch(_to_record_batch(pa, schema, rows))
+                yield sink.take()
+        finally:
+            writer.close()
+        yield sink.take()
+
+    return gen()
+
+
+# ---------- NDJSON ----------
+
+def _json_value(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def stream_history_ndjson(**filters) -> Iterator[str]:
+    """One JSON object per price_history row, typed (numbers stay numbers)."""
+    with ReadSessionLocal() as db:
+        for batch in iter_history_rows(db, HISTORY_EXPORT_COLUMNS, **filters):
+            yield "".join(
+                json.dumps({c: _json_value(v) for c, v in zip(HISTORY_EXPORT_COLUMNS, row)}) + "\n"
+                for row in batch
+            )
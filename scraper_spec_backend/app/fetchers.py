@@ -0,0 +1,128 @@
+"""
+Page fetchers: callables taking a URL and returning its HTML (or None).
+
+- "http": a pooled keep-alive HTTP client (connection reuse per host, HTTP/2
+  when `h2` is installed, gzip/brotli decoding when `brotli` is installed).
+- "browser": a page load in a pooled headless Chrome.
+- "auto": HTTP first, falling back to Chrome when the response has no
+  div.s-main-slot (blocked, captcha, or results rendered client-side).
+
+SCRAPER_FETCH_MODE picks the default; requests may override it per scrape.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, Optional
+import importlib.util
+import os
+import re
+import threading
+
+import httpx
+
+from .scraper import USER_AGENT, load_html_with_browser
+
+Fetch = Callable[[str], Optional[str]]
+
+FETCH_MODE = os.getenv("SCRAPER_FETCH_MODE", "auto")
+HTTP_TIMEOUT_SEC = float(os.getenv("SCRAPER_HTTP_TIMEOUT_SEC", "20"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("SCRAPER_HTTP_MAX_CONNECTIONS", "20"))
+
+FETCH_MODES = ("auto", "http", "browser")
+
+_MAIN_SLOT = re.compile(r"<div\b[^>]*\bclass\s*=\s*[\"'][^\"']*\bs-main-slot\b", re.I)
+
+
+def has_results_slot(html: Optional[str]) -> bool:
+    """True if the page carries the server-rendered results container."""
+    return bool(html) and _MAIN_SLOT.search(html) is not None
+
+
+def browser_fetch(url: str) -> Optional[str]:
+    # delays are owned by the caller (HostThrottle or the scrape loop)
+    return load_html_with_browser(url, delay_range=(0.0, 0.0))
+
+
+class HttpFetcher:
+    """Thread-safe keep-alive client shared by every scrape in the process."""
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT_SEC, max_connections: int = HTTP_MAX_CONNECTIONS):
+        self._timeout = timeout
+        self._max_connections = max_connections
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+
+    def _get_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    # HTTP/2 needs the optional `h2` package
+                    http2=importlib.util.find_spec("h2") is not None,
+                    follow_redirects=True,
+                    timeout=self._timeout,
+                    limits=httpx.Limits(
+                        max_connections=self._max_connections,
+                        max_keepalive_connections=self._max_connections,
+                        keepalive_expiry=60.0,
+                    ),
+                    headers={
+                        "User-Agent": USER_AGENT,
+                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                        "Accept-Language": "en-US,en;q=0.9",
+                    },
+                )
+            return self._client
+
+    def __call__(self, url: str) -> Optional[str]:
+        try:
+            resp = self._get_client().get(url)
+        except httpx.HTTPError:
+            return None
+        if resp.status_code != 200:
+            return None
+        return resp.text
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+class FallbackFetcher:
+    """Use `primary`; when its page fails `accept`, load the URL with `fallback` instead."""
+
+    def __init__(self, primary: Fetch, fallback: Fetch, accept: Callable[[Optional[str]], bool] = has_results_slot):
+        self._primary = primary
+        self._fallback = fallback
+        self._accept = accept
+        self._lock = threading.Lock()
+        self._counts = {"primary": 0, "fallback": 0}
+
+    def __call__(self, url: str) -> Optional[str]:
+        html = self._primary(url)
+        used = "primary"
+        if not self._accept(html):
+            html = self._fallback(url)
+            used = "fallback"
+        with self._lock:
+            self._counts[used] += 1
+        return html
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+http_fetcher = HttpFetcher()
+auto_fetcher = FallbackFetcher(http_fetcher, browser_fetch)
+
+
+def get_fetcher(mode: Optional[str] = None) -> Fetch:
+    """Fetcher for `mode` (default SCRAPER_FETCH_MODE)."""
+    mode = mode or FETCH_MODE
+    if mode == "http":
+        return http_fetcher
+    if mode == "browser":
+        return browser_fetch
+    if mode == "auto":
+        return auto_fetcher
+    raise ValueError(f"Unknown fetch mode {mode!r}; expected one of {', '.join(FETCH_MODES)}.")
@@ -0,0 +1,119 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Set
+import logging
+import os
+import threading
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import SessionLocal
+from .crud import claim_next_job, finish_job, heartbeat_jobs, requeue_stale_jobs
+from .models import ScrapeJob
+
+log = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("SCRAPE_JOB_WORKERS", "2"))
+JOB_POLL_SEC = float(os.getenv("SCRAPE_JOB_POLL_SEC", "2.0"))
+# a running job whose worker has not heartbeated for this long is requeued
+JOB_LEASE_SEC = float(os.getenv("SCRAPE_JOB_LEASE_SEC", "120"))
+
+
+class JobRunner:
+    """
+    In-process worker threads that drain the scrape_jobs table.
+    Jobs are claimed from the DB, so several API processes can share one queue.
+    A heartbeat thread extends the lease on the jobs this process is running
+    and requeues jobs whose worker's lease ran out (a crashed process).
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        poll_sec: float = JOB_POLL_SEC,
+        lease_sec: float = JOB_LEASE_SEC,
+    ):
+        self._session_factory = session_factory
+        self._poll_sec = poll_sec
+        self._lease_sec = lease_sec
+        self._running: Set[int] = set()
+        self._running_lock = threading.Lock()
+        self._handler: Optional[Callable[[Session, ScrapeJob], None]] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self, handler: Callable[[Session, ScrapeJob], None], workers: int = JOB_WORKERS) -> None:
+        if self._threads:
+            return
+        self._handler = handler
+        self._stop.clear()
+        self._requeue_stale()
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._loop, name=f"scrape-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name="scrape-job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was enqueued."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if not self._run_one():
+                self._wake.wait(self._poll_sec)
+                self._wake.clear()
+
+    def _requeue_stale(self) -> int:
+        with self._session_factory() as db:
+            n = requeue_stale_jobs(db, datetime.utcnow() - timedelta(seconds=self._lease_sec))
+        if n:
+            log.warning("requeued %s scrape jobs whose worker stopped heartbeating", n)
+            self._wake.set()
+        return n
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self._lease_sec / 4):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                with self._session_factory() as db:
+                    heartbeat_jobs(db, running)
+                self._requeue_stale()
+            except Exception:
+                log.exception("scrape job heartbeat failed")
+
+    def _run_one(self) -> bool:
+        """Claim and run one job. Returns False when the queue is empty."""
+        with self._session_factory() as db:
+            job = claim_next_job(db)
+            if job is None:
+                return False
+            job_id = job.id
+            with self._running_lock:
+                self._running.add(job_id)
+            try:
+                self._handler(db, job)
+            except Exception as e:
+                log.exception("scrape job %s failed", job_id)
+                db.rollback()
+                finish_job(db, job_id, error=f"{e!s}")
+            else:
+                finish_job(db, job_id)
+            finally:
+                with self._running_lock:
+                    self._running.discard(job_id)
+        return True
+
+
+job_runner = JobRunner()
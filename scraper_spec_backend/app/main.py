@@ -1,13 +1,51 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from .db import engine, Base
+from .migrate import AUTO_MIGRATE, migrate
 from .api import router as api_router
+from .scraper import driver_pool
+from .fetchers import http_fetcher
+from .pipeline import parse_pool
+from .jobs import job_runner
+from .maintenance import maintenance_runner
+from .scheduler import scheduler
+from .stats import stats_runner
+from .alerts import alert_dispatcher
+from .services import execute_job
+from .fetchers import auto_fetcher
+from .response_cache import products_cache
+from .db import SessionLocal
+from .crud import count_alerts_by_status, count_jobs_by_status
+from .metrics import HTTP_REQUEST_SECONDS, registry
+
 
-# migrate tables at startup
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # bring the schema to the newest Alembic revision before serving
+    if AUTO_MIGRATE:
+        migrate()
+    job_runner.start(execute_job)
+    maintenance_runner.start()
+    scheduler.start()
+    stats_runner.start()
+    alert_dispatcher.start()
+    yield
+    alert_dispatcher.stop()
+    stats_runner.stop()
+    scheduler.stop()
+    maintenance_runner.stop()
+    job_runner.stop()
+    # quit warm browser sessions and keep-alive connections on shutdown
+    driver_pool.shutdown()
+    http_fetcher.close()
+    parse_pool.shutdown()
 
-app = FastAPI(title="Amazon Scraper API", version="1.1.0")
+
+app = FastAPI(title="Amazon Scraper API", version="1.1.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -15,9 +53,60 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
-    allow_credentials=False, 
+    allow_credentials=False,
 )
 
+# request latency by route template, so /history/{asin} is one series
+@app.middleware("http")
+async def observe_latency(request: Request, call_next):
+    t = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - t,
+            request.method, getattr(route, "path", "unmatched"), str(status),
+        )
+
+
+def _alert_depth() -> dict:
+    with SessionLocal() as db:
+        return count_alerts_by_status(db)
+
+
+def _job_depth() -> dict:
+    with SessionLocal() as db:
+        return count_jobs_by_status(db)
+
+
+# gauges and running totals already kept elsewhere, read when /metrics is scraped
+registry.collect("scraper_driver_pool_drivers", "Browser sessions in the pool.", "state",
+                 lambda: {k: v for k, v in driver_pool.stats().items() if k != "closed"})
+registry.collect("scraper_fetches_total", "Pages fetched in auto mode by the fetcher that served them.",
+                 "fetcher", auto_fetcher.stats, kind="counter")
+registry.collect("products_cache_events_total", "GET /products cache lookups and invalidations.", "event",
+                 lambda: {k: v for k, v in products_cache.stats().items()
+                          if k in ("hits", "misses", "not_modified", "invalidations")}, kind="counter")
+registry.collect("products_cache_entries", "Cached /products responses.", "",
+                 lambda: {"": products_cache.stats()["entries"]})
+registry.collect("scheduler_events_total", "Scheduler ticks, queued runs and runs deferred by the page budget.",
+                 "event", lambda: {k: v for k, v in scheduler.stats().items()
+                                   if k in ("ticks", "enqueued", "deferred")}, kind="counter")
+registry.collect("scheduler_pages_available", "Pages left in the scheduler's budget.", "",
+                 lambda: {"": scheduler.budget.available()})
+registry.collect("scrape_jobs", "Scrape jobs by status.", "status", _job_depth)
+registry.collect("alert_outbox", "Alert outbox rows by delivery status.", "status", _alert_depth)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # simple health in main
 @app.get("/health")
 def health():
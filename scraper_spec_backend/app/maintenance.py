@@ -0,0 +1,255 @@
+"""
+price_history retention and compaction.
+
+- Raw points older than HISTORY_RAW_DAYS are rolled into one daily row per ASIN
+  (price_history_rollups, grain "day") and deleted; with HISTORY_ARCHIVE_DIR set
+  they are first appended to monthly gzip NDJSON files there.
+- Daily rollups older than HISTORY_DAILY_DAYS are rolled into weekly ones.
+
+Work is done one day (or week) at a time, each in its own transaction, so a
+run can stop anywhere and resume. The API runs it every
+HISTORY_COMPACT_INTERVAL_SEC (0 disables); by hand:
+
+    python -m app.maintenance [--raw-days 90] [--daily-days 730] [--archive-dir DIR] [--dry-run]
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import SessionLocal
+from .crud import merge_buckets
+from .exports import HISTORY_EXPORT_COLUMNS
+from .models import PriceHistory, PriceHistoryRollup
+
+log = logging.getLogger(__name__)
+
+RAW_DAYS = int(os.getenv("HISTORY_RAW_DAYS", "90"))
+DAILY_DAYS = int(os.getenv("HISTORY_DAILY_DAYS", "730"))
+ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR") or None
+COMPACT_INTERVAL_SEC = float(os.getenv("HISTORY_COMPACT_INTERVAL_SEC", str(6 * 3600)))
+
+_ROLLUP_FIELDS = ("min_price", "max_price", "last_price", "last_price_raw", "currency", "count",
+                  "first_seen_at", "last_seen_at")
+# serializes compaction across processes on Postgres (SQLite serializes writers anyway)
+_PG_LOCK_KEY = 0x70726963
+
+
+def _day(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _week(dt: datetime) -> datetime:
+    d = _day(dt)
+    return d - timedelta(days=d.weekday())
+
+
+def _fold(acc: Optional[dict], point: dict) -> dict:
+    """Add one point/aggregate to a running rollup."""
+    merged = merge_buckets(acc, point)
+    merged["first_seen_at"] = min(acc["first_seen_at"], point["first_seen_at"]) if acc else point["first_seen_at"]
+    return merged
+
+
+def _lock(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _PG_LOCK_KEY})
+
+
+def _write_rollups(db: Session, grain: str, start: datetime, rollups: Dict[str, dict]) -> None:
+    """Merge `rollups` (asin -> aggregate) into the stored rows for (grain, start)."""
+    existing = db.execute(
+        select(PriceHistoryRollup).where(
+            PriceHistoryRollup.grain == grain,
+            PriceHistoryRollup.bucket_start == start,
+            PriceHistoryRollup.asin.in_(list(rollups)),
+        )
+    ).scalars().all()
+    for row in existing:
+        # late points (e.g. replayed pages) landing in an already compacted bucket
+        rollups[row.asin] = _fold({f: getattr(row, f) for f in _ROLLUP_FIELDS}, rollups[row.asin])
+    if existing:
+        db.execute(delete(PriceHistoryRollup).where(PriceHistoryRollup.id.in_([r.id for r in existing])))
+    db.execute(insert(PriceHistoryRollup), [
+        {"asin": asin, "grain": grain, "bucket_start": start, **{f: r[f] for f in _ROLLUP_FIELDS}}
+        for asin, r in rollups.items()
+    ])
+
+
+def _archive(archive_dir: str, rows: List[tuple]) -> None:
+    """Append raw rows to price_history-YYYY-MM.ndjson.gz (one gzip member per call)."""
+    by_month: Dict[str, List[str]] = {}
+    for row in rows:
+        rec = dict(zip(("id", *HISTORY_EXPORT_COLUMNS), row))
+        rec["seen_at"] = rec["seen_at"].isoformat()
+        by_month.setdefault(rec["seen_at"][:7], []).append(json.dumps(rec) + "\n")
+    os.makedirs(archive_dir, exist_ok=True)
+    for month, lines in by_month.items():
+        with gzip.open(os.path.join(archive_dir, f"price_history-{month}.ndjson.gz"), "at", encoding="utf-8") as f:
+            f.writelines(lines)
+
+
+def _next_start(db: Session, column, cutoff: datetime, after: Optional[datetime], where=None) -> Optional[datetime]:
+    stmt = select(func.min(column)).where(column < cutoff)
+    if after is not None:
+        stmt = stmt.where(column >= after)
+    if where is not None:
+        stmt = stmt.where(where)
+    return db.execute(stmt).scalar()
+
+
+def compact_raw(db: Session, cutoff: datetime, archive_dir: Optional[str] = None, dry_run: bool = False) -> Tuple[int, int]:
+    """Roll raw points before `cutoff` (a midnight) into daily rollups. Returns (points, rollups)."""
+    points = rollups = 0
+    after = None
+    while True:
+        first = _next_start(db, PriceHistory.seen_at, cutoff, after)
+        if first is None:
+            return points, rollups
+        start = _day(first)
+        end = start + timedelta(days=1)
+        _lock(db)
+        cols = [PriceHistory.id] + [getattr(PriceHistory, c) for c in HISTORY_EXPORT_COLUMNS]
+        rows = db.execute(
+            select(*cols)
+            .where(PriceHistory.seen_at >= start, PriceHistory.seen_at < end)
+            .order_by(PriceHistory.asin, PriceHistory.seen_at, PriceHistory.id)
+        ).all()
+        day: Dict[str, dict] = {}
+        for _id, asin, price, price_raw, currency, seen_at in rows:
+            day[asin] = _fold(day.get(asin), {
+                "min_price": price, "max_price": price, "last_price": price, "last_price_raw": price_raw,
+                "currency": currency, "count": 1, "first_seen_at": seen_at, "last_seen_at": seen_at,
+            })
+        points += len(rows)
+        rollups += len(day)
+        if dry_run:
+            db.rollback()
+        else:
+            if archive_dir:
+                _archive(archive_dir, rows)
+            _write_rollups(db, "day", start, day)
+            # only the rows folded above; points inserted meanwhile wait for the next run
+            max_id = max(r[0] for r in rows)
+            db.execute(delete(PriceHistory).where(
+                PriceHistory.seen_at >= start, PriceHistory.seen_at < end, PriceHistory.id <= max_id,
+            ))
+            db.commit()
+        after = end
+
+
+def compact_daily(db: Session, cutoff: datetime, dry_run: bool = False) -> Tuple[int, int]:
+    """Roll daily rollups of weeks ending before `cutoff` (a Monday) into weekly ones. Returns (days, weeks)."""
+    days = weeks = 0
+    after = None
+    is_day = PriceHistoryRollup.grain == "day"
+    while True:
+        first = _next_start(db, PriceHistoryRollup.bucket_start, cutoff, after, is_day)
+        if first is None:
+            return days, weeks
+        start = _week(first)
+        end = start + timedelta(days=7)
+        _lock(db)
+        rows = db.execute(
+            select(PriceHistoryRollup)
+            .where(is_day, PriceHistoryRollup.bucket_start >= start, PriceHistoryRollup.bucket_start < end)
+            .order_by(PriceHistoryRollup.asin, PriceHistoryRollup.bucket_start)
+        ).scalars().all()
+        week: Dict[str, dict] = {}
+        for r in rows:
+            week[r.asin] = _fold(week.get(r.asin), {f: getattr(r, f) for f in _ROLLUP_FIELDS})
+        days += len(rows)
+        weeks += len(week)
+        if dry_run:
+            db.rollback()
+        else:
+            db.execute(delete(PriceHistoryRollup).where(PriceHistoryRollup.id.in_([r.id for r in rows])))
+            _write_rollups(db, "week", start, week)
+            db.commit()
+        after = end
+
+
+def compact_history(
+    db: Session,
+    raw_days: int = RAW_DAYS,
+    daily_days: int = DAILY_DAYS,
+    archive_dir: Optional[str] = ARCHIVE_DIR,
+    now: Optional[datetime] = None,
+    dry_run: bool = False,
+) -> dict:
+    now = now or datetime.utcnow()
+    points, day_rows = compact_raw(db, _day(now - timedelta(days=raw_days)), archive_dir, dry_run)
+    days, week_rows = compact_daily(db, _week(now - timedelta(days=daily_days)), dry_run)
+    return {
+        "raw_points_compacted": points,
+        "daily_rollups_written": day_rows,
+        "daily_rollups_compacted": days,
+        "weekly_rollups_written": week_rows,
+        "dry_run": dry_run,
+    }
+
+
+class MaintenanceRunner:
+    """Background thread running `task` (default compact_history) every `interval_sec`."""
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal, interval_sec: float = COMPACT_INTERVAL_SEC,
+                 task: Callable[[Session], dict] = compact_history, name: str = "history compaction",
+                 immediate: bool = False):
+        self._session_factory = session_factory
+        self._interval = interval_sec
+        self._task = task
+        self._name = name
+        # run once at start instead of after the first interval
+        self._immediate = immediate
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread or self._interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self._name.replace(" ", "-"), daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _loop(self) -> None:
+        # by default the first pass comes after one interval, not at boot
+        wait = 0 if self._immediate else self._interval
+        while not self._stop.wait(wait):
+            wait = self._interval
+            try:
+                with self._session_factory() as db:
+                    log.info("%s: %s", self._name, self._task(db))
+            except Exception:
+                log.exception("%s failed", self._name)
+
+
+maintenance_runner = MaintenanceRunner()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.maintenance", description="Compact price_history.")
+    ap.add_argument("--raw-days", type=int, default=RAW_DAYS)
+    ap.add_argument("--daily-days", type=int, default=DAILY_DAYS)
+    ap.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    ap.add_argument("--dry-run", action="store_true")
+    args = ap.parse_args()
+    with SessionLocal() as db:
+        print(compact_history(db, args.raw_days, args.daily_days, args.archive_dir, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Process-local metrics in the Prometheus text format, served at GET /metrics.
+
+Counters and histograms are updated in place by the scraper, pipeline, crud
+and HTTP middleware; the rest is read from existing stats() methods when
+/metrics is scraped. Everything is per process: with several uvicorn workers, scrape each
+one (or run one worker per port).
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+import bisect
+import threading
+import time
+
+# seconds; wide enough for multi-second page loads and sub-millisecond queries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Labels = Tuple[str, ...]
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        out += [f"{self.name}{_fmt_labels(self.labels, k)} {_num(v)}" for k, v in items]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t, *labels)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, s in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), s[:-1]):
+                cumulative += n
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else _num(bound))
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, labels, le)} {_num(cumulative)}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, labels)} {s[-1]!r}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, labels)} {_num(cumulative)}")
+        return out
+
+
+class Collected:
+    """
+    Values read at render time from an existing stats source: `read()`
+    returns {label value (or ""): number}. `kind` is "gauge" or, for running
+    totals kept elsewhere, "counter".
+    """
+
+    def __init__(self, name: str, help: str, label: str, read: Callable[[], Dict[str, float]], kind: str = "gauge"):
+        self.name, self.help, self.label, self._read, self.kind = name, help, label, read, kind
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self._read()
+        except Exception:
+            return []
+        for key, v in sorted(values.items()):
+            if v is None:
+                continue
+            labels = _fmt_labels((self.label,), (key,)) if self.label else ""
+            out.append(f"{self.name}{labels} {_num(v)}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._lock = threading.Lock()
+
+    def add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def collect(
+        self, name: str, help: str, label: str, read: Callable[[], Dict[str, float]], kind: str = "gauge"
+    ) -> Collected:
+        return self.add(Collected(name, help, label, read, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines: List[str] = []
+        for m in metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+SCRAPE_PHASE_SECONDS = registry.histogram(
+    "scraper_phase_seconds",
+    "Time per scrape phase: driver_start, lease, delay, navigate, ready, scroll, serialize (browser); "
+    "fetch, parse, upsert (pipeline).",
+    ["phase"],
+)
+DB_QUERY_SECONDS = registry.histogram("db_query_seconds", "Time per crud statement.", ["op"])
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route template.", ["method", "route", "status"],
+)
+ITEMS_PARSED = registry.counter("scraper_items_parsed_total", "Product cards parsed into items.")
+SPONSORED_SKIPPED = registry.counter("scraper_sponsored_skipped_total", "Sponsored result cards skipped.")
+PARSE_FALLBACKS = registry.counter(
+    "scraper_parse_fallbacks_total", "Cards that needed the BeautifulSoup fallback, by field.", ["field"],
+)
+HISTORY_ROWS_WRITTEN = registry.counter("price_history_rows_written_total", "price_history rows inserted.")
+ALERTS_ENQUEUED = registry.counter("alerts_enqueued_total", "Alert matches written to the outbox.")
+ALERT_DELIVERIES = registry.counter(
+    "alert_deliveries_total", "Webhook delivery attempts by result: sent, retry, failed.", ["result"],
+)
+
+
+def record_parse(items: int, stats: Dict[str, int]) -> None:
+    """Fold parse_search_page's per-page stats into the counters."""
+    ITEMS_PARSED.inc(items)
+    if stats.get("sponsored"):
+        SPONSORED_SKIPPED.inc(stats["sponsored"])
+    if stats.get("title_fallbacks"):
+        PARSE_FALLBACKS.inc(stats["title_fallbacks"], "title")
+    if stats.get("price_fallbacks"):
+        PARSE_FALLBACKS.inc(stats["price_fallbacks"], "price")
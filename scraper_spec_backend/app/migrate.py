@@ -0,0 +1,125 @@
+"""
+Schema migrations (Alembic, scripts in migrations/).
+
+migrate() brings the database at DB_URL to the newest revision. Databases
+created before migrations existed (by create_all) are first patched up to the
+initial revision with the old startup helpers, then stamped, so they upgrade
+like any other. The API runs this on startup unless DB_AUTO_MIGRATE=0;
+with several replicas, run it once per deploy instead:
+
+    python -m app.migrate          # or: alembic upgrade head
+"""
+import os
+
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .db import engine
+from .backfill import ensure_last_price_columns, ensure_product_indexes
+from .crud import backfill_last_history
+from .search import ensure_fts
+
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") != "0"
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# revision that describes the schema create_all used to build
+_BASELINE = "0001"
+
+# The tables of the baseline revision, as 0001 creates them. Adoption only
+# fills in the ones a legacy database lacks; newer tables and columns are left
+# to the migrations after 0001, which would otherwise find them already there.
+_baseline = sa.MetaData()
+_products = sa.Table(
+    "products", _baseline,
+    sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+    sa.Column("asin", sa.String(32), nullable=False),
+    sa.Column("title", sa.String(512), nullable=False),
+    sa.Column("product_url", sa.String(1024), nullable=False),
+    sa.Column("image_url", sa.String(1024), nullable=True),
+    sa.Column("price", sa.Float(), nullable=True),
+    sa.Column("price_raw", sa.String(64), nullable=True),
+    sa.Column("currency", sa.String(12), nullable=True),
+    sa.Column("rating", sa.Float(), nullable=True),
+    sa.Column("rating_count", sa.Integer(), nullable=True),
+    sa.Column("last_history_price", sa.Float(), nullable=True),
+    sa.Column("last_seen_at", sa.DateTime(), nullable=True),
+    sa.Column("created_at", sa.DateTime(), nullable=False),
+    sa.Column("updated_at", sa.DateTime(), nullable=False),
+)
+_price_history = sa.Table(
+    "price_history", _baseline,
+    sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+    sa.Column("asin", sa.String(32), sa.ForeignKey("products.asin", ondelete="CASCADE"), nullable=False),
+    sa.Column("price", sa.Float(), nullable=True),
+    sa.Column("price_raw", sa.String(64), nullable=True),
+    sa.Column("currency", sa.String(12), nullable=True),
+    sa.Column("seen_at", sa.DateTime(), nullable=False),
+)
+_scrape_jobs = sa.Table(
+    "scrape_jobs", _baseline,
+    sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+    sa.Column("kind", sa.String(16), nullable=False),
+    sa.Column("payload", sa.Text(), nullable=False),
+    sa.Column("status", sa.String(16), nullable=False),
+    sa.Column("pages_done", sa.Integer(), nullable=False),
+    sa.Column("items_found", sa.Integer(), nullable=False),
+    sa.Column("rows_upserted", sa.Integer(), nullable=False),
+    sa.Column("error", sa.Text(), nullable=True),
+    sa.Column("created_at", sa.DateTime(), nullable=False),
+    sa.Column("started_at", sa.DateTime(), nullable=True),
+    sa.Column("finished_at", sa.DateTime(), nullable=True),
+)
+sa.Index("ix_products_asin", _products.c.asin, unique=True)
+sa.Index("ix_products_title", _products.c.title)
+sa.Index("ix_price_history_asin", _price_history.c.asin)
+sa.Index("ix_price_history_seen_at", _price_history.c.seen_at)
+sa.Index("ix_price_history_asin_seen", _price_history.c.asin, _price_history.c.seen_at.desc())
+sa.Index("ix_scrape_jobs_status", _scrape_jobs.c.status)
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    cfg = Config(os.path.join(_ROOT, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(_ROOT, "migrations"))
+    cfg.attributes["configure_logger"] = False
+    if connection is not None:
+        cfg.attributes["connection"] = connection
+    return cfg
+
+
+def _adopt_legacy(bind: Engine) -> bool:
+    """Patch a pre-migrations database up to the baseline. Returns True if it was one."""
+    insp = inspect(bind)
+    if not insp.has_table("products") or insp.has_table("alembic_version"):
+        return False
+    _baseline.create_all(bind=bind)
+    if ensure_last_price_columns(bind):
+        with Session(bind) as db:
+            backfill_last_history(db)
+    ensure_product_indexes(bind)
+    for table in (_price_history, _scrape_jobs):
+        for idx in table.indexes:
+            idx.create(bind, checkfirst=True)
+    ensure_fts(bind)
+    return True
+
+
+def migrate(bind: Engine = engine) -> None:
+    legacy = _adopt_legacy(bind)
+    with bind.begin() as conn:
+        cfg = alembic_config(conn)
+        if legacy:
+            command.stamp(cfg, _BASELINE)
+        command.upgrade(cfg, "head")
+
+
+def main() -> None:
+    migrate()
+    print("database is at the latest revision")
+
+
+if __name__ == "__main__":
+    main()
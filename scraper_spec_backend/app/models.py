@@ -1,4 +1,4 @@
-from sqlalchemy import String, Float, DateTime, Integer, ForeignKey, Index
+from sqlalchemy import Boolean, String, Float, DateTime, Integer, ForeignKey, Index, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from .db import Base
@@ -21,6 +21,11 @@ class Product(Base):
     rating: Mapped[float | None] = mapped_column(Float, nullable=True)
     rating_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
+    # Denormalized newest price_history point, so ingest can detect price changes
+    # without querying the history table
+    last_history_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    last_seen_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -42,5 +47,165 @@ class PriceHistory(Base):
 
     product: Mapped["Product"] = relationship(back_populates="history")
 
+class PriceHistoryRollup(Base):
+    """
+    Compacted price_history: one row per ASIN per day or week, written by
+    maintenance.compact_history in place of the raw points it replaces.
+    """
+    __tablename__ = "price_history_rollups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    asin: Mapped[str] = mapped_column(String(32), ForeignKey("products.asin", ondelete="CASCADE"))
+    # "day" | "week"
+    grain: Mapped[str] = mapped_column(String(8))
+    bucket_start: Mapped[datetime] = mapped_column(DateTime)
+    min_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    max_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # newest point in the bucket
+    last_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    last_price_raw: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    currency: Mapped[str | None] = mapped_column(String(12), nullable=True)
+    count: Mapped[int] = mapped_column(Integer)
+    first_seen_at: Mapped[datetime] = mapped_column(DateTime)
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime)
+
+class ScrapeJob(Base):
+    __tablename__ = "scrape_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # "scrape" (ScrapeRequest) or "batch" (BatchScrapeRequest); payload is the request JSON
+    kind: Mapped[str] = mapped_column(String(16))
+    payload: Mapped[str] = mapped_column(Text)
+    # queued -> running -> done | failed
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)
+
+    pages_done: Mapped[int] = mapped_column(Integer, default=0)
+    items_found: Mapped[int] = mapped_column(Integer, default=0)
+    rows_upserted: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # set for jobs enqueued by the scheduler
+    watch_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # refreshed by the worker running the job; a stale one means the worker is gone
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+class WatchedSearch(Base):
+    """A keyword or search URL the scheduler re-scrapes every ~interval_sec."""
+    __tablename__ = "watched_searches"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    keyword: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    search_url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    domain: Mapped[str] = mapped_column(String(64), default="amazon.com")
+    max_pages: Mapped[int] = mapped_column(Integer, default=1)
+    fetch_mode: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    interval_sec: Mapped[int] = mapped_column(Integer)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+
+    # price changes per product per day over the volatility window, as of the last plan
+    change_rate: Mapped[float | None] = mapped_column(Float, nullable=True)
+    next_run_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_run_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_job_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class WatchedProduct(Base):
+    """ASINs a watch's scrapes have returned; their price history drives its priority."""
+    __tablename__ = "watched_search_products"
+
+    watch_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("watched_searches.id", ondelete="CASCADE"), primary_key=True
+    )
+    asin: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class ProductStat(Base):
+    """
+    Precomputed product counts behind /stats. "currency", "price" and "rating"
+    rows are kept current by the upserts; "keyword" rows by app.stats.
+    """
+    __tablename__ = "product_stats"
+
+    # "currency" | "price" | "rating" | "keyword"
+    dimension: Mapped[str] = mapped_column(String(16), primary_key=True)
+    # currency ("" = unknown), "<currency>|<bucket floor>", rating bucket floor ("" = unrated), or keyword
+    key: Mapped[str] = mapped_column(String(256), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+class PriceDrop(Base):
+    """Biggest recent price drops per period ("24h", "7d"), rewritten by app.stats."""
+    __tablename__ = "price_drops"
+
+    period: Mapped[str] = mapped_column(String(8), primary_key=True)
+    asin: Mapped[str] = mapped_column(String(32), primary_key=True)
+    title: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    currency: Mapped[str | None] = mapped_column(String(12), nullable=True)
+    # highest price in the period (including the one it entered with) -> current price
+    from_price: Mapped[float] = mapped_column(Float)
+    to_price: Mapped[float] = mapped_column(Float)
+    drop_amount: Mapped[float] = mapped_column(Float)
+    drop_pct: Mapped[float] = mapped_column(Float)
+    computed_at: Mapped[datetime] = mapped_column(DateTime)
+
+class AlertRule(Base):
+    """
+    Price alert on one ASIN, or on every product whose title has all the
+    words of `keyword`. Set conditions must all hold: price at or below
+    max_price, and/or at least drop_pct below the previous price.
+    """
+    __tablename__ = "alert_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    asin: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    keyword: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    max_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    drop_pct: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # only products priced in this currency (None = any)
+    currency: Mapped[str | None] = mapped_column(String(12), nullable=True)
+    # None = ALERTS_WEBHOOK_URL
+    webhook_url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class AlertOutbox(Base):
+    """Alert matches written with the price change that caused them, for the webhook dispatcher."""
+    __tablename__ = "alert_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # not a foreign key: deliveries outlive deleted rules
+    rule_id: Mapped[int] = mapped_column(Integer)
+    asin: Mapped[str] = mapped_column(String(32))
+    title: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    currency: Mapped[str | None] = mapped_column(String(12), nullable=True)
+    old_price: Mapped[float | None] = mapped_column(Float, nullable=True)
+    new_price: Mapped[float] = mapped_column(Float)
+    webhook_url: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    # pending -> sent | failed
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
 # Useful query index
 Index("ix_price_history_asin_seen", PriceHistory.asin, PriceHistory.seen_at.desc())
+
+Index("ix_price_rollups_asin_grain_start", PriceHistoryRollup.asin, PriceHistoryRollup.grain,
+      PriceHistoryRollup.bucket_start, unique=True)
+Index("ix_price_rollups_grain_start", PriceHistoryRollup.grain, PriceHistoryRollup.bucket_start)
+
+Index("ix_watched_searches_enabled_next", WatchedSearch.enabled, WatchedSearch.next_run_at)
+
+Index("ix_alert_outbox_status_next", AlertOutbox.status, AlertOutbox.next_attempt_at)
+
+# Keyset pagination: one (sort column, id) index per /products order_by
+Index("ix_products_price_id", Product.price, Product.id)
+Index("ix_products_rating_id", Product.rating, Product.id)
+Index("ix_products_created_id", Product.created_at, Product.id)
+Index("ix_products_updated_id", Product.updated_at, Product.id)
+Index("ix_products_title_id", Product.title, Product.id)
@@ -0,0 +1,175 @@
+"""
+On-disk cache of fetched search-result HTML.
+
+Each page is stored gzip-compressed under the SHA-256 of its URL and time
+bucket (SCRAPER_CACHE_BUCKET_SEC wide), so repeated fetches of a URL within a
+bucket share one file and older buckets stay around for reparsing. A page is
+served to scrapes while younger than SCRAPER_CACHE_TTL_SEC. Files older than
+SCRAPER_CACHE_MAX_AGE_DAYS are evicted, then the oldest ones until the cache
+fits in SCRAPER_CACHE_MAX_MB.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", "page_cache")
+CACHE_TTL_SEC = int(os.getenv("SCRAPER_CACHE_TTL_SEC", "3600"))
+CACHE_BUCKET_SEC = int(os.getenv("SCRAPER_CACHE_BUCKET_SEC", "3600"))
+CACHE_MAX_AGE_DAYS = float(os.getenv("SCRAPER_CACHE_MAX_AGE_DAYS", "14"))
+CACHE_MAX_MB = int(os.getenv("SCRAPER_CACHE_MAX_MB", "512"))
+
+_SUFFIX = ".html.gz"
+
+
+@dataclass
+class CachedPage:
+    url: str
+    fetched_at: float
+    path: str
+
+    def read(self) -> str:
+        return _read(self.path)[1]
+
+
+def _read(path: str):
+    """(metadata, html) from a cache file: first line is JSON metadata."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        meta = json.loads(f.readline())
+        return meta, f.read()
+
+
+class PageCache:
+    def __init__(
+        self,
+        root: str = CACHE_DIR,
+        ttl_sec: int = CACHE_TTL_SEC,
+        bucket_sec: int = CACHE_BUCKET_SEC,
+        max_age_sec: float = CACHE_MAX_AGE_DAYS * 86400,
+        max_bytes: int = CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.bucket_sec = max(1, bucket_sec)
+        self.max_age_sec = max_age_sec
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # bytes written since the last eviction pass; sweeps are not run on every put
+        self._written = 0
+
+    def _path(self, url: str, bucket: int) -> str:
+        key = hashlib.sha256(f"{url}\n{bucket}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, key[:2], key + _SUFFIX)
+
+    def get(self, url: str, max_age_sec: Optional[float] = None) -> Optional[str]:
+        """Newest cached HTML for `url` fetched within the TTL, or None."""
+        ttl = self.ttl_sec if max_age_sec is None else max_age_sec
+        if ttl <= 0:
+            return None
+        now = time.time()
+        bucket = int(now // self.bucket_sec)
+        oldest = int((now - ttl) // self.bucket_sec)
+        for b in range(bucket, oldest - 1, -1):
+            path = self._path(url, b)
+            try:
+                meta, html = _read(path)
+            except (OSError, ValueError, EOFError):
+                continue
+            if meta.get("url") == url and now - meta.get("fetched_at", 0) <= ttl:
+                return html
+        return None
+
+    def put(self, url: str, html: str) -> None:
+        now = time.time()
+        path = self._path(url, int(now // self.bucket_sec))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write((json.dumps({"url": url, "fetched_at": now}) + "\n").encode("utf-8"))
+                f.write(html.encode("utf-8"))
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with self._lock:
+            self._written += os.path.getsize(path)
+            sweep = self._written >= self.max_bytes // 20
+            if sweep:
+                self._written = 0
+        if sweep:
+            self.evict()
+
+    def _files(self) -> List[os.DirEntry]:
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for sub in os.scandir(self.root):
+            if sub.is_dir():
+                out += [e for e in os.scandir(sub.path) if e.name.endswith(_SUFFIX)]
+        return out
+
+    def evict(self) -> int:
+        """Drop expired files, then the oldest until under max_bytes. Returns files removed."""
+        now = time.time()
+        files = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._files()))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if now - mtime <= self.max_age_sec and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def pages(self, since: Optional[float] = None, url_contains: Optional[str] = None) -> Iterator[CachedPage]:
+        """Newest cached copy of every URL, oldest first (the order to replay them in)."""
+        newest = {}
+        for e in self._files():
+            try:
+                with gzip.open(e.path, "rt", encoding="utf-8") as f:
+                    meta = json.loads(f.readline())
+            except (OSError, ValueError, EOFError):
+                continue
+            url, at = meta.get("url"), meta.get("fetched_at", 0)
+            if not url or (since is not None and at < since) or (url_contains and url_contains not in url):
+                continue
+            if url not in newest or newest[url].fetched_at < at:
+                newest[url] = CachedPage(url=url, fetched_at=at, path=e.path)
+        yield from sorted(newest.values(), key=lambda p: p.fetched_at)
+
+
+def cached(
+    fetch: Callable[[str], Optional[str]], cache: Optional[PageCache], read: bool = True
+) -> Callable[[str], Optional[str]]:
+    """
+    Wrap a page fetcher so fresh cached pages skip it and fetched pages are stored.
+    With read=False every page is fetched, but still stored (for reparse and later reads).
+    """
+    if cache is None:
+        return fetch
+
+    def fetch_cached(url: str) -> Optional[str]:
+        html = cache.get(url) if read else None
+        if html is not None:
+            return html
+        html = fetch(url)
+        if html:
+            cache.put(url, html)
+        return html
+
+    return fetch_cached
+
+
+page_cache = PageCache()
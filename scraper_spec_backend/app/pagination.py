@@ -0,0 +1,65 @@
+"""
+Keyset (cursor) pagination helpers for product listings.
+
+A cursor is the sort value and id of the last row of a page, plus the sort it
+belongs to, packed as url-safe base64 JSON. Rows are ordered by (col, id) with
+NULLs first for asc and last for desc on every backend.
+"""
+from __future__ import annotations
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order_by: str, order: str, value: Any, row_id: int) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps({"o": order_by, "d": order, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, order: str) -> dict:
+    """Return {"value", "id"}; raises InvalidCursor if malformed or for another sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value, row_id = data["v"], int(data["id"])
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+    except Exception:
+        raise InvalidCursor("Malformed cursor.")
+    if data.get("o") != order_by or data.get("d") != order:
+        raise InvalidCursor("Cursor was issued for a different order_by/order.")
+    return {"value": value, "id": row_id}
+
+
+def order_clause(col, id_col, order: str):
+    if order == "asc":
+        return col.asc().nulls_first(), id_col.asc()
+    return col.desc().nulls_last(), id_col.desc()
+
+
+def after_cursor(col, id_col, order: str, value: Any, row_id: int):
+    """WHERE clause selecting rows strictly after (value, row_id) in order_clause order."""
+    if order == "asc":
+        if value is None:
+            return or_(and_(col.is_(None), id_col > row_id), col.is_not(None))
+        return or_(col > value, and_(col == value, id_col > row_id))
+    if value is None:
+        return and_(col.is_(None), id_col < row_id)
+    return or_(col < value, and_(col == value, id_col < row_id), col.is_(None))
+
+
+def next_cursor(rows: list, page_size: int, col_name: str, order_by: str, order: str) -> Optional[str]:
+    """Cursor for the page after `rows`, or None when this was the last page."""
+    if len(rows) < page_size or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor(order_by, order, getattr(last, col_name), last.id)
@@ -0,0 +1,173 @@
+"""
+Scrape pipeline stages: fetch -> parse -> upsert.
+
+- Fetch runs on the engine's worker threads. They find each page's "next"
+  link with a cheap scan and keep walking the pagination.
+- Parse (lxml + normalization) runs in a process pool of
+  SCRAPER_PARSE_WORKERS processes (0 = parse inline on the fetching thread),
+  so it neither waits on page loads nor holds the API's GIL.
+- Upsert: parsed pages go through a bounded queue (SCRAPER_PIPELINE_QUEUE
+  pages; fetchers block when it is full) to one writer thread that commits
+  them in batches of up to SCRAPER_UPSERT_BATCH items, as soon as they arrive.
+  A scrape that dies halfway has already saved the pages before the failure.
+"""
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from . import tracing
+from .metrics import SCRAPE_PHASE_SECONDS, record_parse
+from .scraper import parse_search_page
+
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", "2"))
+PIPELINE_QUEUE = int(os.getenv("SCRAPER_PIPELINE_QUEUE", "16"))
+UPSERT_BATCH = int(os.getenv("SCRAPER_UPSERT_BATCH", "500"))
+
+
+def parse_page(html: str, host: str) -> Tuple[List[Dict], Dict[str, int], int, int]:
+    """
+    Items of one search page with the parser's stats and start/end times in
+    ns (module-level so worker processes can run it).
+    """
+    start = time.time_ns()
+    stats: Dict[str, int] = {}
+    items, _ = parse_search_page(html, host, stats)
+    return items, stats, start, time.time_ns()
+
+
+def _parsed(result: Tuple[List[Dict], Dict[str, int], int, int], parent) -> List[Dict]:
+    # metrics live in this process, not in the worker that parsed
+    items, stats, start, end = result
+    record_parse(len(items), stats)
+    SCRAPE_PHASE_SECONDS.observe((end - start) / 1e9, "parse")
+    tracing.record_span("scrape.parse", start, end, parent, items=len(items))
+    return items
+
+
+class ParsePool:
+    """Lazily started process pool for page parsing; shared by every scrape in the process."""
+
+    def __init__(self, workers: int = PARSE_WORKERS):
+        self.workers = max(0, workers)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs threads (jobs, drivers) is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def submit(self, html: str, host: str) -> "Future[List[Dict]]":
+        out: "Future[List[Dict]]" = Future()
+        parent = tracing.current()
+        if self.workers == 0:
+            try:
+                out.set_result(_parsed(parse_page(html, host), parent))
+            except Exception as e:
+                out.set_exception(e)
+            return out
+
+        def done(fut: Future) -> None:
+            try:
+                out.set_result(_parsed(fut.result(), parent))
+            except BaseException as e:
+                out.set_exception(e)
+
+        self._get_executor().submit(parse_page, html, host).add_done_callback(done)
+        return out
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+parse_pool = ParsePool()
+
+_DONE = object()
+
+
+class UpsertWriter:
+    """
+    Single writer thread fed through a bounded queue of pages.
+    `write(items, pages)` persists one batch and returns its changed-row count.
+
+        with UpsertWriter(write) as writer:
+            writer.put(page_items)      # from any thread; blocks while the queue is full
+        writer.changed                  # after the block: everything is committed
+
+    The first write error stops the writer: later put() calls raise it, and so
+    does leaving the block.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[Dict], int], int],
+        batch_items: int = UPSERT_BATCH,
+        max_pages: int = PIPELINE_QUEUE,
+    ):
+        self._write = write
+        self._batch_items = max(1, batch_items)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pages))
+        self._thread = threading.Thread(target=self._loop, name="scrape-writer", daemon=True)
+        self.changed = 0
+        self.pages = 0
+        self.error: Optional[BaseException] = None
+        # batches are written on another thread; keep them under the caller's span
+        self._trace_parent = tracing.current()
+
+    def __enter__(self) -> "UpsertWriter":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._queue.put(_DONE)
+        self._thread.join()
+        if exc is None and self.error is not None:
+            raise self.error
+
+    def put(self, items: List[Dict]) -> None:
+        if self.error is not None:
+            raise self.error
+        self._queue.put(items)
+
+    def _loop(self) -> None:
+        done = False
+        while not done:
+            # block for one page, then take whatever else is already waiting
+            batch: List[Dict] = []
+            pages = 0
+            page = self._queue.get()
+            while True:
+                if page is _DONE:
+                    done = True
+                    break
+                batch.extend(page)
+                pages += 1
+                if len(batch) >= self._batch_items:
+                    break
+                try:
+                    page = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not pages or self.error is not None:
+                # after a failure keep draining so producers never block forever
+                continue
+            try:
+                with SCRAPE_PHASE_SECONDS.time("upsert"), tracing.span(
+                    "scrape.upsert", self._trace_parent, items=len(batch), pages=pages,
+                ):
+                    self.changed += self._write(batch, pages)
+                self.pages += pages
+            except BaseException as e:
+                self.error = e
@@ -0,0 +1,175 @@
+"""
+Cache of serialized GET /products responses.
+
+Entries are keyed by the normalized query parameters plus a generation number
+that every product write bumps (invalidate()), so a write makes all cached
+pages unreachable at once; stale ones age out of the LRU. Each entry carries
+an ETag derived from the body, which the route uses for If-None-Match / 304.
+
+PRODUCTS_CACHE_URL=redis://host:6379/0 shares entries and the generation
+between processes (needs the optional `redis` package); by default the cache
+is in-process, so writes made by other processes only show up after
+PRODUCTS_CACHE_TTL_SEC. A TTL of 0 turns caching off (ETags still work).
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_URL = os.getenv("PRODUCTS_CACHE_URL") or None
+CACHE_TTL_SEC = float(os.getenv("PRODUCTS_CACHE_TTL_SEC", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("PRODUCTS_CACHE_MAX_ENTRIES", "512"))
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison: W/"x" matches "x"
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag in tags
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry expiry."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self._max = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self) -> int:
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires, value = hit
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisBackend:
+    """Same interface on a Redis-compatible server (shared by every API process)."""
+
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "products:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("PRODUCTS_CACHE_URL needs the 'redis' package.") from e
+        self._r = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def generation(self) -> int:
+        return int(self._r.get(self._prefix + "gen") or 0)
+
+    def bump(self) -> int:
+        return int(self._r.incr(self._prefix + "gen"))
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raw = self._r.get(self._prefix + key)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return CachedResponse(etag.decode("ascii"), body)
+
+    def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        self._r.set(self._prefix + key, value.etag.encode("ascii") + b"\n" + value.body, px=int(ttl * 1000))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._r.scan_iter(self._prefix + "p:*"))
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl_sec: float = CACHE_TTL_SEC):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_sec > 0
+
+    def key(self, params: Dict[str, object]) -> str:
+        """Cache key for a parameter set at the current generation."""
+        norm = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+        digest = hashlib.blake2b(norm.encode("utf-8"), digest_size=16).hexdigest()
+        return f"p:{self.backend.generation()}:{digest}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        hit = self.backend.get(key) if self.enabled else None
+        self._count("hits" if hit is not None else "misses")
+        return hit
+
+    def put(self, key: str, body: bytes) -> CachedResponse:
+        value = CachedResponse(make_etag(body), body)
+        if self.enabled:
+            self.backend.set(key, value, self.ttl_sec)
+        return value
+
+    def invalidate(self) -> None:
+        self.backend.bump()
+        self._count("invalidations")
+
+    def count_not_modified(self) -> None:
+        self._count("not_modified")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "hit_ratio": round(counts["hits"] / lookups, 4) if lookups else None,
+            "entries": len(self.backend),
+            "generation": self.backend.generation(),
+            "backend": "redis" if isinstance(self.backend, RedisBackend) else "memory",
+            "ttl_sec": self.ttl_sec,
+        }
+
+
+products_cache = ResponseCache(RedisBackend(CACHE_URL) if CACHE_URL else MemoryBackend())
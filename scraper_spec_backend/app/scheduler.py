@@ -0,0 +1,232 @@
+"""
+Recurring re-scrapes of watched searches.
+
+Every SCHEDULER_TICK_SEC the scheduler takes the enabled watches that are due
+and ranks them by how often their products' prices changed over the last
+SCHEDULER_VOLATILITY_DAYS (price_history points per product per day). It then
+queues scrape jobs in that order while the page budget allows. The budget is
+SCHEDULER_PAGES_PER_MIN, a token bucket that holds at most one minute's worth.
+
+Each run reschedules its watch at interval_sec scaled by volatility.
+SCHEDULER_REFERENCE_CHANGES_PER_DAY keeps the base interval. Faster-moving
+listings come back up to 4x sooner and static ones up to 4x later, so the
+budget goes where prices move.
+
+The API runs the scheduler in-process (SCHEDULER_TICK_SEC=0 turns it off).
+A separate worker that runs both the scheduler and the job queue:
+
+    python -m app.scheduler
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .db import SessionLocal
+from .crud import claim_watch, due_watches, set_watch_job, watch_change_rates
+from .jobs import job_runner
+from .models import WatchedSearch
+from .schemas import ScrapeRequest
+from .services import enqueue_scrape, execute_job
+
+log = logging.getLogger(__name__)
+
+TICK_SEC = float(os.getenv("SCHEDULER_TICK_SEC", "30"))
+PAGES_PER_MIN = float(os.getenv("SCHEDULER_PAGES_PER_MIN", "6"))
+VOLATILITY_DAYS = float(os.getenv("SCHEDULER_VOLATILITY_DAYS", "14"))
+REFERENCE_RATE = float(os.getenv("SCHEDULER_REFERENCE_CHANGES_PER_DAY", "0.1"))
+
+MIN_INTERVAL_FACTOR = 0.25
+MAX_INTERVAL_FACTOR = 4.0
+
+
+def interval_factor(rate: Optional[float]) -> float:
+    """Multiplier on a watch's interval_sec; None (no products seen yet) keeps it as is."""
+    if rate is None:
+        return 1.0
+    if rate <= 0:
+        return MAX_INTERVAL_FACTOR
+    return min(MAX_INTERVAL_FACTOR, max(MIN_INTERVAL_FACTOR, REFERENCE_RATE / rate))
+
+
+def priority(watch: WatchedSearch, rate: Optional[float], now: datetime) -> float:
+    """Higher runs first: volatility weighted by how overdue the watch is (in intervals)."""
+    overdue = max(0.0, (now - watch.next_run_at).total_seconds()) / watch.interval_sec
+    # static listings still age into the queue, just slower
+    weight = 1.0 if rate is None else rate / REFERENCE_RATE + 0.1
+    return weight * (1.0 + overdue)
+
+
+def watch_request(watch: WatchedSearch) -> ScrapeRequest:
+    return ScrapeRequest(
+        keyword=watch.keyword,
+        search_url=watch.search_url,
+        domain=watch.domain,
+        max_pages=watch.max_pages,
+        fetch_mode=watch.fetch_mode,
+        # a refresh has to see the live page
+        use_cache=False,
+    )
+
+
+class PageBudget:
+    """Token bucket of pages: refills at pages_per_min, holds at most one minute's worth."""
+
+    def __init__(self, pages_per_min: float = PAGES_PER_MIN):
+        self.pages_per_min = pages_per_min
+        self.capacity = max(1.0, pages_per_min)
+        self._tokens = self.capacity
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._at) * self.pages_per_min / 60.0)
+        self._at = now
+
+    def take(self, pages: int) -> bool:
+        # a watch bigger than the bucket may run once the bucket is full
+        cost = min(float(pages), self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens < cost:
+                return False
+            self._tokens -= cost
+            return True
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+@dataclass
+class PlannedRun:
+    watch: WatchedSearch
+    change_rate: Optional[float]
+    priority: float
+    next_run_at: datetime
+
+
+def plan(db: Session, now: datetime) -> List[PlannedRun]:
+    """Due watches, highest priority first, each with its next run time."""
+    due = due_watches(db, now)
+    rates: Dict[int, float] = watch_change_rates(
+        db, [w.id for w in due], now - timedelta(days=VOLATILITY_DAYS), now,
+    )
+    runs = []
+    for w in due:
+        rate = rates.get(w.id)
+        runs.append(PlannedRun(
+            watch=w,
+            change_rate=rate,
+            priority=priority(w, rate, now),
+            next_run_at=now + timedelta(seconds=w.interval_sec * interval_factor(rate)),
+        ))
+    runs.sort(key=lambda r: (-r.priority, r.watch.id))
+    return runs
+
+
+class Scheduler:
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        tick_sec: float = TICK_SEC,
+        budget: Optional[PageBudget] = None,
+    ):
+        self._session_factory = session_factory
+        self._tick_sec = tick_sec
+        self.budget = budget or PageBudget()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._counts = {"ticks": 0, "enqueued": 0, "deferred": 0}
+
+    def tick(self, db: Session, now: Optional[datetime] = None) -> List[int]:
+        """Queue jobs for due watches within the budget; returns the new job ids."""
+        now = now or datetime.utcnow()
+        job_ids: List[int] = []
+        runs = plan(db, now)
+        for i, run in enumerate(runs):
+            if not self.budget.take(run.watch.max_pages):
+                # keep the ranking: lower-priority watches don't jump ahead because they are smaller
+                self._count("deferred", len(runs) - i)
+                break
+            if not claim_watch(db, run.watch, now, run.next_run_at, run.change_rate):
+                continue
+            job = enqueue_scrape(db, watch_request(run.watch), watch_id=run.watch.id)
+            set_watch_job(db, run.watch.id, job.id)
+            job_ids.append(job.id)
+        self._count("ticks")
+        self._count("enqueued", len(job_ids))
+        return job_ids
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            **counts,
+            "running": self._thread is not None,
+            "pages_per_min": self.budget.pages_per_min,
+            "pages_available": round(self.budget.available(), 2),
+        }
+
+    def start(self) -> None:
+        if self._thread or self._tick_sec <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scrape-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self._session_factory() as db:
+                    self.tick(db)
+            except Exception:
+                log.exception("scheduler tick failed")
+            self._stop.wait(self._tick_sec)
+
+
+scheduler = Scheduler()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    tick = TICK_SEC if TICK_SEC > 0 else 30.0
+    job_runner.start(execute_job)
+    log.info("scheduler worker: tick %ss, %s pages/min", tick, PAGES_PER_MIN)
+    try:
+        while True:
+            try:
+                with SessionLocal() as db:
+                    ids = scheduler.tick(db)
+                if ids:
+                    log.info("queued jobs %s", ids)
+            except Exception:
+                log.exception("scheduler tick failed")
+            time.sleep(tick)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        job_runner.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl, model_validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 class ScrapeRequest(BaseModel):
@@ -9,6 +9,10 @@ class ScrapeRequest(BaseModel):
     max_pages: int = Field(default=1, ge=1, le=10)
     delay_lo: float = Field(default=2.5, ge=0)
     delay_hi: float = Field(default=5.0, ge=0)
+    # serve pages fetched within the page cache TTL instead of reloading them
+    use_cache: bool = True
+    # auto | http | browser; default SCRAPER_FETCH_MODE
+    fetch_mode: Optional[str] = Field(default=None, pattern="^(auto|http|browser)$")
 
     @model_validator(mode="after")
     def xor_inputs(self):
@@ -16,6 +20,29 @@ class ScrapeRequest(BaseModel):
             raise ValueError("Provide exactly one of keyword or search_url.")
         return self
 
+class BatchScrapeRequest(BaseModel):
+    keywords: List[str] = Field(default_factory=list)
+    search_urls: List[HttpUrl] = Field(default_factory=list)
+    domains: List[str] = Field(default_factory=lambda: ["amazon.com"], min_length=1)
+    max_pages: int = Field(default=1, ge=1, le=10)
+    delay_lo: float = Field(default=2.5, ge=0)
+    delay_hi: float = Field(default=5.0, ge=0)
+    max_workers: int = Field(default=4, ge=1, le=32)
+    per_host_concurrency: int = Field(default=1, ge=1, le=8)
+    use_cache: bool = True
+    fetch_mode: Optional[str] = Field(default=None, pattern="^(auto|http|browser)$")
+
+    @model_validator(mode="after")
+    def has_targets(self):
+        if not self.keywords and not self.search_urls:
+            raise ValueError("Provide at least one keyword or search_url.")
+        return self
+
+class ReparseRequest(BaseModel):
+    # only pages fetched at/after this time; all cached pages when omitted
+    since: Optional[datetime] = None
+    url_contains: Optional[str] = None
+
 class ProductOut(BaseModel):
     id: int
     asin: str
@@ -35,8 +62,11 @@ class ProductOut(BaseModel):
 class ProductsResponse(BaseModel):
     page: int
     page_size: int
-    total: int
+    # None when the client passed include_total=false
+    total: Optional[int] = None
     items: List[ProductOut]
+    # pass as ?cursor= to read the next page by keyset; None on the last page
+    next_cursor: Optional[str] = None
 
 class PricePoint(BaseModel):
     price: Optional[float]
@@ -44,7 +74,169 @@ class PricePoint(BaseModel):
     currency: Optional[str]
     seen_at: datetime
 
+class PriceBucket(BaseModel):
+    start: datetime
+    min_price: Optional[float]
+    max_price: Optional[float]
+    last_price: Optional[float]
+    currency: Optional[str]
+    count: int
+
 class HistoryResponse(BaseModel):
     asin: str
+    # raw points covered by the response
+    count: int
+    # "raw" fills points; "hour" | "day" | "week" fill buckets instead
+    bucket: str = "raw"
+    points: List[PricePoint] = Field(default_factory=list)
+    buckets: List[PriceBucket] = Field(default_factory=list)
+
+class HistoryBatchRequest(BaseModel):
+    asins: List[str] = Field(min_length=1, max_length=500)
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    bucket: str = Field(default="day", pattern="^(raw|hour|day|week)$")
+    limit: int = Field(default=200, ge=1, le=5000)
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    status: str
+    pages_done: int
+    items_found: int
+    rows_upserted: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class WatchCreate(BaseModel):
+    keyword: Optional[str] = Field(default=None, min_length=1)
+    search_url: Optional[HttpUrl] = None
+    domain: str = "amazon.com"
+    max_pages: int = Field(default=1, ge=1, le=10)
+    fetch_mode: Optional[str] = Field(default=None, pattern="^(auto|http|browser)$")
+    # base refresh interval; the scheduler shortens it for volatile listings and stretches it for static ones
+    interval_sec: int = Field(default=6 * 3600, ge=60)
+    enabled: bool = True
+
+    @model_validator(mode="after")
+    def xor_inputs(self):
+        if bool(self.keyword) == bool(self.search_url):
+            raise ValueError("Provide exactly one of keyword or search_url.")
+        return self
+
+class WatchOut(BaseModel):
+    id: int
+    keyword: Optional[str] = None
+    search_url: Optional[str] = None
+    domain: str
+    max_pages: int
+    fetch_mode: Optional[str] = None
+    interval_sec: int
+    enabled: bool
+    change_rate: Optional[float] = None
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    last_job_id: Optional[int] = None
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
+class StatsSummary(BaseModel):
+    products: int
+    # product count per currency ("" = unknown)
+    currencies: Dict[str, int]
+    watched_keywords: int
+    # when the price drops were last computed
+    drops_computed_at: Optional[datetime] = None
+
+class StatBucket(BaseModel):
+    # inclusive lower bound; upper bound exclusive (None = open-ended)
+    min: float
+    max: Optional[float] = None
     count: int
-    points: List[PricePoint]
+
+class CurrencyPrices(BaseModel):
+    currency: str
+    buckets: List[StatBucket]
+
+class PriceDistribution(BaseModel):
+    currencies: List[CurrencyPrices]
+
+class RatingHistogram(BaseModel):
+    # half-star buckets; the last one includes 5.0
+    buckets: List[StatBucket]
+    unrated: int
+
+class PriceDropOut(BaseModel):
+    asin: str
+    title: Optional[str] = None
+    currency: Optional[str] = None
+    from_price: float
+    to_price: float
+    drop_amount: float
+    drop_pct: float
+    class Config:
+        from_attributes = True
+
+class PriceDropsResponse(BaseModel):
+    period: str
+    computed_at: Optional[datetime] = None
+    items: List[PriceDropOut]
+
+class KeywordCount(BaseModel):
+    keyword: str
+    products: int
+
+class AlertRuleCreate(BaseModel):
+    asin: Optional[str] = Field(default=None, min_length=1, max_length=32)
+    # matches products whose title contains all of its words
+    keyword: Optional[str] = Field(default=None, min_length=1, max_length=256)
+    max_price: Optional[float] = Field(default=None, gt=0)
+    drop_pct: Optional[float] = Field(default=None, gt=0, le=100)
+    currency: Optional[str] = Field(default=None, max_length=12)
+    webhook_url: Optional[HttpUrl] = None
+    enabled: bool = True
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        if bool(self.asin) == bool(self.keyword):
+            raise ValueError("Provide exactly one of asin or keyword.")
+        if self.max_price is None and self.drop_pct is None:
+            raise ValueError("Provide max_price, drop_pct or both.")
+        return self
+
+class AlertRuleOut(BaseModel):
+    id: int
+    asin: Optional[str] = None
+    keyword: Optional[str] = None
+    max_price: Optional[float] = None
+    drop_pct: Optional[float] = None
+    currency: Optional[str] = None
+    webhook_url: Optional[str] = None
+    enabled: bool
+    created_at: datetime
+    class Config:
+        from_attributes = True
+
+class AlertOut(BaseModel):
+    id: int
+    rule_id: int
+    asin: str
+    title: Optional[str] = None
+    currency: Optional[str] = None
+    old_price: Optional[float] = None
+    new_price: float
+    # pending | sent | failed
+    status: str
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    sent_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
@@ -1,15 +1,26 @@
-from typing import Optional, List, Dict, Tuple
+from dataclasses import dataclass, field
+from html import unescape
+from typing import Callable, Iterator, Optional, List, Dict, Tuple
 from urllib.parse import quote_plus, urlparse, urljoin
 import os
+import re
+import threading
 import time
 import random
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
+
+from .driver_pool import DriverPool
+from .metrics import SCRAPE_PHASE_SECONDS
+from .page_cache import PageCache, cached
 
 
 def build_search_url(keyword: str, domain: str = "amazon.com") -> str:
@@ -64,6 +75,23 @@ USER_AGENT = (
 # Default host used for canonical links and next-page joins
 AMZ_HOST = "https://www.amazon.com"
 
+# Warm browser sessions shared by all page loads
+POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.getenv("SCRAPER_DRIVER_MAX_USES", "25"))
+
+
+# Resource loads the page doesn't need for parsing; blocked through the DevTools protocol
+BLOCK_RESOURCES = os.getenv("SCRAPER_BLOCK_RESOURCES", "1") != "0"
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.mp4", "*.webm",
+    "*amazon-adsystem.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*fls-na.amazon.com*", "*unagi.amazon.*", "*/aax2/*",
+]
+
+RESULT_CARD_CSS = "div[data-component-type='s-search-result']"
+
 
 def _make_driver() -> webdriver.Chrome:
     """
@@ -79,11 +107,12 @@ def _make_driver() -> webdriver.Chrome:
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("--disable-gpu")
-    opts.add_argument("--single-process")
     opts.add_argument("--window-size=1366,900")
     opts.add_argument(f"user-agent={USER_AGENT}")
     opts.add_experimental_option("excludeSwitches", ["enable-automation"])
     opts.add_experimental_option("useAutomationExtension", False)
+    if BLOCK_RESOURCES:
+        opts.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
 
     if chrome_bin:
         opts.binary_location = chrome_bin
@@ -96,44 +125,162 @@ def _make_driver() -> webdriver.Chrome:
 
     drv = webdriver.Chrome(service=service, options=opts)
     drv.set_page_load_timeout(45)
-    drv.implicitly_wait(5)
+    # waits are explicit (see load_page_with_browser); an implicit wait would stretch every poll
+    drv.implicitly_wait(0)
+    if BLOCK_RESOURCES:
+        drv.execute_cdp_cmd("Network.enable", {})
+        drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
     return drv
 
 
-def load_html_with_browser(
+def _start_driver() -> webdriver.Chrome:
+    with SCRAPE_PHASE_SECONDS.time("driver_start"):
+        return _make_driver()
+
+
+driver_pool = DriverPool(_start_driver, size=POOL_SIZE, max_uses=DRIVER_MAX_USES)
+
+
+@dataclass
+class BrowserPage:
+    html: Optional[str]
+    # seconds spent per phase: delay, lease, navigate, ready, scroll, serialize
+    timings: Dict[str, float] = field(default_factory=dict)
+    # False when the result cards never settled within the timeout
+    ready: bool = False
+
+
+class PhaseTimings:
+    """Running totals of browser page-load phases across the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = 0
+        self._not_ready = 0
+        self._totals: Dict[str, float] = {}
+
+    def add(self, page: BrowserPage) -> None:
+        for phase, sec in page.timings.items():
+            SCRAPE_PHASE_SECONDS.observe(sec, phase)
+        with self._lock:
+            self._pages += 1
+            self._not_ready += not page.ready
+            for phase, sec in page.timings.items():
+                self._totals[phase] = self._totals.get(phase, 0.0) + sec
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self._pages
+            return {
+                "pages": n,
+                "not_ready": self._not_ready,
+                "total_sec": {k: round(v, 3) for k, v in self._totals.items()},
+                "avg_ms": {k: round(v * 1000 / n, 1) for k, v in self._totals.items()} if n else {},
+            }
+
+
+browser_timings = PhaseTimings()
+
+_COUNT_CARDS_JS = f"return document.querySelectorAll(\"{RESULT_CARD_CSS}\").length;"
+_HAS_SLOT_JS = "return document.querySelector(arguments[0]) !== null;"
+_SCROLL_JS = (
+    "window.scrollBy(0, window.innerHeight * 2);"
+    "return window.scrollY + window.innerHeight >= document.body.scrollHeight - 4;"
+)
+
+
+class _CardsSettled:
+    """
+    WebDriverWait condition: the results container exists and the number of
+    result cards has not changed for `settle_sec`.
+    """
+
+    def __init__(self, wait_css: str, settle_sec: float):
+        self._wait_css = wait_css
+        self._settle_sec = settle_sec
+        self._count = -1
+        self._since = 0.0
+
+    def __call__(self, driver) -> bool:
+        if not driver.execute_script(_HAS_SLOT_JS, self._wait_css):
+            return False
+        count = driver.execute_script(_COUNT_CARDS_JS)
+        now = time.monotonic()
+        if count != self._count:
+            self._count, self._since = count, now
+            return False
+        return now - self._since >= self._settle_sec
+
+
+def _scroll_for_lazy_cards(driver, max_steps: int, step_wait: float, poll: float) -> None:
+    """Scroll down until a step brings no new cards or the page bottom is reached."""
+    count = driver.execute_script(_COUNT_CARDS_JS)
+    for _ in range(max_steps):
+        at_bottom = driver.execute_script(_SCROLL_JS)
+        end = time.monotonic() + step_wait
+        grew = False
+        while time.monotonic() < end:
+            time.sleep(poll)
+            n = driver.execute_script(_COUNT_CARDS_JS)
+            if n > count:
+                count, grew = n, True
+                break
+        if not grew or at_bottom:
+            return
+
+
+def load_page_with_browser(
     url: str,
     wait_css: str = "div.s-main-slot",
     delay_range: Tuple[float, float] = (2.0, 4.0),
     timeout_sec: int = 45,
-) -> str | None:
+    settle_sec: float = 0.3,
+    scroll_steps: int = 4,
+) -> BrowserPage:
+    """Load `url` in a pooled browser and return its HTML with per-phase timings."""
+    timings: Dict[str, float] = {}
     lo, hi = delay_range
+    t = time.perf_counter()
     time.sleep(random.uniform(lo, hi))
-
-    driver = _make_driver()
-    html = None
-    try:
+    timings["delay"] = time.perf_counter() - t
+
+    page = BrowserPage(html=None, timings=timings)
+    t = time.perf_counter()
+    with driver_pool.lease() as driver:
+        # waiting for a free driver, plus starting one when none is warm
+        timings["lease"] = time.perf_counter() - t
+        t = time.perf_counter()
         driver.get(url)
-        end = time.time() + timeout_sec
-        found = False
-        while time.time() < end:
-            try:
-                if driver.find_elements(By.CSS_SELECTOR, wait_css):
-                    found = True
-                    break
-            except Exception:
-                pass
-            time.sleep(0.4)
-
-        # light scroll to trigger lazy content
-        driver.execute_script("window.scrollTo(0, 1200);")
-        time.sleep(1.0)
-        driver.execute_script("window.scrollTo(0, 2400);")
-        time.sleep(0.8)
-
-        html = driver.page_source if found else driver.page_source
-    finally:
-        driver.quit()
-    return html
+        timings["navigate"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        try:
+            WebDriverWait(driver, timeout_sec, poll_frequency=0.1).until(_CardsSettled(wait_css, settle_sec))
+            page.ready = True
+        except TimeoutException:
+            pass
+        timings["ready"] = time.perf_counter() - t
+
+        # scroll only as long as it keeps bringing in lazy cards
+        t = time.perf_counter()
+        if page.ready:
+            _scroll_for_lazy_cards(driver, scroll_steps, step_wait=0.5, poll=0.1)
+        timings["scroll"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        page.html = driver.page_source
+        timings["serialize"] = time.perf_counter() - t
+    browser_timings.add(page)
+    return page
+
+
+def load_html_with_browser(
+    url: str,
+    wait_css: str = "div.s-main-slot",
+    delay_range: Tuple[float, float] = (2.0, 4.0),
+    timeout_sec: int = 45,
+) -> str | None:
+    return load_page_with_browser(url, wait_css, delay_range, timeout_sec).html
 
 
 def canonical_product_url(asin: str, host: str = AMZ_HOST) -> str:
@@ -149,7 +296,7 @@ def is_sponsored(card) -> bool:
     return badge is not None
 
 
-def parse_title_and_href(card, asin: str):
+def parse_title_and_href(card, asin: str, host: str = AMZ_HOST):
     a = None
     title = None
     selectors = [
@@ -171,36 +318,57 @@ def parse_title_and_href(card, asin: str):
     for child in a.children:
         if isinstance(child, str):
             text = child.strip()
-            if text and not any(x in text.lower() for x in ["out of", "stars", "rating"]):
+            if _is_title_text(text):
                 title_text.append(text)
         elif getattr(child, "name", None) == "span":
-            classes = child.get("class", [])
-            if not any("review" in c.lower() or "rating" in c.lower() for c in classes):
+            if _is_title_span(child.get("class", [])):
                 text = child.get_text(strip=True)
-                if (
-                    text
-                    and not (text.startswith("(") and text.endswith(")"))
-                    and not text.replace(",", "").replace(".", "").replace("K", "").replace("M", "").isdigit()
-                ):
+                if _is_title_span_text(text):
                     title_text.append(text)
     title = " ".join(title_text).strip()
     if not title:
-        import re
-
-        full_text = a.get_text(" ", strip=True)
-        full_text = re.sub(r"\(\d+\.?\d*[KM]?\)", "", full_text)
-        full_text = re.sub(r"\d+\.?\d*\s*out of\s*\d+\.?\d*\s*stars", "", full_text, flags=re.IGNORECASE)
-        full_text = re.sub(r"\d{1,3}(,\d{3})*\s*(reviews?|ratings?)", "", full_text, flags=re.IGNORECASE)
-        title = full_text.strip()
+        title = _strip_rating_noise(a.get_text(" ", strip=True))
     if not title:
         return None, None
+    return title, _product_href(a.get("href", ""), asin, host)
+
+
+def _is_title_text(text: str) -> bool:
+    return bool(text) and not any(x in text.lower() for x in ["out of", "stars", "rating"])
+
+
+def _is_title_span(classes) -> bool:
+    return not any("review" in c.lower() or "rating" in c.lower() for c in classes)
+
+
+def _is_title_span_text(text: str) -> bool:
+    """Drop '(1,234)' and bare counts like '12.5K'."""
+    return (
+        bool(text)
+        and not (text.startswith("(") and text.endswith(")"))
+        and not text.replace(",", "").replace(".", "").replace("K", "").replace("M", "").isdigit()
+    )
+
+
+_RE_COUNT_PAREN = re.compile(r"\(\d+\.?\d*[KM]?\)")
+_RE_STARS = re.compile(r"\d+\.?\d*\s*out of\s*\d+\.?\d*\s*stars", re.IGNORECASE)
+_RE_REVIEWS = re.compile(r"\d{1,3}(,\d{3})*\s*(reviews?|ratings?)", re.IGNORECASE)
 
-    href = a.get("href", "")
+
+def _strip_rating_noise(full_text: str) -> str:
+    """Anchor text minus '(1.2K)', '4.5 out of 5 stars' and '1,234 ratings' fragments."""
+    full_text = _RE_COUNT_PAREN.sub("", full_text)
+    full_text = _RE_STARS.sub("", full_text)
+    full_text = _RE_REVIEWS.sub("", full_text)
+    return full_text.strip()
+
+
+def _product_href(href: str, asin: str, host: str) -> str:
     if href.startswith("/"):
-        href = urljoin(AMZ_HOST, href)
+        href = urljoin(host, href)
     if "/sspa/" in (href or "") or "/gp/slredirect/" in (href or ""):
-        href = canonical_product_url(asin)
-    return title, href
+        href = canonical_product_url(asin, host)
+    return href
 
 
 def parse_price(card):
@@ -251,7 +419,8 @@ def parse_image(card):
     return None
 
 
-def parse_search_page(html: str):
+def parse_search_page_bs4(html: str, host: str = AMZ_HOST):
+    """Reference parser: BeautifulSoup over the whole page, heuristics for every card."""
     soup = BeautifulSoup(html, "lxml")
     root = soup.select_one("div.s-main-slot") or soup
     cards = root.select("div[data-asin][data-component-type='s-search-result']")
@@ -262,7 +431,7 @@ def parse_search_page(html: str):
             continue
         if is_sponsored(card):
             continue
-        title, href = parse_title_and_href(card, asin)
+        title, href = parse_title_and_href(card, asin, host)
         if not title or not href:
             continue
         price_raw = parse_price(card)
@@ -279,30 +448,255 @@ def parse_search_page(html: str):
             }
         )
     nxt = soup.select_one("a.s-pagination-next:not(.s-pagination-disabled)")
-    next_url = urljoin(AMZ_HOST, nxt["href"]) if nxt and nxt.has_attr("href") else None
+    next_url = urljoin(host, nxt["href"]) if nxt and nxt.has_attr("href") else None
+    return items, next_url
+
+
+# ---------- lxml fast path ----------
+#
+# parse_search_page reads the page with lxml and precompiled XPath that mirror
+# the CSS selectors above, in the same order, so results are identical to
+# parse_search_page_bs4. Only cards the fast path can't settle (unusual title
+# anchors, prices outside span.a-price) are handed to the BeautifulSoup
+# heuristics, one card at a time.
+
+def _cls(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_X_MAIN_SLOT = etree.XPath(f"//div[{_cls('s-main-slot')}]")
+_X_CARDS = etree.XPath(".//div[@data-asin][@data-component-type='s-search-result']")
+_X_SPONSORED = etree.XPath(
+    f"boolean(.//span[{_cls('s-sponsored-label-text')} or {_cls('puis-label-popover-default')}"
+    " or @aria-label='Sponsored'])"
+)
+# first three selectors of parse_title_and_href
+_X_TITLE_LINKS = [
+    etree.XPath(f".//a[{_cls('a-link-normal')}][ancestor::h2]"),
+    etree.XPath(f".//a[ancestor::h2[{_cls('a-size-mini')}]]"),
+    etree.XPath(f".//a[{_cls('a-link-normal')}][{_cls('s-link-style')}]"),
+]
+_X_OFFSCREEN_PRICE = etree.XPath(f".//span[{_cls('a-offscreen')}][ancestor::span[{_cls('a-price')}]]")
+_X_ARIA_SPANS = etree.XPath(".//span[@aria-label]")
+_X_ICON_ALT = etree.XPath(f".//span[{_cls('a-icon-alt')}]")
+_X_S_IMAGE = etree.XPath(f".//img[{_cls('s-image')}]")
+_X_ANY_IMG = etree.XPath(".//img")
+_X_NEXT = etree.XPath(f"//a[{_cls('s-pagination-next')}][not({_cls('s-pagination-disabled')})]")
+_X_HAS_COMMENT = etree.XPath("boolean(comment())")
+
+
+class _Fallback(Exception):
+    """Raised by a fast-path step that can't decide; the caller uses the bs4 heuristics."""
+
+
+def _text(el) -> str:
+    """BeautifulSoup get_text(strip=True)."""
+    return "".join(t.strip() for t in el.itertext())
+
+
+def _fast_title_and_href(card, asin: str, host: str):
+    for xp in _X_TITLE_LINKS:
+        found = xp(card)
+        if found:
+            a = found[0]
+            break
+    else:
+        raise _Fallback()
+    if _X_HAS_COMMENT(a):
+        raise _Fallback()
+
+    # same walk as parse_title_and_href over a.children: leading text, then each child and its tail
+    title_text = []
+    text = (a.text or "").strip()
+    if _is_title_text(text):
+        title_text.append(text)
+    for child in a:
+        if child.tag == "span" and _is_title_span((child.get("class") or "").split()):
+            text = _text(child)
+            if _is_title_span_text(text):
+                title_text.append(text)
+        text = (child.tail or "").strip()
+        if _is_title_text(text):
+            title_text.append(text)
+    title = " ".join(title_text).strip()
+    if not title:
+        title = _strip_rating_noise(" ".join(t.strip() for t in a.itertext() if t.strip()))
+    if not title:
+        return None, None
+    return title, _product_href(a.get("href", ""), asin, host)
+
+
+def _fast_price(card):
+    found = _X_OFFSCREEN_PRICE(card)
+    if found:
+        text = _text(found[0])
+        if text:
+            return text
+    raise _Fallback()
+
+
+def _fast_rating(card):
+    for span in _X_ARIA_SPANS(card):
+        if span.get("aria-label").endswith("out of 5 stars"):
+            return _text(span)
+    found = _X_ICON_ALT(card)
+    return _text(found[0]) if found else None
+
+
+def _fast_image(card):
+    found = _X_S_IMAGE(card) or _X_ANY_IMG(card)
+    if not found:
+        return None
+    img = found[0]
+    for k in ("src", "data-src", "data-image-src", "srcset"):
+        v = img.get(k)
+        if v:
+            if k == "srcset":
+                v = v.split()[0]
+            return v
+    return None
+
+
+def _bs4_card(card):
+    return BeautifulSoup(lxml.html.tostring(card, encoding="unicode", with_tail=False), "lxml").find("div")
+
+
+def parse_search_page(html: str, host: str = AMZ_HOST, stats: Optional[Dict[str, int]] = None):
+    """
+    Same output as parse_search_page_bs4, via the lxml fast path.
+    If `stats` is given, counts cards, skipped sponsored cards and bs4 fallbacks into it.
+    """
+    if not html or not html.strip():
+        return [], None
+    doc = lxml.html.document_fromstring(html)
+    slots = _X_MAIN_SLOT(doc)
+    root = slots[0] if slots else doc
+    items = []
+    for card in _X_CARDS(root):
+        asin = (card.get("data-asin") or "").strip()
+        if not asin:
+            continue
+        if _X_SPONSORED(card):
+            if stats is not None:
+                stats["sponsored"] = stats.get("sponsored", 0) + 1
+            continue
+        if stats is not None:
+            stats["cards"] = stats.get("cards", 0) + 1
+        soup_card = None
+        try:
+            title, href = _fast_title_and_href(card, asin, host)
+        except _Fallback:
+            soup_card = _bs4_card(card)
+            title, href = parse_title_and_href(soup_card, asin, host)
+            if stats is not None:
+                stats["title_fallbacks"] = stats.get("title_fallbacks", 0) + 1
+        if not title or not href:
+            continue
+        try:
+            price_raw = _fast_price(card)
+        except _Fallback:
+            soup_card = soup_card or _bs4_card(card)
+            price_raw = parse_price(soup_card)
+            if stats is not None:
+                stats["price_fallbacks"] = stats.get("price_fallbacks", 0) + 1
+        items.append(
+            {
+                "asin": asin,
+                "title": title,
+                "price": normalize_price(price_raw),
+                "rating": normalize_rating(_fast_rating(card)),
+                "product_url": href,
+                "image_url": _fast_image(card),
+            }
+        )
+    nxt = _X_NEXT(doc)
+    next_url = urljoin(host, nxt[0].get("href")) if nxt and nxt[0].get("href") is not None else None
     return items, next_url
 
 
+def host_for_domain(domain: str) -> str:
+    return f"https://www.{domain}"
+
+
+def host_for_url(url: str) -> str:
+    """Scheme + netloc of a search URL, or the default host if it has none."""
+    try:
+        parsed = urlparse(url)
+        if parsed.scheme and parsed.netloc:
+            return f"{parsed.scheme}://{parsed.netloc}"
+    except Exception:
+        pass
+    return AMZ_HOST
+
+
+_A_TAG = re.compile(r"<a\b[^>]*>", re.I)
+_ATTR = re.compile(r"""([^\s=/>]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+
+def find_next_url(html: Optional[str], host: str = AMZ_HOST) -> Optional[str]:
+    """
+    The page's enabled "next" link, as parse_search_page would return it, found
+    by scanning <a> tags instead of building a DOM: lets the fetcher move on to
+    the next page while the full parse runs elsewhere.
+    """
+    if not html or "s-pagination-next" not in html:
+        return None
+    for tag in _A_TAG.finditer(html):
+        if "s-pagination-next" not in tag.group(0):
+            continue
+        attrs = {m.group(1).lower(): next(g for g in m.groups()[1:] if g is not None) for m in _ATTR.finditer(tag.group(0))}
+        classes = attrs.get("class", "").split()
+        if "s-pagination-next" not in classes or "s-pagination-disabled" in classes:
+            continue
+        href = attrs.get("href")
+        return urljoin(host, unescape(href)) if href is not None else None
+    return None
+
+
+def iter_search_pages(
+    url: str,
+    host: str,
+    max_pages: int,
+    fetch: Callable[[str], Optional[str]],
+) -> Iterator[List[Dict]]:
+    """Follow 'next' links from `url`, yielding the parsed items of each page."""
+    page_no = 0
+    while url and page_no < max_pages:
+        page_no += 1
+        html = fetch(url)
+        if not html:
+            break
+        page_items, next_url = parse_search_page(html, host)
+        yield page_items
+        url = next_url
+
+
+def _polite(fetch: Optional[Callable[[str], Optional[str]]], delay: Tuple[float, float]):
+    """`fetch` (default: the browser) preceded by a uniform(lo, hi) pause."""
+    if fetch is None:
+        return lambda u: load_html_with_browser(u, delay_range=delay)
+    lo, hi = delay
+
+    def polite_fetch(url: str) -> Optional[str]:
+        time.sleep(random.uniform(lo, hi))
+        return fetch(url)
+
+    return polite_fetch
+
+
 def scrape_via_browser(
     keyword: str,
     domain: str = "amazon.com",
     max_pages: int = 2,
     delay: Tuple[float, float] = (2.5, 5.0),
+    cache: Optional[PageCache] = None,
+    fetch: Optional[Callable[[str], Optional[str]]] = None,
 ) -> List[Dict]:
-    global AMZ_HOST
-    AMZ_HOST = f"https://www.{domain}"
-
     url = build_search_url(keyword, domain=domain)
+    fetch = cached(_polite(fetch, delay), cache)
     all_items: List[Dict] = []
-    page_no = 0
-    while url and page_no < max_pages:
-        page_no += 1
-        html = load_html_with_browser(url, delay_range=delay)
-        if not html:
-            break
-        page_items, next_url = parse_search_page(html)
+    for page_items in iter_search_pages(url, host_for_domain(domain), max_pages, fetch):
         all_items.extend(page_items)
-        url = next_url
     dedup = {it["asin"]: it for it in all_items if it.get("asin")}
     return list(dedup.values())
 
@@ -311,25 +705,12 @@ def scrape_by_url(
     search_url: str,
     max_pages: int = 1,
     delay: Tuple[float, float] = (2.5, 5.0),
+    cache: Optional[PageCache] = None,
+    fetch: Optional[Callable[[str], Optional[str]]] = None,
 ) -> List[Dict]:
-    try:
-        parsed = urlparse(search_url)
-        if parsed.scheme and parsed.netloc:
-            global AMZ_HOST
-            AMZ_HOST = f"{parsed.scheme}://{parsed.netloc}"
-    except Exception:
-        pass
-
-    url = search_url
+    fetch = cached(_polite(fetch, delay), cache)
     all_items: List[Dict] = []
-    page_no = 0
-    while url and page_no < max_pages:
-        page_no += 1
-        html = load_html_with_browser(url, delay_range=delay)
-        if not html:
-            break
-        page_items, next_url = parse_search_page(html)
+    for page_items in iter_search_pages(search_url, host_for_url(search_url), max_pages, fetch):
         all_items.extend(page_items)
-        url = next_url
     dedup = {it["product_url"]: it for it in all_items if it.get("product_url")}
     return list(dedup.values())
@@ -0,0 +1,69 @@
+"""
+SQLite FTS5 index over product titles and ASINs.
+
+`products_fts` is an external-content table over `products`, kept in sync by
+triggers, so every insert/update path (ORM or ON CONFLICT upserts) updates it.
+On other backends the helpers report FTS as unavailable and callers fall back
+to ILIKE.
+"""
+from __future__ import annotations
+import re
+from typing import Optional
+
+from sqlalchemy import DDL, column, event, inspect, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .models import Product
+
+products_fts = table("products_fts", column("rowid"), column("title"), column("asin"))
+
+_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        title, asin,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, title, asin) VALUES (new.id, new.title, new.asin);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, asin) VALUES ('delete', old.id, old.title, old.asin);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF title, asin ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, asin) VALUES ('delete', old.id, old.title, old.asin);
+        INSERT INTO products_fts(rowid, title, asin) VALUES (new.id, new.title, new.asin);
+    END""",
+]
+
+# fresh databases get the index from create_all
+for _stmt in _FTS_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+
+
+def ensure_fts(bind: Engine) -> bool:
+    """Create the index on an existing SQLite database and fill it. Returns True if created."""
+    if bind.dialect.name != "sqlite" or inspect(bind).has_table("products_fts"):
+        return False
+    with bind.begin() as conn:
+        for stmt in _FTS_DDL:
+            conn.execute(text(stmt))
+        conn.execute(text("INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+    return True
+
+
+def fts_available(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def fts_match_expr(q: str) -> Optional[str]:
+    """'usb c hub' -> '"usb"* "c"* "hub"*' (all terms, prefix match). None if no terms."""
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def fts_rank():
+    """bm25 score of the current match; lower is more relevant."""
+    return text("bm25(products_fts)")
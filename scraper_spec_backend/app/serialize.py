@@ -0,0 +1,66 @@
+"""
+JSON encoding for product listings without a Pydantic round trip.
+
+Rows come from list_products(columns=...) as plain tuples and are written
+straight to bytes with orjson (stdlib json if it isn't installed), giving the
+same document ProductsResponse would, optionally trimmed to `fields`.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+import json
+
+from .schemas import ProductOut
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+PRODUCT_FIELDS: Tuple[str, ...] = tuple(ProductOut.model_fields)
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """`fields=asin,title,price` -> field names in schema order; all fields when empty."""
+    if not fields:
+        return PRODUCT_FIELDS
+    names = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = sorted(names - set(PRODUCT_FIELDS))
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PRODUCT_FIELDS)}.")
+    return tuple(f for f in PRODUCT_FIELDS if f in names)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def products_json(
+    rows: Sequence[tuple],
+    fields: Sequence[str],
+    *,
+    page: int,
+    page_size: int,
+    total: Optional[int],
+    next_cursor: Optional[str],
+) -> bytes:
+    """ProductsResponse as JSON bytes; each row starts with `fields` (extra trailing columns are ignored)."""
+    return dumps({
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "items": [dict(zip(fields, row)) for row in rows],
+        "next_cursor": next_cursor,
+    })
@@ -1,33 +1,239 @@
 from __future__ import annotations
-from typing import List, Tuple
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence, Tuple
+import threading
 from sqlalchemy.orm import Session
 
-from .schemas import ScrapeRequest
-from .scraper import scrape_via_browser, scrape_by_url
-from .crud import upsert_products, list_products, get_history
+from .schemas import (
+    ScrapeRequest,
+    BatchScrapeRequest,
+    ReparseRequest,
+    HistoryBatchRequest,
+    HistoryResponse,
+    PriceBucket,
+    PricePoint,
+    WatchCreate,
+    WatchOut,
+    StatsSummary,
+    StatBucket,
+    CurrencyPrices,
+    PriceDistribution,
+    RatingHistogram,
+    PriceDropOut,
+    PriceDropsResponse,
+    KeywordCount,
+    AlertRuleCreate,
+    AlertRuleOut,
+    AlertOut,
+)
+from .scraper import (
+    host_for_url,
+    browser_timings,
+    driver_pool,
+)
+from .page_cache import page_cache
+from .tracing import span
+from .fetchers import get_fetcher, auto_fetcher
+from .crud import (
+    bulk_upsert_products,
+    list_products,
+    get_history,
+    get_history_many,
+    get_history_buckets,
+    history_span,
+    create_job,
+    get_job,
+    add_job_progress,
+    create_watch,
+    list_watches,
+    delete_watch,
+    link_watch_products,
+    PRICE_STAT_EDGES,
+    get_product_stats,
+    get_price_drops,
+    price_drops_computed_at,
+    create_alert_rule,
+    list_alert_rules,
+    delete_alert_rule,
+    list_alerts,
+)
+from .jobs import job_runner
+from .pipeline import PIPELINE_QUEUE, UpsertWriter, parse_pool
+from .models import ScrapeJob, WatchedSearch
+from .engine import ScrapeEngine, ScrapeTarget, EngineStats
+from .pagination import next_cursor
 
 
 # ---------- Scrape orchestration ----------
 
-def run_scrape(req: ScrapeRequest) -> List[dict]:
-    """Run a scrape using either keyword or full search URL."""
-    if req.keyword:
-        return scrape_via_browser(
-            keyword=req.keyword,
-            domain=req.domain,
-            max_pages=req.max_pages,
-            delay=(req.delay_lo, req.delay_hi),
+def build_targets(req: ScrapeRequest | BatchScrapeRequest) -> List[ScrapeTarget]:
+    """Expand a single or batch request into engine targets."""
+    if isinstance(req, ScrapeRequest):
+        if req.keyword:
+            return [ScrapeTarget.for_keyword(req.keyword, req.domain)]
+        return [ScrapeTarget.for_url(str(req.search_url))]
+    targets = [ScrapeTarget.for_keyword(k, d) for k in req.keywords for d in req.domains]
+    targets += [ScrapeTarget.for_url(str(u)) for u in req.search_urls]
+    return targets
+
+
+def build_engine(req: ScrapeRequest | BatchScrapeRequest) -> ScrapeEngine:
+    fetch = get_fetcher(req.fetch_mode)
+    if isinstance(req, ScrapeRequest):
+        return ScrapeEngine(
+            max_workers=1, delay=(req.delay_lo, req.delay_hi), fetch=fetch,
+            cache=page_cache, use_cache=req.use_cache,
         )
-    return scrape_by_url(
-        search_url=str(req.search_url),
-        max_pages=req.max_pages,
+    return ScrapeEngine(
+        max_workers=req.max_workers,
+        per_host_concurrency=req.per_host_concurrency,
         delay=(req.delay_lo, req.delay_hi),
+        fetch=fetch,
+        cache=page_cache,
+        use_cache=req.use_cache,
     )
 
 
-def persist_scrape_results(db: Session, items: List[dict]) -> int:
-    """Upsert products and return # of inserted/updated rows."""
-    return upsert_products(db, items)
+# product upserts from concurrent scrapes/jobs may hit the same ASIN;
+# serialize pipeline writes in this process
+_write_lock = threading.Lock()
+
+
+def _pipeline_writer(db: Session, on_batch: Optional[Callable[[List[dict], int, int], None]] = None) -> UpsertWriter:
+    """UpsertWriter committing batches through `db`; on_batch(items, pages, changed) runs after each."""
+
+    def write(items: List[dict], pages: int) -> int:
+        with _write_lock:
+            try:
+                changed = bulk_upsert_products(db, items)
+                if on_batch is not None:
+                    on_batch(items, pages, changed)
+            except Exception:
+                db.rollback()
+                raise
+        return changed
+
+    return UpsertWriter(write)
+
+
+def scrape_and_persist(db: Session, req: ScrapeRequest | BatchScrapeRequest) -> Tuple[int, int, EngineStats]:
+    """
+    Run fetch -> parse -> upsert for a single or batch request, committing
+    pages as they are parsed. Returns (unique items fetched, rows
+    inserted/updated, engine stats).
+    """
+    with _pipeline_writer(db) as writer:
+        items, stats = build_engine(req).run(
+            build_targets(req), max_pages=req.max_pages, on_page=lambda _t, page: writer.put(page),
+        )
+    return len(items), writer.changed, stats
+
+
+def reparse_cached_pages(db: Session, req: ReparseRequest) -> dict:
+    """
+    Rebuild products from the page cache, no browser involved. The newest copy
+    of each cached URL is parsed and upserted oldest-first, with history points
+    stamped at the page's fetch time. Up to PIPELINE_QUEUE pages are parsed
+    ahead in the parse pool while earlier ones are written.
+    """
+    since = None
+    if req.since:
+        # naive datetimes are UTC, as everywhere else in the API
+        since = (req.since if req.since.tzinfo else req.since.replace(tzinfo=timezone.utc)).timestamp()
+    pages = fetched = changed = 0
+    errors: List[dict] = []
+    pending: deque = deque()
+
+    def upsert_oldest() -> None:
+        nonlocal pages, fetched, changed
+        page, parsed = pending.popleft()
+        try:
+            items = parsed.result()
+        except Exception as e:
+            errors.append({"url": page.url, "error": f"{e!s}"})
+            return
+        pages += 1
+        fetched += len(items)
+        # old prices replayed in order would look like fresh drops; no alerts
+        changed += bulk_upsert_products(
+            db, items, seen_at=datetime.utcfromtimestamp(page.fetched_at), alerts=False
+        )
+
+    for page in page_cache.pages(since=since, url_contains=req.url_contains):
+        try:
+            html = page.read()
+        except Exception as e:
+            errors.append({"url": page.url, "error": f"{e!s}"})
+            continue
+        pending.append((page, parse_pool.submit(html, host_for_url(page.url))))
+        if len(pending) >= PIPELINE_QUEUE:
+            upsert_oldest()
+    while pending:
+        upsert_oldest()
+    return {"pages": pages, "fetched": fetched, "inserted_or_updated": changed, "errors": errors}
+
+
+def scrape_diagnostics() -> dict:
+    return {
+        "browser": browser_timings.snapshot(),
+        "auto_fetch": auto_fetcher.stats(),
+        "driver_pool": driver_pool.stats(),
+        "parse_workers": parse_pool.workers,
+    }
+
+
+# ---------- Background jobs ----------
+
+def enqueue_scrape(db: Session, req: ScrapeRequest | BatchScrapeRequest, watch_id: int | None = None) -> ScrapeJob:
+    """Persist a scrape request as a queued job for the worker pool."""
+    kind = "scrape" if isinstance(req, ScrapeRequest) else "batch"
+    job = create_job(db, kind=kind, payload=req.model_dump_json(), watch_id=watch_id)
+    job_runner.notify()
+    return job
+
+
+def fetch_job(db: Session, job_id: int) -> ScrapeJob | None:
+    return get_job(db, job_id)
+
+
+def execute_job(db: Session, job: ScrapeJob) -> None:
+    """Run a claimed job, upserting and recording progress batch by batch."""
+    if job.kind == "scrape":
+        req = ScrapeRequest.model_validate_json(job.payload)
+    else:
+        req = BatchScrapeRequest.model_validate_json(job.payload)
+    job_id, watch_id = job.id, job.watch_id
+
+    def progress(items: List[dict], pages: int, changed: int) -> None:
+        if watch_id is not None:
+            # the watch's products, whose price history sets its priority
+            link_watch_products(db, watch_id, [it.get("asin") for it in items])
+        add_job_progress(db, job_id, pages=pages, items=len(items), upserted=changed)
+
+    with span("scrape.job", job_id=job_id, kind=job.kind, watch_id=watch_id):
+        with _pipeline_writer(db, progress) as writer:
+            _, stats = build_engine(req).run(
+                build_targets(req), max_pages=req.max_pages, on_page=lambda _t, page: writer.put(page),
+            )
+    if stats.errors and not stats.pages:
+        raise RuntimeError("; ".join(f"{e['target']}: {e['error']}" for e in stats.errors))
+
+
+# ---------- Watched searches ----------
+
+def add_watch(db: Session, req: WatchCreate) -> WatchedSearch:
+    fields = req.model_dump()
+    fields["search_url"] = str(req.search_url) if req.search_url else None
+    return create_watch(db, **fields)
+
+
+def fetch_watches(db: Session) -> List[WatchOut]:
+    return [WatchOut.model_validate(w) for w in list_watches(db)]
+
+
+def remove_watch(db: Session, watch_id: int) -> bool:
+    return delete_watch(db, watch_id)
 
 
 # ---------- Query helpers ----------
@@ -42,9 +248,19 @@ def fetch_products(
     page_size: int,
     order_by: str,
     order: str,
-) -> Tuple[list, int]:
-    """Return (rows, total)."""
-    return list_products(
+    cursor: str | None = None,
+    with_total: bool = True,
+    fields: Sequence[str] | None = None,
+) -> Tuple[list, int | None, str | None]:
+    """
+    Return (rows, total, next_cursor). Raises InvalidCursor for a bad cursor.
+    With `fields`, rows are tuples starting with those columns (followed by
+    whatever the cursor needs) instead of ORM objects.
+    """
+    columns = None
+    if fields is not None:
+        columns = list(fields) + [c for c in ("id", order_by) if c not in fields and c != "relevance"]
+    rows, total = list_products(
         db,
         q=q,
         min_rating=min_rating,
@@ -53,46 +269,177 @@ def fetch_products(
         page_size=page_size,
         order_by=order_by,
         order=order,
+        cursor=cursor,
+        with_total=with_total,
+        columns=columns,
     )
+    nxt = None if order_by == "relevance" else next_cursor(rows, page_size, order_by, order_by, order)
+    return rows, total, nxt
+
+
+def fetch_history_points(db: Session, asin: str, limit: int = 500):
+    """Return price-history ORM rows for an ASIN."""
+    return get_history(db, asin, limit=limit)
+
+
+_BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
 
 
-def export_products_csv(
+def _naive_utc(dt: datetime | None) -> datetime | None:
+    """seen_at is stored as naive UTC; convert an aware bound (e.g. "...Z") to match."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def pick_bucket(db: Session, asin: str, since, until, max_points: int) -> str:
+    """Finest resolution that keeps the chart within max_points."""
+    count, first, last = history_span(db, asin, since, until)
+    if count <= max_points:
+        return "raw"
+    span = ((until or last) - (since or first)).total_seconds()
+    for unit in ("hour", "day"):
+        if span / _BUCKET_SECONDS[unit] <= max_points:
+            return unit
+    return "week"
+
+
+def _history_response(asin: str, bucket: str, rows: list) -> HistoryResponse:
+    if bucket == "raw":
+        return HistoryResponse(
+            asin=asin,
+            count=len(rows),
+            bucket="raw",
+            points=[
+                PricePoint(price=r.price, price_raw=r.price_raw, currency=r.currency, seen_at=r.seen_at)
+                for r in rows
+            ],
+        )
+    return HistoryResponse(
+        asin=asin,
+        count=sum(r["count"] for r in rows),
+        bucket=bucket,
+        buckets=[
+            PriceBucket(
+                start=r["bucket"],
+                min_price=r["min_price"],
+                max_price=r["max_price"],
+                last_price=r["last_price"],
+                currency=r["currency"],
+                count=r["count"],
+            )
+            for r in rows
+        ],
+    )
+
+
+def fetch_history(
     db: Session,
+    asin: str,
     *,
-    q: str | None,
-    min_rating: float | None,
-    max_price: float | None,
-    page: int,
-    page_size: int,
-    order_by: str,
-    order: str,
-) -> str:
-    """Return CSV text for the selected products."""
-    rows, _ = fetch_products(
-        db,
-        q=q,
-        min_rating=min_rating,
-        max_price=max_price,
-        page=page,
-        page_size=page_size,
-        order_by=order_by,
-        order=order,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    bucket: str = "auto",
+    limit: int = 500,
+    max_points: int = 500,
+) -> HistoryResponse:
+    """Raw points, or min/max/last buckets; "auto" picks the bucket from the span."""
+    since, until = _naive_utc(since), _naive_utc(until)
+    if bucket == "auto":
+        bucket = pick_bucket(db, asin, since, until, max_points)
+    if bucket == "raw":
+        return _history_response(asin, "raw", get_history(db, asin, limit=limit, since=since, until=until))
+    return _history_response(asin, bucket, get_history_buckets(db, [asin], bucket, since, until))
+
+
+def fetch_history_batch(db: Session, req: HistoryBatchRequest) -> List[HistoryResponse]:
+    """History for many ASINs with one query; ASINs without points get an empty entry."""
+    asins = list(dict.fromkeys(req.asins))
+    since, until = _naive_utc(req.since), _naive_utc(req.until)
+    grouped: dict = {a: [] for a in asins}
+    if req.bucket == "raw":
+        for r in get_history_many(db, asins, limit=req.limit, since=since, until=until):
+            grouped[r.asin].append(r)
+    else:
+        for r in get_history_buckets(db, asins, req.bucket, since, until):
+            grouped[r["asin"]].append(r)
+    return [_history_response(a, req.bucket, grouped[a]) for a in asins]
+
+
+# ---------- Precomputed stats ----------
+
+def fetch_stats_summary(db: Session) -> StatsSummary:
+    currencies = get_product_stats(db, "currency")
+    return StatsSummary(
+        products=sum(currencies.values()),
+        currencies=currencies,
+        watched_keywords=len(get_product_stats(db, "keyword")),
+        drops_computed_at=price_drops_computed_at(db),
     )
 
-    cols = [
-        "asin", "title", "product_url", "image_url",
-        "price", "price_raw", "currency",
-        "rating", "rating_count",
-        "created_at", "updated_at",
-    ]
-    lines = [",".join(cols)]
-    for r in rows:
-        # keep CSV simple; strip commas from fields
-        row = [str(getattr(r, c) or "").replace(",", " ") for c in cols]
-        lines.append(",".join(row))
-    return "\n".join(lines)
 
+def fetch_price_distribution(db: Session, currency: str | None = None) -> PriceDistribution:
+    """Products per price bucket (PRICE_STAT_EDGES) for each currency, empty buckets included."""
+    per_currency: dict = {}
+    for key, count in get_product_stats(db, "price").items():
+        cur, _, floor = key.rpartition("|")
+        per_currency.setdefault(cur, {})[float(floor)] = count
+    edges = [float(e) for e in PRICE_STAT_EDGES]
+    out = []
+    for cur in sorted(per_currency):
+        if currency is not None and cur != currency:
+            continue
+        counts = per_currency[cur]
+        out.append(CurrencyPrices(currency=cur, buckets=[
+            StatBucket(min=lo, max=edges[i + 1] if i + 1 < len(edges) else None, count=counts.get(lo, 0))
+            for i, lo in enumerate(edges)
+        ]))
+    return PriceDistribution(currencies=out)
+
+
+def fetch_rating_histogram(db: Session) -> RatingHistogram:
+    counts = get_product_stats(db, "rating")
+    return RatingHistogram(
+        buckets=[
+            StatBucket(min=lo / 2, max=(lo + 1) / 2, count=counts.get(f"{lo / 2:.1f}", 0))
+            for lo in range(10)
+        ],
+        unrated=counts.get("", 0),
+    )
+
+
+def fetch_price_drops(db: Session, period: str, limit: int = 20, currency: str | None = None) -> PriceDropsResponse:
+    rows = get_price_drops(db, period, limit, currency)
+    return PriceDropsResponse(
+        period=period,
+        computed_at=rows[0].computed_at if rows else None,
+        items=[PriceDropOut.model_validate(r) for r in rows],
+    )
+
+
+def fetch_keyword_counts(db: Session) -> List[KeywordCount]:
+    counts = get_product_stats(db, "keyword")
+    return [KeywordCount(keyword=k, products=n) for k, n in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))]
+
+
+# ---------- Price alerts ----------
+
+def add_alert_rule(db: Session, req: AlertRuleCreate) -> AlertRuleOut:
+    fields = req.model_dump()
+    fields["webhook_url"] = str(req.webhook_url) if req.webhook_url else None
+    if req.currency:
+        fields["currency"] = req.currency.upper()
+    return AlertRuleOut.model_validate(create_alert_rule(db, **fields))
+
+
+def fetch_alert_rules(db: Session) -> List[AlertRuleOut]:
+    return [AlertRuleOut.model_validate(r) for r in list_alert_rules(db)]
+
+
+def remove_alert_rule(db: Session, rule_id: int) -> bool:
+    return delete_alert_rule(db, rule_id)
+
+
+def fetch_alerts(db: Session, status: str | None = None, limit: int = 50) -> List[AlertOut]:
+    return [AlertOut.model_validate(a) for a in list_alerts(db, status, limit)]
 
-def fetch_history_points(db: Session, asin: str, limit: int = 500):
-    """Return price-history ORM rows for an ASIN."""
-    return get_history(db, asin, limit=limit)
@@ -0,0 +1,180 @@
+"""
+Precomputed aggregates behind the /stats endpoints.
+
+- Product counts by currency, per-currency price bucket and half-star rating
+  (product_stats) are adjusted by upsert_products / bulk_upsert_products in the
+  same transaction as the rows they describe, so they are always current.
+  They are built from a full scan only once, by the first refresh that finds
+  no "built" marker row (or with --rebuild).
+- The biggest price drops per period (price_drops) and products per watched
+  keyword are rewritten every STATS_REFRESH_SEC. The drop query only reads
+  products whose price changed within the period.
+
+The API refreshes in-process (STATS_REFRESH_SEC=0 turns it off); by hand:
+
+    python -m app.stats [--rebuild]
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import argparse
+import os
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session, aliased
+
+from .db import SessionLocal
+from .crud import apply_stat_deltas, product_stat_keys
+from .maintenance import MaintenanceRunner
+from .models import PriceDrop, PriceHistory, PriceHistoryRollup, Product, ProductStat, WatchedProduct, WatchedSearch
+
+REFRESH_SEC = float(os.getenv("STATS_REFRESH_SEC", "300"))
+TOP_DROPS = int(os.getenv("STATS_TOP_DROPS", "100"))
+
+DROP_PERIODS = {"24h": timedelta(days=1), "7d": timedelta(days=7)}
+# dimensions maintained by the upserts (the rest are rewritten on refresh)
+INGEST_DIMENSIONS = ("currency", "price", "rating")
+# written with the full recount; until it exists, the counts only cover
+# products upserted since the table was created
+BUILT_MARKER = ("meta", "built")
+
+# serializes rebuilds across processes on Postgres
+_PG_LOCK_KEY = 0x73746174
+
+
+def _is_built(db: Session) -> bool:
+    dimension, key = BUILT_MARKER
+    return db.get(ProductStat, (dimension, key)) is not None
+
+
+def rebuild_product_stats(db: Session, only_if_unbuilt: bool = False) -> Optional[int]:
+    """
+    Recount the ingest-maintained dimensions from products; returns the number
+    of products counted, or None when `only_if_unbuilt` and a recount already ran.
+    """
+    if only_if_unbuilt and _is_built(db):
+        db.rollback()
+        return None
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _PG_LOCK_KEY})
+        # upserts in flight commit (products and their deltas) before the scan starts
+        db.execute(text("LOCK TABLE products IN SHARE MODE"))
+        if only_if_unbuilt and _is_built(db):
+            db.rollback()
+            return None
+    dimension, key = BUILT_MARKER
+    db.execute(delete(ProductStat).where(
+        ProductStat.dimension.in_(INGEST_DIMENSIONS)
+        | ((ProductStat.dimension == dimension) & (ProductStat.key == key))
+    ))
+    deltas: Dict[tuple, int] = {}
+    products = 0
+    rows = db.execute(
+        select(Product.currency, Product.price, Product.rating).execution_options(yield_per=5000)
+    )
+    for currency, price, rating in rows:
+        products += 1
+        for k in product_stat_keys(currency, price, rating):
+            deltas[k] = deltas.get(k, 0) + 1
+    apply_stat_deltas(db, deltas)
+    db.execute(insert(ProductStat).values(dimension=dimension, key=key, count=products))
+    db.commit()
+    return products
+
+
+def _prior_price(since: datetime):
+    """Correlated: the product's price at `since` (newest raw point, else newest rollup, before it)."""
+    ph = aliased(PriceHistory)
+    raw = (
+        select(ph.price).where(ph.asin == Product.asin, ph.seen_at <= since)
+        .order_by(ph.seen_at.desc()).limit(1).scalar_subquery()
+    )
+    rollup = (
+        select(PriceHistoryRollup.last_price)
+        .where(PriceHistoryRollup.asin == Product.asin, PriceHistoryRollup.last_seen_at <= since)
+        .order_by(PriceHistoryRollup.last_seen_at.desc()).limit(1).scalar_subquery()
+    )
+    return func.coalesce(raw, rollup)
+
+
+def price_drops(db: Session, since: datetime, top: int = TOP_DROPS) -> list:
+    """
+    Products whose current price is below the highest price they had since
+    `since` (including the price they entered the period with), biggest
+    relative drop first.
+    """
+    peak = (
+        select(PriceHistory.asin, func.max(PriceHistory.price).label("peak"))
+        .where(PriceHistory.seen_at > since)
+        .group_by(PriceHistory.asin)
+        .subquery()
+    )
+    stmt = (
+        select(Product.asin, Product.title, Product.currency, Product.price, peak.c.peak, _prior_price(since))
+        .join(peak, peak.c.asin == Product.asin)
+        .where(Product.price.is_not(None))
+    )
+    drops = []
+    for asin, title, currency, price, top_price, prior in db.execute(stmt):
+        start = max(p for p in (top_price, prior, price) if p is not None)
+        if price < start and start > 0:
+            drops.append({
+                "asin": asin, "title": title, "currency": currency,
+                "from_price": start, "to_price": price,
+                "drop_amount": start - price, "drop_pct": round((start - price) / start * 100, 2),
+            })
+    drops.sort(key=lambda d: (-d["drop_pct"], d["asin"]))
+    return drops[:top]
+
+
+def refresh_price_drops(db: Session, now: Optional[datetime] = None, top: int = TOP_DROPS) -> Dict[str, int]:
+    now = now or datetime.utcnow()
+    written = {}
+    for period, span in DROP_PERIODS.items():
+        rows = price_drops(db, now - span, top)
+        db.execute(delete(PriceDrop).where(PriceDrop.period == period))
+        if rows:
+            db.execute(insert(PriceDrop), [dict(r, period=period, computed_at=now) for r in rows])
+        written[period] = len(rows)
+    db.commit()
+    return written
+
+
+def refresh_keyword_counts(db: Session) -> int:
+    """Distinct products each watched keyword (or search URL) has returned."""
+    label = func.substr(func.coalesce(WatchedSearch.keyword, WatchedSearch.search_url), 1, 256)
+    rows = db.execute(
+        select(label, func.count(func.distinct(WatchedProduct.asin)))
+        .join(WatchedProduct, WatchedProduct.watch_id == WatchedSearch.id)
+        .group_by(label)
+    ).all()
+    db.execute(delete(ProductStat).where(ProductStat.dimension == "keyword"))
+    if rows:
+        db.execute(insert(ProductStat), [{"dimension": "keyword", "key": k, "count": n} for k, n in rows])
+    db.commit()
+    return len(rows)
+
+
+def refresh_stats(db: Session, now: Optional[datetime] = None) -> dict:
+    return {
+        "rebuilt": rebuild_product_stats(db, only_if_unbuilt=True),
+        "drops": refresh_price_drops(db, now),
+        "keywords": refresh_keyword_counts(db),
+    }
+
+
+stats_runner = MaintenanceRunner(interval_sec=REFRESH_SEC, task=refresh_stats, name="stats refresh", immediate=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.stats", description="Refresh the /stats aggregates.")
+    ap.add_argument("--rebuild", action="store_true", help="recount product_stats from the products table")
+    args = ap.parse_args()
+    with SessionLocal() as db:
+        if args.rebuild:
+            print({"rebuilt": rebuild_product_stats(db)})
+        print(refresh_stats(db))
+
+
+if __name__ == "__main__":
+    main()
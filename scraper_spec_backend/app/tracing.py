@@ -0,0 +1,47 @@
+"""
+Optional OpenTelemetry spans for scrape jobs.
+
+With `opentelemetry-api` installed (plus an SDK and exporter configured the
+usual way, e.g. `opentelemetry-instrument`), one job produces a span tree:
+
+    scrape.job > scrape.target > scrape.fetch, scrape.parse
+               > scrape.upsert
+
+Without it every helper here is a no-op.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    from opentelemetry import context as otel_context, trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_context = trace = None
+
+_tracer = trace.get_tracer("scraper") if trace is not None else None
+
+
+def _attrs(attributes: dict) -> dict:
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def current() -> Optional[Any]:
+    """The active trace context, to parent spans started on other threads."""
+    return otel_context.get_current() if otel_context is not None else None
+
+
+@contextmanager
+def span(name: str, parent: Optional[Any] = None, **attributes) -> Iterator[None]:
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, context=parent, attributes=_attrs(attributes)):
+        yield
+
+
+def record_span(name: str, start_ns: int, end_ns: int, parent: Optional[Any] = None, **attributes) -> None:
+    """A finished span for work timed elsewhere (e.g. in a parse worker process)."""
+    if _tracer is None:
+        return
+    s = _tracer.start_span(name, context=parent, start_time=start_ns, attributes=_attrs(attributes))
+    s.end(end_time=end_ns)
@@ -0,0 +1,74 @@
+"""
+Runs the whole offline benchmark suite (parser + database):
+
+    python -m bench [--quick] [--sizes 10000,100000] [--json out.json]
+                    [--baseline base.json --tolerance 0.25 --min-ms 1]
+
+With --baseline, every metric is compared to the same metric in a previous
+--json file and the run exits non-zero if any got worse by more than
+--tolerance (throughput falling, p50 latency rising by more than --min-ms).
+Intended for CI.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+from . import bench_db, bench_parse
+from .common import Result
+
+
+def _key(r: dict) -> str:
+    return f"{r['bench']}:{r['name']}:{r['metric']}"
+
+
+def regressions(current: List[Result], baseline: List[dict], tolerance: float, min_ms: float = 0.0) -> List[str]:
+    base: Dict[str, dict] = {_key(r): r for r in baseline}
+    out = []
+    for r in current:
+        b = base.get(_key(r.as_dict()))
+        # p99 over a few dozen samples is reported, not gated: it is mostly scheduler jitter
+        if r.metric == "p99_ms" or not b or not b["value"]:
+            continue
+        ratio = r.value / b["value"]
+        if r.better == "higher":
+            worse = ratio < 1 - tolerance
+        else:
+            # sub-millisecond latencies are mostly timer noise
+            worse = ratio > 1 + tolerance and r.value - b["value"] > min_ms
+        if worse:
+            out.append(f"{_key(r.as_dict())}: {b['value']:.2f} -> {r.value:.2f} {r.unit}")
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(prog="python -m bench")
+    ap.add_argument("--quick", action="store_true", help="fewer repeats and a 10k catalogue only")
+    ap.add_argument("--sizes", default=None, help="catalogue sizes for the DB benchmark (default 10000,100000)")
+    ap.add_argument("--json", dest="json_out", default=None, help="write results to this file")
+    ap.add_argument("--baseline", default=None, help="results file from an earlier run to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    ap.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes smaller than this (default 1.0)")
+    args = ap.parse_args()
+
+    sizes = args.sizes or ("10000" if args.quick else "10000,100000")
+    results = bench_parse.run(repeat=5 if args.quick else 20)
+    results += bench_db.run([int(s) for s in sizes.split(",")], samples=10 if args.quick else 30)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump([r.as_dict() for r in results], f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            bad = regressions(results, json.load(f), args.tolerance, args.min_ms)
+        if bad:
+            print(f"\n{len(bad)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in bad:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
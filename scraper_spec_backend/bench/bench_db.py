@@ -0,0 +1,123 @@
+"""
+Ingest and query benchmark on synthetic catalogues in a temp SQLite file.
+
+Per catalogue size:
+  * upsert rows/s: initial load through bulk_upsert_products, a re-scrape with
+    10% of prices changed, and the per-row upsert_products path on a sample;
+  * list_products p50/p99 latency for every sort x filter combination, on the
+    first page, at a deep offset, and by cursor at the same depth.
+
+    python -m bench.bench_db [--sizes 10000,100000] [--samples 30]
+"""
+import argparse
+import time
+from typing import List
+
+from app.crud import bulk_upsert_products, list_products, upsert_products
+from app.pagination import encode_cursor
+from .common import Result, percentile, reprice, synthetic_items, temp_db
+
+SORTS = ["created_at", "updated_at", "price", "rating", "title"]
+FILTERS = {
+    "none": {},
+    "q": {"q": "wireless"},
+    "min_rating": {"min_rating": 4.0},
+    "max_price": {"max_price": 50.0},
+    "combined": {"q": "keyboard", "min_rating": 3.5, "max_price": 200.0},
+}
+PAGE_SIZE = 20
+CHUNK = 1000
+ROW_PATH_SAMPLE = 2000
+
+
+def _ingest(db, items: List[dict]) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(items), CHUNK):
+        bulk_upsert_products(db, items[i:i + CHUNK])
+    return len(items) / (time.perf_counter() - t0)
+
+
+def _latencies(fn, samples: int) -> List[float]:
+    fn()  # warm the page cache and statement cache
+    out = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def bench_upsert(db, size: int) -> List[Result]:
+    items = synthetic_items(size)
+    load = _ingest(db, items)
+    rescrape = _ingest(db, reprice(items, 0.10))
+
+    sample = reprice(items[:ROW_PATH_SAMPLE], 0.10, seed=13)
+    t0 = time.perf_counter()
+    upsert_products(db, sample)
+    row_path = len(sample) / (time.perf_counter() - t0)
+    return [
+        Result("db", f"{size}/upsert/bulk_load", "rows_per_sec", load, "rows/s"),
+        Result("db", f"{size}/upsert/bulk_rescrape", "rows_per_sec", rescrape, "rows/s"),
+        Result("db", f"{size}/upsert/row_path", "rows_per_sec", row_path, "rows/s"),
+    ]
+
+
+def bench_queries(db, size: int, samples: int) -> List[Result]:
+    results = []
+    for order_by in SORTS:
+        for fname, flt in FILTERS.items():
+            args = dict(q=None, min_rating=None, max_price=None, page_size=PAGE_SIZE,
+                        order_by=order_by, order="desc", with_total=False)
+            args.update(flt)
+
+            # deep = halfway through this filter's matches; the cursor points at the same depth
+            _, matches = list_products(db, page=1, **{**args, "with_total": True})
+            deep_page = max(1, matches // PAGE_SIZE // 2)
+            above, _ = list_products(db, page=deep_page - 1, **args) if deep_page > 1 else ([], None)
+            cursor = encode_cursor(order_by, "desc", getattr(above[-1], order_by), above[-1].id) if above else None
+
+            modes = {
+                "first": lambda: list_products(db, page=1, **args),
+                "deep_offset": lambda: list_products(db, page=deep_page, **args),
+                "cursor": lambda: list_products(db, page=1, cursor=cursor, **args),
+                "first+total": lambda: list_products(db, page=1, **{**args, "with_total": True}),
+            }
+            for mode, fn in modes.items():
+                if mode == "cursor" and cursor is None:
+                    continue
+                lat = _latencies(fn, samples)
+                name = f"{size}/products/{order_by}/{fname}/{mode}"
+                results.append(Result("db", name, "p50_ms", percentile(lat, 50), "ms", "lower"))
+                results.append(Result("db", name, "p99_ms", percentile(lat, 99), "ms", "lower"))
+            db.rollback()
+    return results
+
+
+def run(sizes: List[int], samples: int = 30, verbose: bool = True) -> List[Result]:
+    results: List[Result] = []
+    for size in sizes:
+        with temp_db() as db:
+            up = bench_upsert(db, size)
+            if verbose:
+                for r in up:
+                    print(f"{r.name:<48}{r.value:>12.0f} {r.unit}")
+            qs = bench_queries(db, size, samples)
+            if verbose:
+                print(f"{'query (' + str(size) + ' rows)':<48}{'p50 ms':>10}{'p99 ms':>10}")
+                for p50, p99 in zip(qs[::2], qs[1::2]):
+                    print(f"{p50.name.split('/', 2)[2]:<48}{p50.value:>10.2f}{p99.value:>10.2f}")
+            results += up + qs
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000", help="comma-separated catalogue sizes, e.g. 10000,100000,1000000")
+    ap.add_argument("--samples", type=int, default=30)
+    args = ap.parse_args()
+    run([int(s) for s in args.sizes.split(",")], args.samples)
+
+
+if __name__ == "__main__":
+    main()
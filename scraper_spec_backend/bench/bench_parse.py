@@ -0,0 +1,88 @@
+"""
+Parser benchmark over the stored pages in bench/fixtures.
+
+For every page, checks that the lxml fast path (parse_search_page) returns
+exactly what the BeautifulSoup reference (parse_search_page_bs4) returns, then
+reports cards parsed per second for both and how often the fast path fell back.
+normalize_price / normalize_rating are timed over every raw string on the pages:
+
+    python -m bench.bench_parse [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from typing import List
+
+from app.scraper import normalize_price, normalize_rating, parse_search_page, parse_search_page_bs4
+from .common import FIXTURES, Result
+
+_OFFSCREEN = re.compile(r'<span class="a-offscreen">([^<]+)</span>')
+_STARS = re.compile(r'<span class="a-icon-alt">([^<]+)</span>')
+
+
+def cards_per_sec(fn, html: str, repeat: int) -> float:
+    n = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        items, _ = fn(html)
+        n += len(items)
+    return n / (time.perf_counter() - t0)
+
+
+def calls_per_sec(fn, values: list, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for v in values:
+            fn(v)
+    return len(values) * repeat / (time.perf_counter() - t0)
+
+
+def run(repeat: int = 20, verbose: bool = True) -> List[Result]:
+    results: List[Result] = []
+    prices, ratings = [], []
+    if verbose:
+        print(f"{'page':<28}{'cards':>6}{'bs4 c/s':>10}{'fast c/s':>10}{'speedup':>9}  fallbacks")
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        name = os.path.basename(path)[:-len(".html")]
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        stats: dict = {}
+        fast = parse_search_page(html, stats=stats)
+        if fast != parse_search_page_bs4(html):
+            raise SystemExit(f"{path}: fast path output differs from parse_search_page_bs4")
+        prices += _OFFSCREEN.findall(html)
+        ratings += _STARS.findall(html)
+
+        slow_rate = cards_per_sec(parse_search_page_bs4, html, repeat)
+        fast_rate = cards_per_sec(parse_search_page, html, repeat)
+        results += [
+            Result("parse", f"{name}/bs4", "cards_per_sec", slow_rate, "cards/s"),
+            Result("parse", f"{name}/fast", "cards_per_sec", fast_rate, "cards/s"),
+        ]
+        if verbose:
+            fallbacks = {k: v for k, v in stats.items() if k != "cards"}
+            print(
+                f"{name + '.html':<28}{len(fast[0]):>6}{slow_rate:>10.0f}{fast_rate:>10.0f}"
+                f"{fast_rate / slow_rate:>8.1f}x  {fallbacks or '-'}"
+            )
+
+    norm_repeat = max(1, repeat * 10)
+    for fn, values in ((normalize_price, prices), (normalize_rating, ratings)):
+        rate = calls_per_sec(fn, values, norm_repeat)
+        results.append(Result("parse", fn.__name__, "calls_per_sec", rate, "calls/s"))
+        if verbose:
+            print(f"{fn.__name__:<28}{len(values):>6}{rate:>20.0f} calls/s")
+    return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
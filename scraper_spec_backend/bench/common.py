@@ -0,0 +1,92 @@
+"""Shared helpers for the benchmark suite: results, timing, temp databases, synthetic catalogues."""
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Iterator, List
+import os
+import random
+import shutil
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import Base
+import app.crud  # noqa: F401  registers models and the FTS index DDL
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+WORDS = (
+    "wireless bluetooth headphones noise cancelling over ear stereo bass portable charger usb c hub "
+    "adapter 4k hdmi laptop stand aluminum ergonomic mechanical keyboard rgb gaming mouse ultralight "
+    "kettle electric stainless steel coffee grinder burr case cable speaker monitor webcam tripod"
+).split()
+
+
+@dataclass
+class Result:
+    bench: str
+    name: str
+    metric: str
+    value: float
+    unit: str
+    # "higher" for throughput, "lower" for latency
+    better: str = "higher"
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    s = sorted(samples)
+    if not s:
+        return 0.0
+    k = min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+@contextmanager
+def temp_db() -> Iterator[Session]:
+    """A fresh SQLite file with the app schema, removed afterwards."""
+    tmp = tempfile.mkdtemp(prefix="scraper-bench-")
+    engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    try:
+        yield db
+    finally:
+        db.close()
+        engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def synthetic_items(n: int, seed: int = 7, start: int = 0) -> List[dict]:
+    """Scraper-shaped product dicts with realistic nulls (no price ~10%, no rating ~15%)."""
+    rng = random.Random(seed)
+    items = []
+    for i in range(start, start + n):
+        price = round(rng.uniform(3, 600), 2) if rng.random() < 0.9 else None
+        items.append({
+            "asin": f"B{i:09d}",
+            "title": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 14))),
+            "product_url": f"https://www.amazon.com/dp/B{i:09d}",
+            "image_url": f"https://m.media-amazon.com/images/I/B{i:09d}.jpg",
+            "price": price,
+            "price_raw": f"${price:.2f}" if price is not None else None,
+            "rating": round(rng.uniform(2.5, 5.0), 1) if rng.random() < 0.85 else None,
+            "rating_count": rng.randint(0, 50000),
+        })
+    return items
+
+
+def reprice(items: List[dict], fraction: float, seed: int = 11) -> List[dict]:
+    """Copy of `items` with `fraction` of the prices changed, as a re-scrape would see it."""
+    rng = random.Random(seed)
+    out = []
+    for it in items:
+        it = dict(it)
+        if it["price"] is not None and rng.random() < fraction:
+            it["price"] = round(it["price"] * rng.uniform(0.7, 1.1), 2)
+            it["price_raw"] = f"${it['price']:.2f}"
+        out.append(it)
+    return out
@@ -0,0 +1,169 @@
+"""
+Regenerates bench/fixtures/*.html: offline search-result pages modelled on
+Amazon's markup (classic and grid title layouts, $/€/£/AED prices, sponsored
+cards, cards without price or rating, page-sized script/style noise).
+Seeded, so the output is stable:
+
+    python -m bench.make_fixtures
+"""
+import os
+import random
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# name, title layout, currency symbol, domain suffix
+PAGES = [
+    ("amazon_com_classic", "classic", "$", "com"),
+    ("amazon_de_grid", "grid", "€", "de"),
+    ("amazon_ae_classic", "classic", "AED", "ae"),
+    ("amazon_co_uk_grid", "grid", "£", "co.uk"),
+]
+CARDS_PER_PAGE = 48
+
+WORDS = (
+    "wireless bluetooth headphones noise cancelling over ear stereo bass portable charger usb c hub "
+    "adapter 4k hdmi laptop stand aluminum ergonomic mechanical keyboard rgb gaming mouse ultralight "
+    "kettle electric stainless steel coffee grinder burr"
+).split()
+
+
+def _title(rng: random.Random) -> str:
+    n = rng.randint(6, 16)
+    return " ".join(rng.choice(WORDS).capitalize() if i == 0 else rng.choice(WORDS) for i in range(n))
+
+
+def _asin(rng: random.Random) -> str:
+    return "B0" + "".join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(8))
+
+
+def _price_block(sym: str, v: float) -> str:
+    w, f = divmod(int(v * 100), 100)
+    if sym == "$":
+        off = f"${w:,}.{f:02d}"
+    elif sym == "€":
+        off = f"{w:,}".replace(",", ".") + f",{f:02d} €"
+    elif sym == "£":
+        off = f"£{w:,}.{f:02d}"
+    else:
+        off = f"{sym} {w:,}.{f:02d}"
+    return (
+        '<div class="a-row a-size-base a-color-base"><a class="a-link-normal s-no-hover s-underline-text '
+        's-underline-link-text s-link-style a-text-normal" href="/dp/X">'
+        f'<span class="a-price" data-a-size="xl" data-a-color="base"><span class="a-offscreen">{off}</span>'
+        f'<span aria-hidden="true"><span class="a-price-symbol">{sym}</span><span class="a-price-whole">{w:,}'
+        f'<span class="a-price-decimal">.</span></span><span class="a-price-fraction">{f:02d}</span></span>'
+        "</span></a></div>"
+    )
+
+
+def _rating_block(r: str, n: int) -> str:
+    return (
+        f'<div class="a-row a-size-small"><span aria-label="{r} out of 5 stars"><a class="a-popover-trigger '
+        'a-declarative" href="javascript:void(0)"><i class="a-icon a-icon-star-small a-star-small-4-5 '
+        f'aok-align-bottom"><span class="a-icon-alt">{r} out of 5 stars</span></i></a></span>'
+        f'<span aria-label="{n:,}"><a class="a-link-normal s-underline-text s-underline-link-text s-link-style" '
+        f'href="/dp/X#customerReviews"><span class="a-size-base s-underline-text">{n:,}</span></a></span></div>'
+    )
+
+
+def _card(rng: random.Random, layout: str, sym: str, i: int) -> str:
+    a = _asin(rng)
+    t = _title(rng)
+    sponsored = rng.random() < 0.12
+    if sponsored:
+        href = f"/sspa/click?ie=UTF8&spc=MTo&url=%2Fdp%2F{a}"
+    else:
+        href = f"/{t.replace(' ', '-')[:60]}/dp/{a}/ref=sr_1_{i}?keywords=x&qid=1700000000&sr=8-{i}"
+    img_attr = (
+        f'src="https://m.media-amazon.com/images/I/{a}._AC_UY218_.jpg" '
+        f'srcset="https://m.media-amazon.com/images/I/{a}._AC_UY218_.jpg 1x, '
+        f'https://m.media-amazon.com/images/I/{a}._AC_UY327_.jpg 1.5x"'
+    )
+    if layout == "classic":
+        title_html = (
+            '<div class="a-section a-spacing-none puis-padding-right-small s-title-instructions-style">'
+            '<h2 class="a-size-mini a-spacing-none a-color-base s-line-clamp-2">'
+            '<a class="a-link-normal s-underline-text s-underline-link-text s-link-style a-text-normal" '
+            f'href="{href}"><span class="a-size-medium a-color-base a-text-normal">{t}</span></a></h2></div>'
+        )
+    else:
+        title_html = (
+            f'<a class="a-link-normal s-line-clamp-2 s-link-style a-text-normal" href="{href}">'
+            f'<h2 aria-label="{t}" class="a-size-base-plus a-spacing-none a-color-base a-text-normal">'
+            f"<span>{t}</span></h2></a>"
+        )
+    spons = (
+        '<span class="puis-label-popover-default"><span class="a-color-secondary">Sponsored</span></span>'
+        if sponsored else ""
+    )
+    has_price = rng.random() < 0.9
+    has_rating = rng.random() < 0.85
+    parts = [
+        f'<div data-asin="{a}" data-index="{i}" data-uuid="{rng.getrandbits(64):x}" '
+        'data-component-type="s-search-result" class="sg-col-4-of-24 sg-col-4-of-12 s-result-item s-asin '
+        'sg-col-4-of-16 sg-col s-widget-spacing-small sg-col-4-of-20">',
+        f'<div class="sg-col-inner"><div cel_widget_id="MAIN-SEARCH_RESULTS-{i}" class="s-widget-container '
+        's-spacing-small s-widget-container-height-small celwidget slot=MAIN template=SEARCH_RESULTS '
+        f'widgetId=search-results_{i}">',
+        '<div data-component-type="s-impression-logger" class="rush-component"><div class="puis-card-container '
+        's-card-container s-overflow-hidden aok-relative puis-include-content-margin puis puis-v2 '
+        's-latency-cf-section puis-card-border">',
+        '<div class="a-section a-spacing-base"><div class="s-product-image-container aok-relative s-text-center '
+        's-image-overlay-grey puis-image-overlay-grey s-padding-left-small s-padding-right-small '
+        'puis-spacing-small s-height-equalized puis puis-v2"><span data-component-type="s-product-image" '
+        f'class="rush-component"><a class="a-link-normal s-no-outline" href="{href}"><div class="a-section '
+        f'aok-relative s-image-square-aspect"><img class="s-image" {img_attr} alt="{t}" data-image-index="{i}" '
+        'data-image-load=""/></div></a></span></div>',
+        '<div class="a-section a-spacing-small puis-padding-left-small puis-padding-right-small">',
+        spons,
+        title_html,
+    ]
+    if has_rating:
+        parts.append(_rating_block(rng.choice(["4.1", "4.3", "4.5", "4.6", "3.9"]), rng.randint(3, 90000)))
+    if has_price:
+        parts.append(_price_block(sym, rng.uniform(5, 400)))
+    else:
+        parts.append(
+            '<div class="a-row a-size-base a-color-secondary"><span class="a-color-base">'
+            "No featured offers available</span></div>"
+        )
+    parts.append(
+        '<div class="a-row a-size-base a-color-secondary s-align-children-center"><span class="a-color-base '
+        'a-text-bold">FREE delivery</span></div></div></div></div></div></div></div></div>'
+    )
+    return "".join(parts)
+
+
+def make_page(rng: random.Random, layout: str, sym: str, n: int, domain: str) -> str:
+    script = "<script>" + (
+        "var P=window.P||{};P.when('A').execute(function(A){A.declarative('s-x','click',function(){});});" * 80
+    ) + "</script>"
+    head = (
+        f"<!doctype html><html lang='en-us'><head><meta charset='utf-8'><title>Amazon {domain} : search</title>"
+        f"{script * 4}<style>" + (".s-x{{margin:0}}" * 400) + "</style></head><body>"
+    )
+    nav = "<header id='navbar'>" + ("<a class='nav-a' href='/gp/help'>Help</a>" * 120) + "</header>"
+    cards = "".join(_card(rng, layout, sym, i) for i in range(1, n + 1))
+    pagination = (
+        '<span class="s-pagination-strip"><a href="/s?k=x&amp;page=2&amp;qid=1700000000&amp;ref=sr_pg_1" '
+        'aria-label="Go to next page, page 2" class="s-pagination-item s-pagination-next s-pagination-button '
+        's-pagination-separator">Next</a></span>'
+    )
+    return (
+        head + nav
+        + f'<div class="s-main-slot s-result-list s-search-results sg-row">{cards}'
+        + '<div data-asin="" data-component-type="s-search-result"></div></div>'
+        + pagination + script * 6 + "</body></html>"
+    )
+
+
+def main() -> None:
+    rng = random.Random(42)
+    os.makedirs(FIXTURES, exist_ok=True)
+    for name, layout, sym, domain in PAGES:
+        with open(os.path.join(FIXTURES, name + ".html"), "w", encoding="utf-8") as f:
+            f.write(make_page(rng, layout, sym, CARDS_PER_PAGE, domain))
+
+
+if __name__ == "__main__":
+    main()
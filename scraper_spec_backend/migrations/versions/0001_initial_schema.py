@@ -0,0 +1,122 @@
+"""initial schema: products, price_history, scrape_jobs, search indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SQLite: FTS5 external-content index over products, kept in sync by triggers
+_SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        title, asin,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, title, asin) VALUES (new.id, new.title, new.asin);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, asin) VALUES ('delete', old.id, old.title, old.asin);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF title, asin ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, title, asin) VALUES ('delete', old.id, old.title, old.asin);
+        INSERT INTO products_fts(rowid, title, asin) VALUES (new.id, new.title, new.asin);
+    END""",
+]
+
+# Postgres: trigram index so `q` (ILIKE '%...%') doesn't scan the table; skipped without pg_trgm
+_POSTGRES_TRGM = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_products_title_trgm ON products USING gin (title gin_trgm_ops)",
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("asin", sa.String(32), nullable=False),
+        sa.Column("title", sa.String(512), nullable=False),
+        sa.Column("product_url", sa.String(1024), nullable=False),
+        sa.Column("image_url", sa.String(1024), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("price_raw", sa.String(64), nullable=True),
+        sa.Column("currency", sa.String(12), nullable=True),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.Column("rating_count", sa.Integer(), nullable=True),
+        sa.Column("last_history_price", sa.Float(), nullable=True),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_products_asin", "products", ["asin"], unique=True)
+    op.create_index("ix_products_title", "products", ["title"])
+    op.create_index("ix_products_price_id", "products", ["price", "id"])
+    op.create_index("ix_products_rating_id", "products", ["rating", "id"])
+    op.create_index("ix_products_created_id", "products", ["created_at", "id"])
+    op.create_index("ix_products_updated_id", "products", ["updated_at", "id"])
+    op.create_index("ix_products_title_id", "products", ["title", "id"])
+
+    op.create_table(
+        "price_history",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("asin", sa.String(32), sa.ForeignKey("products.asin", ondelete="CASCADE"), nullable=False),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("price_raw", sa.String(64), nullable=True),
+        sa.Column("currency", sa.String(12), nullable=True),
+        sa.Column("seen_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_price_history_asin", "price_history", ["asin"])
+    op.create_index("ix_price_history_seen_at", "price_history", ["seen_at"])
+    op.create_index("ix_price_history_asin_seen", "price_history", ["asin", sa.text("seen_at DESC")])
+
+    op.create_table(
+        "scrape_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("kind", sa.String(16), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("pages_done", sa.Integer(), nullable=False),
+        sa.Column("items_found", sa.Integer(), nullable=False),
+        sa.Column("rows_upserted", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_scrape_jobs_status", "scrape_jobs", ["status"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for stmt in _SQLITE_FTS:
+            op.execute(stmt)
+    elif dialect == "postgresql" and _has_extension("pg_trgm"):
+        for stmt in _POSTGRES_TRGM:
+            op.execute(stmt)
+
+
+def _has_extension(name: str) -> bool:
+    # pg_trgm ships in contrib, which minimal server builds leave out
+    return op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = :name"), {"name": name}
+    ).first() is not None
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for name in ("products_fts_ai", "products_fts_ad", "products_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS products_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_products_title_trgm")
+    op.drop_table("scrape_jobs")
+    op.drop_table("price_history")
+    op.drop_table("products")
@@ -0,0 +1,39 @@
+"""price_history_rollups: daily/weekly compacted price history
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "price_history_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("asin", sa.String(32), sa.ForeignKey("products.asin", ondelete="CASCADE"), nullable=False),
+        sa.Column("grain", sa.String(8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("min_price", sa.Float(), nullable=True),
+        sa.Column("max_price", sa.Float(), nullable=True),
+        sa.Column("last_price", sa.Float(), nullable=True),
+        sa.Column("last_price_raw", sa.String(64), nullable=True),
+        sa.Column("currency", sa.String(12), nullable=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("first_seen_at", sa.DateTime(), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_price_rollups_asin_grain_start", "price_history_rollups", ["asin", "grain", "bucket_start"], unique=True
+    )
+    op.create_index("ix_price_rollups_grain_start", "price_history_rollups", ["grain", "bucket_start"])
+
+
+def downgrade() -> None:
+    op.drop_table("price_history_rollups")
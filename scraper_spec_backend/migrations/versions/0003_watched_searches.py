@@ -0,0 +1,50 @@
+"""watched_searches: scheduled re-scrapes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "watched_searches",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("keyword", sa.String(256), nullable=True),
+        sa.Column("search_url", sa.String(1024), nullable=True),
+        sa.Column("domain", sa.String(64), nullable=False),
+        sa.Column("max_pages", sa.Integer(), nullable=False),
+        sa.Column("fetch_mode", sa.String(16), nullable=True),
+        sa.Column("interval_sec", sa.Integer(), nullable=False),
+        sa.Column("enabled", sa.Boolean(), nullable=False),
+        sa.Column("change_rate", sa.Float(), nullable=True),
+        sa.Column("next_run_at", sa.DateTime(), nullable=False),
+        sa.Column("last_run_at", sa.DateTime(), nullable=True),
+        sa.Column("last_job_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_watched_searches_enabled_next", "watched_searches", ["enabled", "next_run_at"])
+    op.create_table(
+        "watched_search_products",
+        sa.Column(
+            "watch_id", sa.Integer(), sa.ForeignKey("watched_searches.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("asin", sa.String(32), primary_key=True),
+        sa.Column("last_seen_at", sa.DateTime(), nullable=False),
+    )
+    with op.batch_alter_table("scrape_jobs") as batch:
+        batch.add_column(sa.Column("watch_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("scrape_jobs") as batch:
+        batch.drop_column("watch_id")
+    op.drop_table("watched_search_products")
+    op.drop_table("watched_searches")
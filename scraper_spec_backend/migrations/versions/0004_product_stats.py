@@ -0,0 +1,40 @@
+"""product_stats, price_drops: precomputed /stats aggregates
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # counted from products by the first stats refresh (app.stats.rebuild_product_stats)
+    op.create_table(
+        "product_stats",
+        sa.Column("dimension", sa.String(16), primary_key=True),
+        sa.Column("key", sa.String(256), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "price_drops",
+        sa.Column("period", sa.String(8), primary_key=True),
+        sa.Column("asin", sa.String(32), primary_key=True),
+        sa.Column("title", sa.String(512), nullable=True),
+        sa.Column("currency", sa.String(12), nullable=True),
+        sa.Column("from_price", sa.Float(), nullable=False),
+        sa.Column("to_price", sa.Float(), nullable=False),
+        sa.Column("drop_amount", sa.Float(), nullable=False),
+        sa.Column("drop_pct", sa.Float(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("price_drops")
+    op.drop_table("product_stats")
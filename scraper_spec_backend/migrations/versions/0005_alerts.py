@@ -0,0 +1,51 @@
+"""alert_rules, alert_outbox: price-drop alerts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "alert_rules",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("asin", sa.String(32), nullable=True),
+        sa.Column("keyword", sa.String(256), nullable=True),
+        sa.Column("max_price", sa.Float(), nullable=True),
+        sa.Column("drop_pct", sa.Float(), nullable=True),
+        sa.Column("currency", sa.String(12), nullable=True),
+        sa.Column("webhook_url", sa.String(1024), nullable=True),
+        sa.Column("enabled", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "alert_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("rule_id", sa.Integer(), nullable=False),
+        sa.Column("asin", sa.String(32), nullable=False),
+        sa.Column("title", sa.String(512), nullable=True),
+        sa.Column("currency", sa.String(12), nullable=True),
+        sa.Column("old_price", sa.Float(), nullable=True),
+        sa.Column("new_price", sa.Float(), nullable=False),
+        sa.Column("webhook_url", sa.String(1024), nullable=True),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_alert_outbox_status_next", "alert_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("alert_outbox")
+    op.drop_table("alert_rules")
@@ -0,0 +1,23 @@
+"""scrape_jobs.heartbeat_at: lease for running jobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("scrape_jobs") as batch:
+        batch.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("scrape_jobs") as batch:
+        batch.drop_column("heartbeat_at")
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# app.db builds its engine from DB_URL at import; keep it off the working copy's scraper.db
+os.environ.setdefault("DB_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
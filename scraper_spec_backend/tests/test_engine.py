@@ -0,0 +1,41 @@
+from concurrent.futures import Future
+
+from app.engine import ScrapeEngine, ScrapeTarget
+
+
+def _page(n: int) -> str:
+    return f'<html><a class="s-pagination-next" href="/s?k=x&page={n + 1}">Next</a></html>'
+
+
+class _HeldParser:
+    """Parse futures stay unresolved until the test resolves them."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, html, host):
+        fut = Future()
+        self.futures.append(fut)
+        return fut
+
+
+def test_failed_page_in_drain_does_not_drop_the_rest():
+    parser = _HeldParser()
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        if len(calls) < 4:
+            return _page(len(calls))
+        # the target fails with three pages still parsing; the first of them fails too
+        parser.futures[0].set_exception(ValueError("bad page"))
+        for i, fut in enumerate(parser.futures[1:], 2):
+            fut.set_result([{"asin": f"B0DRAIN00{i}"}])
+        raise RuntimeError("offline")
+
+    engine = ScrapeEngine(delay=(0, 0), fetch=fetch, parser=parser)
+    items, stats = engine.run([ScrapeTarget.for_keyword("x", "amazon.com")], max_pages=5)
+
+    assert sorted(it["asin"] for it in items) == ["B0DRAIN002", "B0DRAIN003"]
+    assert stats.pages == 2
+    assert sorted(e["error"] for e in stats.errors) == ["bad page", "offline"]
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta, timezone
+
+from app.db import Base, SessionLocal, engine
+from app.models import PriceHistory, Product
+from app.services import fetch_history
+
+
+def test_history_accepts_aware_bounds():
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.add(Product(asin="B0HIST0001", title="t", product_url="u", created_at=now, updated_at=now))
+        db.add_all(PriceHistory(asin="B0HIST0001", price=float(i), seen_at=now - timedelta(hours=i)) for i in range(50))
+        db.commit()
+
+        until = datetime.now(timezone.utc)
+        for since in (until - timedelta(days=1), (until - timedelta(days=1)).astimezone(timezone(timedelta(hours=2)))):
+            auto = fetch_history(db, "B0HIST0001", since=since, until=until, max_points=10)
+            raw = fetch_history(db, "B0HIST0001", since=since, until=until, bucket="raw")
+            assert auto.bucket == "day"
+            assert auto.count == raw.count == 24
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta
+
+from app.crud import claim_next_job, heartbeat_jobs, requeue_stale_jobs
+from app.db import Base, SessionLocal, engine
+from app.models import ScrapeJob
+
+
+def test_only_stale_running_jobs_are_requeued():
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all(ScrapeJob(kind="scrape", payload="{}", status="queued") for _ in range(2))
+        db.commit()
+        live, crashed = claim_next_job(db), claim_next_job(db)
+        db.query(ScrapeJob).filter(ScrapeJob.id == crashed.id).update(
+            {"heartbeat_at": datetime.utcnow() - timedelta(minutes=10)}
+        )
+        db.commit()
+        heartbeat_jobs(db, [live.id])
+
+        assert requeue_stale_jobs(db, datetime.utcnow() - timedelta(minutes=2)) == 1
+        db.expire_all()
+        assert db.get(ScrapeJob, live.id).status == "running"
+        assert db.get(ScrapeJob, crashed.id).status == "queued"
@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrate import alembic_config, migrate
+
+# products / price_history as create_all built them before migrations existed
+LEGACY_SCHEMA = [
+    """CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asin VARCHAR(32) NOT NULL,
+        title VARCHAR(512) NOT NULL,
+        product_url VARCHAR(1024) NOT NULL,
+        image_url VARCHAR(1024),
+        price FLOAT,
+        price_raw VARCHAR(64),
+        currency VARCHAR(12),
+        rating FLOAT,
+        rating_count INTEGER,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL
+    )""",
+    "CREATE UNIQUE INDEX ix_products_asin ON products (asin)",
+    "CREATE INDEX ix_products_title ON products (title)",
+    """CREATE TABLE price_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asin VARCHAR(32) NOT NULL REFERENCES products (asin) ON DELETE CASCADE,
+        price FLOAT,
+        price_raw VARCHAR(64),
+        currency VARCHAR(12),
+        seen_at DATETIME NOT NULL
+    )""",
+    "CREATE INDEX ix_price_history_asin ON price_history (asin)",
+    "CREATE INDEX ix_price_history_seen_at ON price_history (seen_at)",
+    "CREATE INDEX ix_price_history_asin_seen ON price_history (asin, seen_at DESC)",
+]
+
+
+def test_legacy_database_migrates_to_head(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    now = datetime(2024, 1, 1)
+    with bind.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(
+            text(
+                "INSERT INTO products (asin, title, product_url, price, currency, created_at, updated_at) "
+                "VALUES ('B000000001', 'Usb cable', 'https://example.com/dp/B000000001', 9.5, 'USD', :now, :now)"
+            ),
+            {"now": now},
+        )
+        conn.execute(
+            text("INSERT INTO price_history (asin, price, currency, seen_at) VALUES ('B000000001', 9.5, 'USD', :now)"),
+            {"now": now},
+        )
+
+    migrate(bind)
+
+    with bind.connect() as conn:
+        head = ScriptDirectory.from_config(alembic_config(conn)).get_current_head()
+        assert conn.scalar(text("SELECT version_num FROM alembic_version")) == head
+        assert conn.scalar(text("SELECT last_history_price FROM products")) == 9.5
+    insp = inspect(bind)
+    for table in ("scrape_jobs", "price_history_rollups", "watched_searches", "product_stats", "alert_outbox"):
+        assert insp.has_table(table)
+    assert "watch_id" in {c["name"] for c in insp.get_columns("scrape_jobs")}
+
+    # a second run finds nothing to do
+    migrate(bind)
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.crud import get_product_stats, upsert_products
+from app.db import Base, SessionLocal, engine
+from app.models import Product
+from app.stats import rebuild_product_stats
+
+
+def _item(asin, price):
+    return {"asin": asin, "title": f"Item {asin}", "product_url": f"https://example.com/dp/{asin}",
+            "price": price, "currency": "EUR"}
+
+
+def test_first_refresh_recounts_even_after_an_upsert():
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        # products that predate product_stats, so no upsert counted them
+        db.add_all(Product(asin=f"B0STAT000{i}", title="old", product_url="u", price=12.0, currency="EUR",
+                           created_at=now, updated_at=now) for i in range(3))
+        db.commit()
+        upsert_products(db, [_item("B0STATNEW1", 30.0)])
+        assert get_product_stats(db, "currency")["EUR"] == 1
+
+        assert rebuild_product_stats(db, only_if_unbuilt=True) == db.scalar(select(func.count(Product.id)))
+        assert get_product_stats(db, "currency")["EUR"] == 4
+        assert rebuild_product_stats(db, only_if_unbuilt=True) is None
+
+        upsert_products(db, [_item("B0STATNEW2", 30.0)])
+        assert get_product_stats(db, "currency")["EUR"] == 5
@@ -0,0 +1,16 @@
+from app.crud import create_watch, delete_watch, link_watch_products
+from app.db import Base, SessionLocal, engine
+from app.models import WatchedProduct
+
+
+def test_new_watch_does_not_inherit_links_of_a_deleted_one():
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        old = create_watch(db, keyword="usb hub", domain="amazon.com", interval_sec=3600)
+        link_watch_products(db, old.id, ["B0WATCH001", "B0WATCH002"])
+        old_id = old.id
+        assert delete_watch(db, old_id)
+
+        new = create_watch(db, keyword="usb cable", domain="amazon.com", interval_sec=3600)
+        assert new.id == old_id
+        assert db.query(WatchedProduct).filter(WatchedProduct.watch_id == new.id).count() == 0